@@ -1,21 +1,10 @@
 # @version 0.3.7
 
 interface Pool:
-    def supply() -> uint256: view
-    def amplification() -> uint256: view
     def num_assets() -> uint256: view
     def assets(_i: uint256) -> address: view
     def rate_providers(_i: uint256) -> address: view
-    def virtual_balance(_i: uint256) -> uint256: view
-    def rate(_i: uint256) -> uint256: view
-    def weight(_i: uint256) -> (uint256, uint256, uint256, uint256): view
-    def packed_weight(_i: uint256) -> uint256: view
-    def swap_fee_rate() -> uint256: view
-    def ramp_step() -> uint256: view
-    def ramp_last_time() -> uint256: view
-    def ramp_stop_time() -> uint256: view
-    def target_amplification() -> uint256: view
-    def vb_prod_sum() -> (uint256, uint256): view
+    def get_state() -> (uint256, uint256, uint256, uint256, uint256, uint256, uint256, uint256, uint256, DynArray[uint256, MAX_NUM_ASSETS], DynArray[address, MAX_NUM_ASSETS]): view
 
 interface RateProvider:
     def rate(_asset: address) -> uint256: view
@@ -24,6 +13,8 @@ pool: public(immutable(Pool))
 
 PRECISION: constant(uint256) = 1_000_000_000_000_000_000
 MAX_NUM_ASSETS: constant(uint256) = 32
+MAX_SUPPLY_STEP: constant(uint256) = 2
+MAX_QUOTES: constant(uint256) = 256
 
 WEIGHT_SCALE: constant(uint256) = 1_000_000_000_000
 WEIGHT_MASK: constant(uint256) = 2**20 - 1
@@ -31,6 +22,18 @@ TARGET_WEIGHT_SHIFT: constant(int128) = -20
 LOWER_BAND_SHIFT: constant(int128) = -40
 UPPER_BAND_SHIFT: constant(int128) = -60
 
+# storage packing of the pool, see `Pool.get_state`
+POOL_VB_MASK: constant(uint256) = 2**128 - 1
+POOL_VB_SHIFT: constant(int128) = -128
+RAMP_MASK: constant(uint256) = 2**128 - 1
+RAMP_PROGRESS_SHIFT: constant(int128) = -128
+RATE_REFRESH_MASK: constant(uint256) = 2**32 - 1
+RATE_REFRESH_SHIFT: constant(int128) = -32
+VB_MASK: constant(uint256) = 2**96 - 1
+RATE_MASK: constant(uint256) = 2**80 - 1
+RATE_SHIFT: constant(int128) = -96
+PACKED_WEIGHT_SHIFT: constant(int128) = -176
+
 # powers of 10
 E3: constant(int256)               = 1_000
 E6: constant(int256)               = E3 * E3
@@ -42,6 +45,8 @@ E18: constant(int256)              = E3 * E15
 E20: constant(int256)              = 100 * E18
 E36: constant(int256)              = E18 * E18
 MAX_POW_REL_ERR: constant(uint256) = 100 # 1e-16
+POW_EXACT_STEP: constant(uint256)  = PRECISION / 2
+POW_EXACT_BOUND: constant(uint256) = 256 * PRECISION
 MIN_NAT_EXP: constant(int256)      = -41 * E18
 MAX_NAT_EXP: constant(int256)      = 130 * E18
 LOG36_LOWER: constant(int256)      = E18 - E17
@@ -82,171 +87,237 @@ def __init__(_pool: address):
 @external
 @view
 def get_effective_amplification() -> uint256:
-    vb_prod: uint256 = 0
-    vb_sum: uint256 = 0
+    supply: uint256 = 0
     amplification: uint256 = 0
+    target_amplification: uint256 = 0
+    fee_rate: uint256 = 0
+    ramp_step: uint256 = 0
+    packed_ramp: uint256 = 0
+    ramp_stop_time: uint256 = 0
+    packed_pool_vb: uint256 = 0
+    packed_rate_refresh: uint256 = 0
+    packed_vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    assets: DynArray[address, MAX_NUM_ASSETS] = []
+    supply, amplification, target_amplification, fee_rate, ramp_step, packed_ramp, ramp_stop_time, \
+        packed_pool_vb, packed_rate_refresh, packed_vbs, assets = pool.get_state()
+    vb_prod: uint256 = packed_pool_vb & POOL_VB_MASK
     packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
     updated: bool = False
-    vb_prod, vb_sum = pool.vb_prod_sum()
-    amplification, vb_prod, packed_weights, updated = self._get_packed_weights(vb_prod, vb_sum)
+    amplification, vb_prod, packed_weights, updated = self._get_packed_weights(
+        vb_prod, shift(packed_pool_vb, POOL_VB_SHIFT), supply, amplification, target_amplification, ramp_step, packed_ramp, ramp_stop_time, packed_vbs
+    )
 
-    num_assets: uint256 = pool.num_assets()
+    num_assets: uint256 = len(packed_vbs)
     for asset in range(MAX_NUM_ASSETS):
         if asset == num_assets:
             break
-        weight: uint256 = 0
-        if updated:
-            weight = packed_weights[asset]
-        else:
-            weight = pool.packed_weight(asset)
-        weight = self._unpack_wn(weight, 1)
+        weight: uint256 = self._unpack_wn(packed_weights[asset], 1)
         amplification = amplification * self._pow_down(weight, weight * num_assets) / PRECISION
     return amplification
 
 @external
 @view
 def get_effective_target_amplification() -> uint256:
+    supply: uint256 = 0
     amplification: uint256 = 0
-    if pool.ramp_last_time() == 0:
-        amplification = pool.amplification()
-    else:
-        amplification = pool.target_amplification()
-
-    num_assets: uint256 = pool.num_assets()
+    target_amplification: uint256 = 0
+    fee_rate: uint256 = 0
+    ramp_step: uint256 = 0
+    packed_ramp: uint256 = 0
+    ramp_stop_time: uint256 = 0
+    packed_pool_vb: uint256 = 0
+    packed_rate_refresh: uint256 = 0
+    packed_vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    assets: DynArray[address, MAX_NUM_ASSETS] = []
+    supply, amplification, target_amplification, fee_rate, ramp_step, packed_ramp, ramp_stop_time, \
+        packed_pool_vb, packed_rate_refresh, packed_vbs, assets = pool.get_state()
+    if packed_ramp & RAMP_MASK != 0:
+        amplification = target_amplification
+
+    num_assets: uint256 = len(packed_vbs)
     for asset in range(MAX_NUM_ASSETS):
         if asset == num_assets:
             break
-        weight: uint256 = unsafe_mul(shift(pool.packed_weight(asset), TARGET_WEIGHT_SHIFT) & WEIGHT_MASK, WEIGHT_SCALE)
+        weight: uint256 = unsafe_mul(shift(packed_vbs[asset], PACKED_WEIGHT_SHIFT + TARGET_WEIGHT_SHIFT) & WEIGHT_MASK, WEIGHT_SCALE)
         amplification = amplification * self._pow_down(weight, weight * num_assets) / PRECISION
     return amplification
 
 @external
 @view
 def get_dy(_i: uint256, _j: uint256, _dx: uint256) -> uint256:
-    num_assets: uint256 = pool.num_assets()
     assert _i != _j # dev: same input and output asset
-    assert _i < num_assets and _j < num_assets # dev: index out of bounds
     assert _dx > 0 # dev: zero amount
 
     # update rates for from and to assets
+    num_assets: uint256 = 0
+    fee_rate: uint256 = 0
     supply: uint256 = 0
     amplification: uint256 = 0
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
-    vb_prod, vb_sum = pool.vb_prod_sum()
     packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    packed_vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
     rates: DynArray[uint256, MAX_NUM_ASSETS] = []
-    supply, amplification, vb_prod, vb_sum, packed_weights, rates = self._get_rates(unsafe_add(_i, 1) | shift(unsafe_add(_j, 1), 8), vb_prod, vb_sum)
-    prev_vb_sum: uint256 = vb_sum
-
-    prev_vb_x: uint256 = pool.virtual_balance(_i) * rates[0] / pool.rate(_i)
-    wn_x: uint256 = self._unpack_wn(packed_weights[_i], num_assets)
-
-    prev_vb_y: uint256 = pool.virtual_balance(_j) * rates[1] / pool.rate(_j)
-    wn_y: uint256 = self._unpack_wn(packed_weights[_j], num_assets)
-
-    dx_fee: uint256 = _dx * pool.swap_fee_rate() / PRECISION
-    dvb_x: uint256 = (_dx - dx_fee) * rates[0] / PRECISION
-    vb_x: uint256 = prev_vb_x + dvb_x
-    
-    # update x_i and remove x_j from variables
-    vb_prod = vb_prod * self._pow_up(prev_vb_y, wn_y) / self._pow_down(vb_x * PRECISION / prev_vb_x, wn_x)
-    vb_sum = vb_sum + dvb_x - prev_vb_y
-
-    # calulate new balance of out token
-    vb_y: uint256 = self._calc_vb(wn_y, prev_vb_y, supply, amplification, vb_prod, vb_sum)
-    vb_sum += vb_y + dx_fee * rates[0] / PRECISION
+    num_assets, fee_rate, supply, amplification, vb_prod, vb_sum, packed_weights, packed_vbs, rates = \
+        self._get_rates(unsafe_add(_i, 1) | shift(unsafe_add(_j, 1), 8))
+    assert _i < num_assets and _j < num_assets # dev: index out of bounds
 
-    # check bands
-    self._check_bands(prev_vb_x * PRECISION / prev_vb_sum, vb_x * PRECISION / vb_sum, packed_weights[_i])
-    self._check_bands(prev_vb_y * PRECISION / prev_vb_sum, vb_y * PRECISION / vb_sum, packed_weights[_j])
+    prev_vb_x: uint256 = (packed_vbs[_i] & VB_MASK) * rates[0] / (shift(packed_vbs[_i], RATE_SHIFT) & RATE_MASK)
+    prev_vb_y: uint256 = (packed_vbs[_j] & VB_MASK) * rates[1] / (shift(packed_vbs[_j], RATE_SHIFT) & RATE_MASK)
 
-    return (prev_vb_y - vb_y) * PRECISION / rates[1]
+    return self._calc_dy(num_assets, _dx, fee_rate, supply, amplification, vb_prod, vb_sum, prev_vb_x, rates[0], packed_weights[_i], prev_vb_y, rates[1], packed_weights[_j])
 
 @external
 @view
 def get_dx(_i: uint256, _j: uint256, _dy: uint256) -> uint256:
-    num_assets: uint256 = pool.num_assets()
     assert _i != _j # dev: same input and output asset
-    assert _i < num_assets and _j < num_assets # dev: index out of bounds
     assert _dy > 0 # dev: zero amount
-    
+
     # update rates for from and to assets
+    num_assets: uint256 = 0
+    fee_rate: uint256 = 0
     supply: uint256 = 0
     amplification: uint256 = 0
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
-    vb_prod, vb_sum = pool.vb_prod_sum()
     packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    packed_vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
     rates: DynArray[uint256, MAX_NUM_ASSETS] = []
-    supply, amplification, vb_prod, vb_sum, packed_weights, rates = self._get_rates(unsafe_add(_i, 1) | shift(unsafe_add(_j, 1), 8), vb_prod, vb_sum)
-    prev_vb_sum: uint256 = vb_sum
+    num_assets, fee_rate, supply, amplification, vb_prod, vb_sum, packed_weights, packed_vbs, rates = \
+        self._get_rates(unsafe_add(_i, 1) | shift(unsafe_add(_j, 1), 8))
+    assert _i < num_assets and _j < num_assets # dev: index out of bounds
 
-    prev_vb_x: uint256 = pool.virtual_balance(_i) * rates[0] / pool.rate(_i)
-    wn_x: uint256 = self._unpack_wn(packed_weights[_i], num_assets)
-    prev_vb_y: uint256 = pool.virtual_balance(_j) * rates[1] / pool.rate(_j)
-    wn_y: uint256 = self._unpack_wn(packed_weights[_j], num_assets)
+    prev_vb_x: uint256 = (packed_vbs[_i] & VB_MASK) * rates[0] / (shift(packed_vbs[_i], RATE_SHIFT) & RATE_MASK)
+    prev_vb_y: uint256 = (packed_vbs[_j] & VB_MASK) * rates[1] / (shift(packed_vbs[_j], RATE_SHIFT) & RATE_MASK)
 
-    dvb_y: uint256 = _dy * rates[1] / PRECISION
-    vb_y: uint256 = prev_vb_y - dvb_y
+    return self._calc_dx(num_assets, _dy, fee_rate, supply, amplification, vb_prod, vb_sum, prev_vb_x, rates[0], packed_weights[_i], prev_vb_y, rates[1], packed_weights[_j])
 
-    # update x_j and remove x_i from variables
-    vb_prod = vb_prod * self._pow_up(prev_vb_x, wn_x) / self._pow_down(vb_y * PRECISION / prev_vb_y, wn_y)
-    vb_sum = vb_sum - dvb_y - prev_vb_x
+@external
+@view
+def get_dy_many(_i: DynArray[uint256, MAX_QUOTES], _j: DynArray[uint256, MAX_QUOTES], _dx: DynArray[uint256, MAX_QUOTES]) -> DynArray[uint256, MAX_QUOTES]:
+    # quote multiple swaps against the same pool state, reading it only once
+    num_quotes: uint256 = len(_i)
+    assert len(_j) == num_quotes and len(_dx) == num_quotes
 
-    # calulate new balance of in token
-    vb_x: uint256 = self._calc_vb(wn_x, prev_vb_x, supply, amplification, vb_prod, vb_sum)
-    dx: uint256 = (vb_x - prev_vb_x) * PRECISION / rates[0]
-    dx_fee: uint256 = pool.swap_fee_rate()
-    dx_fee = dx * dx_fee / (PRECISION - dx_fee)
-    dx += dx_fee
-    vb_x += dx_fee * rates[0] / PRECISION
-    vb_sum += vb_x
+    num_assets: uint256 = 0
+    fee_rate: uint256 = 0
+    supply: uint256 = 0
+    amplification: uint256 = 0
+    vb_prod: uint256 = 0
+    vb_sum: uint256 = 0
+    updated: bool = False
+    packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    prev_rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+    rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+    num_assets, fee_rate, supply, amplification, vb_prod, vb_sum, updated, packed_weights, vbs, prev_rates, rates = self._get_state()
 
-    # check bands
-    self._check_bands(prev_vb_x * PRECISION / prev_vb_sum, vb_x * PRECISION / vb_sum, packed_weights[_i])
-    self._check_bands(prev_vb_y * PRECISION / prev_vb_sum, vb_y * PRECISION / vb_sum, packed_weights[_j])
-    
-    return dx
+    dys: DynArray[uint256, MAX_QUOTES] = []
+    for k in range(MAX_QUOTES):
+        if k == num_quotes:
+            break
+        i: uint256 = _i[k]
+        j: uint256 = _j[k]
+        assert i != j # dev: same input and output asset
+        assert i < num_assets and j < num_assets # dev: index out of bounds
+        assert _dx[k] > 0 # dev: zero amount
+
+        # update rates for from and to assets
+        quote_supply: uint256 = 0
+        quote_vb_prod: uint256 = 0
+        quote_vb_sum: uint256 = 0
+        quote_supply, quote_vb_prod, quote_vb_sum = self._apply_rates(i, j, num_assets, supply, amplification, vb_prod, vb_sum, updated, packed_weights, vbs, prev_rates, rates)
+
+        prev_vb_x: uint256 = vbs[i] * rates[i] / prev_rates[i]
+        prev_vb_y: uint256 = vbs[j] * rates[j] / prev_rates[j]
+        dys.append(self._calc_dy(num_assets, _dx[k], fee_rate, quote_supply, amplification, quote_vb_prod, quote_vb_sum, prev_vb_x, rates[i], packed_weights[i], prev_vb_y, rates[j], packed_weights[j]))
+    return dys
 
 @external
 @view
-def get_add_lp(_amounts: DynArray[uint256, MAX_NUM_ASSETS]) -> uint256:
-    num_assets: uint256 = pool.num_assets()
-    assert len(_amounts) == num_assets
+def get_dx_many(_i: DynArray[uint256, MAX_QUOTES], _j: DynArray[uint256, MAX_QUOTES], _dy: DynArray[uint256, MAX_QUOTES]) -> DynArray[uint256, MAX_QUOTES]:
+    # quote multiple exact output swaps against the same pool state, reading it only once
+    num_quotes: uint256 = len(_i)
+    assert len(_j) == num_quotes and len(_dy) == num_quotes
 
+    num_assets: uint256 = 0
+    fee_rate: uint256 = 0
+    supply: uint256 = 0
+    amplification: uint256 = 0
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
-    vb_prod, vb_sum = pool.vb_prod_sum()
-    assert vb_sum > 0
-    # for simplicity we dont give estimates for the first deposit
+    updated: bool = False
+    packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    prev_rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+    rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+    num_assets, fee_rate, supply, amplification, vb_prod, vb_sum, updated, packed_weights, vbs, prev_rates, rates = self._get_state()
 
-    # find lowest relative increase in balance
+    dxs: DynArray[uint256, MAX_QUOTES] = []
+    for k in range(MAX_QUOTES):
+        if k == num_quotes:
+            break
+        i: uint256 = _i[k]
+        j: uint256 = _j[k]
+        assert i != j # dev: same input and output asset
+        assert i < num_assets and j < num_assets # dev: index out of bounds
+        assert _dy[k] > 0 # dev: zero amount
+
+        # update rates for from and to assets
+        quote_supply: uint256 = 0
+        quote_vb_prod: uint256 = 0
+        quote_vb_sum: uint256 = 0
+        quote_supply, quote_vb_prod, quote_vb_sum = self._apply_rates(i, j, num_assets, supply, amplification, vb_prod, vb_sum, updated, packed_weights, vbs, prev_rates, rates)
+
+        prev_vb_x: uint256 = vbs[i] * rates[i] / prev_rates[i]
+        prev_vb_y: uint256 = vbs[j] * rates[j] / prev_rates[j]
+        dxs.append(self._calc_dx(num_assets, _dy[k], fee_rate, quote_supply, amplification, quote_vb_prod, quote_vb_sum, prev_vb_x, rates[i], packed_weights[i], prev_vb_y, rates[j], packed_weights[j]))
+    return dxs
+
+@external
+@view
+def get_add_lp(_amounts: DynArray[uint256, MAX_NUM_ASSETS]) -> uint256:
+    # deposited assets
     assets: uint256 = 0
-    lowest: uint256 = max_value(uint256)
     sh: int128 = 0
     for asset in range(MAX_NUM_ASSETS):
-        if asset == num_assets:
+        if asset == len(_amounts):
             break
         if _amounts[asset] > 0:
             assets = assets | shift(unsafe_add(asset, 1), sh)
             sh = unsafe_add(sh, 8)
-            if vb_sum > 0 and lowest > 0:
-                lowest = min(_amounts[asset] * pool.rate(asset) / pool.virtual_balance(asset), lowest)
-        else:
-            lowest = 0
-    assert sh > 0 # dev: need to deposit at least one asset
 
     # update rates
+    num_assets: uint256 = 0
+    fee_rate: uint256 = 0
     prev_supply: uint256 = 0
     amplification: uint256 = 0
+    vb_prod: uint256 = 0
+    vb_sum: uint256 = 0
     packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    packed_vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
     rates: DynArray[uint256, MAX_NUM_ASSETS] = []
-    prev_supply, amplification, vb_prod, vb_sum, packed_weights, rates = self._get_rates(assets, vb_prod, vb_sum)
+    num_assets, fee_rate, prev_supply, amplification, vb_prod, vb_sum, packed_weights, packed_vbs, rates = self._get_rates(assets)
+    assert len(_amounts) == num_assets
+    assert vb_sum > 0
+    # for simplicity we dont give estimates for the first deposit
+    assert sh > 0 # dev: need to deposit at least one asset
+
+    # find lowest relative increase in balance
+    lowest: uint256 = max_value(uint256)
+    for asset in range(MAX_NUM_ASSETS):
+        if asset == num_assets:
+            break
+        if _amounts[asset] == 0:
+            lowest = 0
+            break
+        lowest = min(_amounts[asset] * (shift(packed_vbs[asset], RATE_SHIFT) & RATE_MASK) / (packed_vbs[asset] & VB_MASK), lowest)
 
     vb_prod_final: uint256 = vb_prod
     vb_sum_final: uint256 = vb_sum
-    fee_rate: uint256 = pool.swap_fee_rate() / 2
+    log_prod_final: int256 = 0
+    log_prod: int256 = 0
+    fee_rate /= 2
     prev_vb_sum: uint256 = vb_sum
     balances: DynArray[uint256, MAX_NUM_ASSETS] = []
     j: uint256 = 0
@@ -257,7 +328,7 @@ def get_add_lp(_amounts: DynArray[uint256, MAX_NUM_ASSETS]) -> uint256:
         amount: uint256 = _amounts[asset]
         if amount == 0:
             continue
-        prev_vb: uint256 = pool.virtual_balance(asset) * rates[j] / pool.rate(asset)
+        prev_vb: uint256 = (packed_vbs[asset] & VB_MASK) * rates[j] / (shift(packed_vbs[asset], RATE_SHIFT) & RATE_MASK)
 
         dvb: uint256 = amount * rates[j] / PRECISION
         vb: uint256 = prev_vb + dvb
@@ -266,17 +337,22 @@ def get_add_lp(_amounts: DynArray[uint256, MAX_NUM_ASSETS]) -> uint256:
         if prev_supply > 0:
             wn: uint256 = self._unpack_wn(packed_weights[asset], num_assets)
 
-            # update product and sum of virtual balances
-            vb_prod_final = vb_prod_final * self._pow_up(prev_vb * PRECISION / vb, wn) / PRECISION
+            # update product and sum of virtual balances, product in log space
+            log_prod_final = unsafe_add(log_prod_final, self._log_pow(prev_vb * PRECISION / vb, wn))
             # the `D^n` factor will be updated in `_calc_supply()`
             vb_sum_final += dvb
 
             # remove fees from balance and recalculate sum and product
             fee: uint256 = (dvb - prev_vb * lowest / PRECISION) * fee_rate / PRECISION
-            vb_prod = vb_prod * self._pow_up(prev_vb * PRECISION / (vb - fee), wn) / PRECISION
+            log_prod = unsafe_add(log_prod, self._log_pow(prev_vb * PRECISION / (vb - fee), wn))
             vb_sum += dvb - fee
         j = unsafe_add(j, 1)
 
+    if prev_supply > 0:
+        # factor in all deposits at once
+        vb_prod_final = vb_prod_final * self._exp_up(log_prod_final) / PRECISION
+        vb_prod = vb_prod * self._exp_up(log_prod) / PRECISION
+
     # check bands
     j = 0
     for asset in range(MAX_NUM_ASSETS):
@@ -284,7 +360,8 @@ def get_add_lp(_amounts: DynArray[uint256, MAX_NUM_ASSETS]) -> uint256:
             break
         if _amounts[asset] == 0:
             continue
-        self._check_bands(pool.virtual_balance(asset) * rates[j] / pool.rate(asset) * PRECISION / prev_vb_sum, balances[j] * PRECISION / vb_sum_final, packed_weights[asset])
+        prev_vb: uint256 = (packed_vbs[asset] & VB_MASK) * rates[j] / (shift(packed_vbs[asset], RATE_SHIFT) & RATE_MASK)
+        self._check_bands(prev_vb * PRECISION / prev_vb_sum, balances[j] * PRECISION / vb_sum_final, packed_weights[asset])
         j = unsafe_add(j, 1)
 
     supply: uint256 = 0
@@ -295,15 +372,28 @@ def get_add_lp(_amounts: DynArray[uint256, MAX_NUM_ASSETS]) -> uint256:
 @view
 def get_remove_lp(_lp_amount: uint256) -> DynArray[uint256, MAX_NUM_ASSETS]:
     amounts: DynArray[uint256, MAX_NUM_ASSETS] = []
-    num_assets: uint256 = pool.num_assets()
-    prev_supply: uint256 = pool.supply()
+    supply: uint256 = 0
+    amplification: uint256 = 0
+    target_amplification: uint256 = 0
+    fee_rate: uint256 = 0
+    ramp_step: uint256 = 0
+    packed_ramp: uint256 = 0
+    ramp_stop_time: uint256 = 0
+    packed_pool_vb: uint256 = 0
+    packed_rate_refresh: uint256 = 0
+    packed_vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    assets: DynArray[address, MAX_NUM_ASSETS] = []
+    supply, amplification, target_amplification, fee_rate, ramp_step, packed_ramp, ramp_stop_time, \
+        packed_pool_vb, packed_rate_refresh, packed_vbs, assets = pool.get_state()
+    num_assets: uint256 = len(packed_vbs)
+    prev_supply: uint256 = supply
     assert _lp_amount <= prev_supply
     for asset in range(MAX_NUM_ASSETS):
         if asset == num_assets:
             break
-        prev_bal: uint256 = pool.virtual_balance(asset)
+        prev_bal: uint256 = packed_vbs[asset] & VB_MASK
         dbal: uint256 = prev_bal * _lp_amount / prev_supply
-        amount: uint256 = dbal * PRECISION / pool.rate(asset)
+        amount: uint256 = dbal * PRECISION / (shift(packed_vbs[asset], RATE_SHIFT) & RATE_MASK)
         amounts.append(amount)
 
     return amounts
@@ -311,24 +401,33 @@ def get_remove_lp(_lp_amount: uint256) -> DynArray[uint256, MAX_NUM_ASSETS]:
 @external
 @view
 def get_remove_single_lp(_asset: uint256, _lp_amount: uint256) -> uint256:
-    num_assets: uint256 = pool.num_assets()
-    assert _asset < num_assets # dev: index out of bounds
-
     # update rate
+    num_assets: uint256 = 0
+    fee_rate: uint256 = 0
     prev_supply: uint256 = 0
     amplification: uint256 = 0
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
-    vb_prod, vb_sum = pool.vb_prod_sum()
     packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    packed_vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
     rates: DynArray[uint256, MAX_NUM_ASSETS] = []
-    prev_supply, amplification, vb_prod, vb_sum, packed_weights, rates = self._get_rates(unsafe_add(_asset, 1), vb_prod, vb_sum)
+    num_assets, fee_rate, prev_supply, amplification, vb_prod, vb_sum, packed_weights, packed_vbs, rates = \
+        self._get_rates(unsafe_add(_asset, 1))
+    assert _asset < num_assets # dev: index out of bounds
     prev_vb_sum: uint256 = vb_sum
 
     supply: uint256 = prev_supply - _lp_amount
-    prev_vb: uint256 = pool.virtual_balance(_asset) * rates[0] / pool.rate(_asset)
+    prev_vb: uint256 = (packed_vbs[_asset] & VB_MASK) * rates[0] / (shift(packed_vbs[_asset], RATE_SHIFT) & RATE_MASK)
     wn: uint256 = self._unpack_wn(packed_weights[_asset], num_assets)
 
+    # initial guess along the tangent of the invariant
+    vb: uint256 = _lp_amount * (amplification - PRECISION + (num_assets + 1) * vb_prod) / \
+        self._slope(amplification, prev_supply, vb_prod, prev_vb, wn)
+    if vb < prev_vb / 2:
+        vb = prev_vb - vb
+    else:
+        vb = prev_vb / 2
+
     # update variables
     vb_prod = vb_prod * self._pow_up(prev_vb, wn) / PRECISION
     for i in range(MAX_NUM_ASSETS):
@@ -338,9 +437,9 @@ def get_remove_single_lp(_asset: uint256, _lp_amount: uint256) -> uint256:
     vb_sum = vb_sum - prev_vb
 
     # calculate new balance of asset
-    vb: uint256 = self._calc_vb(wn, prev_vb, supply, amplification, vb_prod, vb_sum)
+    vb = self._calc_vb(wn, vb, supply, amplification, vb_prod, vb_sum)
     dvb: uint256 = prev_vb - vb
-    fee: uint256 = dvb * pool.swap_fee_rate() / 2 / PRECISION
+    fee: uint256 = dvb * fee_rate / 2 / PRECISION
     dvb -= fee
     vb += fee
     dx: uint256 = dvb * PRECISION / rates[0]
@@ -352,7 +451,7 @@ def get_remove_single_lp(_asset: uint256, _lp_amount: uint256) -> uint256:
         if asset == _asset:
             self._check_bands(prev_vb * PRECISION / prev_vb_sum, vb * PRECISION / vb_sum, packed_weights[asset])
         else:
-            bal: uint256 = pool.virtual_balance(asset)
+            bal: uint256 = packed_vbs[asset] & VB_MASK
             self._check_bands(bal * PRECISION / prev_vb_sum, bal * PRECISION / vb_sum, packed_weights[asset])
 
     return dx
@@ -378,31 +477,231 @@ def get_vb(_amounts: DynArray[uint256, MAX_NUM_ASSETS]) -> uint256:
 
 @internal
 @view
-def _get_rates(_assets: uint256, _vb_prod: uint256, _vb_sum: uint256) -> (uint256, uint256, uint256, uint256, DynArray[uint256, MAX_NUM_ASSETS], DynArray[uint256, MAX_NUM_ASSETS]):
+def _get_state() -> (uint256, uint256, uint256, uint256, uint256, uint256, bool, DynArray[uint256, MAX_NUM_ASSETS], DynArray[uint256, MAX_NUM_ASSETS], DynArray[uint256, MAX_NUM_ASSETS], DynArray[uint256, MAX_NUM_ASSETS]):
+    # read pool state in a single call and the latest rate of every asset
+    supply: uint256 = 0
+    amplification: uint256 = 0
+    target_amplification: uint256 = 0
+    fee_rate: uint256 = 0
+    ramp_step: uint256 = 0
+    packed_ramp: uint256 = 0
+    ramp_stop_time: uint256 = 0
+    packed_pool_vb: uint256 = 0
+    packed_rate_refresh: uint256 = 0
+    packed_vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    assets: DynArray[address, MAX_NUM_ASSETS] = []
+    supply, amplification, target_amplification, fee_rate, ramp_step, packed_ramp, ramp_stop_time, \
+        packed_pool_vb, packed_rate_refresh, packed_vbs, assets = pool.get_state()
+    vb_prod: uint256 = packed_pool_vb & POOL_VB_MASK
+    vb_sum: uint256 = shift(packed_pool_vb, POOL_VB_SHIFT)
+
     packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    updated: bool = False
+    amplification, vb_prod, packed_weights, updated = self._get_packed_weights(
+        vb_prod, vb_sum, supply, amplification, target_amplification, ramp_step, packed_ramp, ramp_stop_time, packed_vbs
+    )
+
+    num_assets: uint256 = len(packed_vbs)
+    refreshed: uint256 = self._rates_refreshed(packed_rate_refresh)
+    vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    prev_rates: DynArray[uint256, MAX_NUM_ASSETS] = []
     rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+    for asset in range(MAX_NUM_ASSETS):
+        if asset == num_assets:
+            break
+        vbs.append(packed_vbs[asset] & VB_MASK)
+        prev_rate: uint256 = shift(packed_vbs[asset], RATE_SHIFT) & RATE_MASK
+        prev_rates.append(prev_rate)
+        if refreshed & shift(1, convert(asset, int128)) != 0:
+            # pool wont read the rate again in this block
+            rates.append(prev_rate)
+        else:
+            rates.append(RateProvider(pool.rate_providers(asset)).rate(assets[asset]))
+
+    return num_assets, fee_rate, supply, amplification, vb_prod, vb_sum, updated, packed_weights, vbs, prev_rates, rates
+
+@internal
+@pure
+def _apply_rates(
+    _i: uint256,
+    _j: uint256,
+    _num_assets: uint256,
+    _supply: uint256,
+    _amplification: uint256,
+    _vb_prod: uint256,
+    _vb_sum: uint256,
+    _updated: bool,
+    _packed_weights: DynArray[uint256, MAX_NUM_ASSETS],
+    _vbs: DynArray[uint256, MAX_NUM_ASSETS],
+    _prev_rates: DynArray[uint256, MAX_NUM_ASSETS],
+    _rates: DynArray[uint256, MAX_NUM_ASSETS]
+) -> (uint256, uint256, uint256):
+    # same as `_get_rates` for two assets, using previously read state
+    vb_prod: uint256 = _vb_prod
+    vb_sum: uint256 = _vb_sum
+    log_prod: int256 = 0
+    asset: uint256 = _i
+    for _ in range(2):
+        rate: uint256 = _rates[asset]
+        assert rate > 0 # dev: no rate
+        prev_rate: uint256 = _prev_rates[asset]
+        if rate != prev_rate and prev_rate > 0 and vb_sum > 0:
+            # factor out old rate and factor in new
+            wn: uint256 = self._unpack_wn(_packed_weights[asset], _num_assets)
+            log_prod = unsafe_add(log_prod, self._log_pow(prev_rate * PRECISION / rate, wn))
+
+            prev_bal: uint256 = _vbs[asset]
+            bal: uint256 = prev_bal * rate / prev_rate
+            vb_sum = vb_sum + bal - prev_bal
+        asset = _j
+
+    if log_prod != 0:
+        vb_prod = vb_prod * self._exp_up(log_prod) / PRECISION
+
+    if not _updated and vb_prod == _vb_prod and vb_sum == _vb_sum:
+        return _supply, vb_prod, vb_sum
+
+    supply: uint256 = 0
+    supply, vb_prod = self._calc_supply(_num_assets, _supply, _amplification, vb_prod, vb_sum, True)
+    return supply, vb_prod, vb_sum
+
+@internal
+@pure
+def _calc_dy(
+    _num_assets: uint256,
+    _dx: uint256,
+    _fee_rate: uint256,
+    _supply: uint256,
+    _amplification: uint256,
+    _vb_prod: uint256,
+    _vb_sum: uint256,
+    _prev_vb_x: uint256,
+    _rate_x: uint256,
+    _packed_weight_x: uint256,
+    _prev_vb_y: uint256,
+    _rate_y: uint256,
+    _packed_weight_y: uint256
+) -> uint256:
+    # output amount of a swap, after rates have been updated
+    wn_x: uint256 = self._unpack_wn(_packed_weight_x, _num_assets)
+    wn_y: uint256 = self._unpack_wn(_packed_weight_y, _num_assets)
+
+    dx_fee: uint256 = _dx * _fee_rate / PRECISION
+    dvb_x: uint256 = (_dx - dx_fee) * _rate_x / PRECISION
+    vb_x: uint256 = _prev_vb_x + dvb_x
+
+    # initial guess along the tangent of the invariant
+    vb_y: uint256 = dvb_x * self._slope(_amplification, _supply, _vb_prod, _prev_vb_x, wn_x) / \
+        self._slope(_amplification, _supply, _vb_prod, _prev_vb_y, wn_y)
+    if vb_y < _prev_vb_y / 2:
+        vb_y = _prev_vb_y - vb_y
+    else:
+        vb_y = _prev_vb_y / 2
+    
+    # update x_i and remove x_j from variables
+    vb_prod: uint256 = _vb_prod * self._pow_up(_prev_vb_y, wn_y) / self._pow_down(vb_x * PRECISION / _prev_vb_x, wn_x)
+    vb_sum: uint256 = _vb_sum + dvb_x - _prev_vb_y
+
+    # calulate new balance of out token
+    vb_y = self._calc_vb(wn_y, vb_y, _supply, _amplification, vb_prod, vb_sum)
+    vb_sum += vb_y + dx_fee * _rate_x / PRECISION
+
+    # check bands
+    self._check_bands(_prev_vb_x * PRECISION / _vb_sum, vb_x * PRECISION / vb_sum, _packed_weight_x)
+    self._check_bands(_prev_vb_y * PRECISION / _vb_sum, vb_y * PRECISION / vb_sum, _packed_weight_y)
+
+    return (_prev_vb_y - vb_y) * PRECISION / _rate_y
+
+@internal
+@pure
+def _calc_dx(
+    _num_assets: uint256,
+    _dy: uint256,
+    _fee_rate: uint256,
+    _supply: uint256,
+    _amplification: uint256,
+    _vb_prod: uint256,
+    _vb_sum: uint256,
+    _prev_vb_x: uint256,
+    _rate_x: uint256,
+    _packed_weight_x: uint256,
+    _prev_vb_y: uint256,
+    _rate_y: uint256,
+    _packed_weight_y: uint256
+) -> uint256:
+    # input amount of an exact output swap, after rates have been updated
+    wn_x: uint256 = self._unpack_wn(_packed_weight_x, _num_assets)
+    wn_y: uint256 = self._unpack_wn(_packed_weight_y, _num_assets)
+
+    dvb_y: uint256 = _dy * _rate_y / PRECISION
+    vb_y: uint256 = _prev_vb_y - dvb_y
+
+    # initial guess along the tangent of the invariant
+    vb_x: uint256 = _prev_vb_x + dvb_y * self._slope(_amplification, _supply, _vb_prod, _prev_vb_y, wn_y) / \
+        self._slope(_amplification, _supply, _vb_prod, _prev_vb_x, wn_x)
+
+    # update x_j and remove x_i from variables
+    vb_prod: uint256 = _vb_prod * self._pow_up(_prev_vb_x, wn_x) / self._pow_down(vb_y * PRECISION / _prev_vb_y, wn_y)
+    vb_sum: uint256 = _vb_sum - dvb_y - _prev_vb_x
 
+    # calulate new balance of in token
+    vb_x = self._calc_vb(wn_x, vb_x, _supply, _amplification, vb_prod, vb_sum)
+    dx: uint256 = (vb_x - _prev_vb_x) * PRECISION / _rate_x
+    dx_fee: uint256 = dx * _fee_rate / (PRECISION - _fee_rate)
+    dx += dx_fee
+    vb_x += dx_fee * _rate_x / PRECISION
+    vb_sum += vb_x
+
+    # check bands
+    self._check_bands(_prev_vb_x * PRECISION / _vb_sum, vb_x * PRECISION / vb_sum, _packed_weight_x)
+    self._check_bands(_prev_vb_y * PRECISION / _vb_sum, vb_y * PRECISION / vb_sum, _packed_weight_y)
+    
+    return dx
+
+@internal
+@view
+def _get_rates(_assets: uint256) -> (uint256, uint256, uint256, uint256, uint256, uint256, DynArray[uint256, MAX_NUM_ASSETS], DynArray[uint256, MAX_NUM_ASSETS], DynArray[uint256, MAX_NUM_ASSETS]):
+    # read pool state in a single call and the latest rate of the assets in `_assets`
+    supply: uint256 = 0
     amplification: uint256 = 0
+    target_amplification: uint256 = 0
+    fee_rate: uint256 = 0
+    ramp_step: uint256 = 0
+    packed_ramp: uint256 = 0
+    ramp_stop_time: uint256 = 0
+    packed_pool_vb: uint256 = 0
+    packed_rate_refresh: uint256 = 0
+    packed_vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    pool_assets: DynArray[address, MAX_NUM_ASSETS] = []
+    supply, amplification, target_amplification, fee_rate, ramp_step, packed_ramp, ramp_stop_time, \
+        packed_pool_vb, packed_rate_refresh, packed_vbs, pool_assets = pool.get_state()
+    prev_vb_prod: uint256 = packed_pool_vb & POOL_VB_MASK
+    prev_vb_sum: uint256 = shift(packed_pool_vb, POOL_VB_SHIFT)
+
+    packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+
     vb_prod: uint256 = 0
-    vb_sum: uint256 = _vb_sum
+    vb_sum: uint256 = prev_vb_sum
     updated: bool = False
-    amplification, vb_prod, packed_weights, updated = self._get_packed_weights(_vb_prod, _vb_sum)
-    num_assets: uint256 = pool.num_assets()
-
-    if not updated:
-        for asset in range(MAX_NUM_ASSETS):
-            if asset == num_assets:
-                break
-            packed_weights.append(pool.packed_weight(asset))
+    amplification, vb_prod, packed_weights, updated = self._get_packed_weights(
+        prev_vb_prod, prev_vb_sum, supply, amplification, target_amplification, ramp_step, packed_ramp, ramp_stop_time, packed_vbs
+    )
+    num_assets: uint256 = len(packed_vbs)
+    refreshed: uint256 = self._rates_refreshed(packed_rate_refresh)
+    log_prod: int256 = 0
 
     for i in range(MAX_NUM_ASSETS):
         asset: uint256 = shift(_assets, unsafe_mul(-8, convert(i, int128))) & 255
         if asset == 0 or asset > num_assets:
             break
         asset = unsafe_sub(asset, 1)
-        provider: address = pool.rate_providers(asset)
-        prev_rate: uint256 = pool.rate(asset)
-        rate: uint256 = RateProvider(provider).rate(pool.assets(asset))
+        prev_rate: uint256 = shift(packed_vbs[asset], RATE_SHIFT) & RATE_MASK
+        rate: uint256 = prev_rate
+        if refreshed & shift(1, convert(asset, int128)) == 0:
+            # pool reads the rate at most once per block
+            provider: address = pool.rate_providers(asset)
+            rate = RateProvider(provider).rate(pool_assets[asset])
         assert rate > 0 # dev: no rate
         rates.append(rate)
 
@@ -412,27 +711,47 @@ def _get_rates(_assets: uint256, _vb_prod: uint256, _vb_sum: uint256) -> (uint25
         if prev_rate > 0 and vb_sum > 0:
             # factor out old rate and factor in new
             wn: uint256 = self._unpack_wn(packed_weights[asset], num_assets)
-            vb_prod = vb_prod * self._pow_up(prev_rate * PRECISION / rate, wn) / PRECISION
+            log_prod = unsafe_add(log_prod, self._log_pow(prev_rate * PRECISION / rate, wn))
 
-            prev_bal: uint256 = pool.virtual_balance(asset)
+            prev_bal: uint256 = packed_vbs[asset] & VB_MASK
             bal: uint256 = prev_bal * rate / prev_rate
             vb_sum = vb_sum + bal - prev_bal
 
-    if not updated and vb_prod == _vb_prod and vb_sum == _vb_sum:
-        return pool.supply(), amplification, vb_prod, vb_sum, packed_weights, rates
+    if log_prod != 0:
+        vb_prod = vb_prod * self._exp_up(log_prod) / PRECISION
+
+    if not updated and vb_prod == prev_vb_prod and vb_sum == prev_vb_sum:
+        return num_assets, fee_rate, supply, amplification, vb_prod, vb_sum, packed_weights, packed_vbs, rates
     
-    supply: uint256 = 0
-    supply, vb_prod = self._calc_supply(num_assets, pool.supply(), amplification, vb_prod, vb_sum, True)
-    return supply, amplification, vb_prod, vb_sum, packed_weights, rates
+    supply, vb_prod = self._calc_supply(num_assets, supply, amplification, vb_prod, vb_sum, True)
+    return num_assets, fee_rate, supply, amplification, vb_prod, vb_sum, packed_weights, packed_vbs, rates
 
 @internal
 @view
-def _get_packed_weights(_vb_prod: uint256, _vb_sum: uint256) -> (uint256, uint256, DynArray[uint256, MAX_NUM_ASSETS], bool):
+def _rates_refreshed(_packed: uint256) -> uint256:
+    # flags of the assets whose rate the pool already read in this block
+    if shift(_packed, RATE_REFRESH_SHIFT) != block.number:
+        return 0
+    return _packed & RATE_REFRESH_MASK
+
+@internal
+@view
+def _get_packed_weights(
+    _vb_prod: uint256, _vb_sum: uint256, _supply: uint256, _amplification: uint256, _target_amplification: uint256,
+    _ramp_step: uint256, _packed_ramp: uint256, _ramp_stop_time: uint256, _packed_vbs: DynArray[uint256, MAX_NUM_ASSETS]
+) -> (uint256, uint256, DynArray[uint256, MAX_NUM_ASSETS], bool):
     packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
-    span: uint256 = pool.ramp_last_time()
-    duration: uint256 = pool.ramp_stop_time()
-    if span == 0 or span > block.timestamp or (block.timestamp - span < pool.ramp_step() and duration > block.timestamp):
-        return pool.amplification(), _vb_prod, packed_weights, False
+    num_assets: uint256 = len(_packed_vbs)
+    progress: uint256 = shift(_packed_ramp, RAMP_PROGRESS_SHIFT)
+    span: uint256 = _packed_ramp & RAMP_MASK
+    duration: uint256 = _ramp_stop_time
+    if span == 0 or span > block.timestamp or (block.timestamp - span < _ramp_step and duration > block.timestamp):
+        # weights as of the last ramp step
+        for asset in range(MAX_NUM_ASSETS):
+            if asset == num_assets:
+                break
+            packed_weights.append(self._ramp_weight(shift(_packed_vbs[asset], PACKED_WEIGHT_SHIFT), progress))
+        return _amplification, _vb_prod, packed_weights, False
 
     if block.timestamp < duration:
         # ramp in progress
@@ -443,8 +762,8 @@ def _get_packed_weights(_vb_prod: uint256, _vb_sum: uint256) -> (uint256, uint25
     span = block.timestamp - span
     
     # update amplification
-    current: uint256 = pool.amplification()
-    target: uint256 = pool.target_amplification()
+    current: uint256 = _amplification
+    target: uint256 = _target_amplification
     if duration == 0:
         current = target
     else:
@@ -455,28 +774,29 @@ def _get_packed_weights(_vb_prod: uint256, _vb_sum: uint256) -> (uint256, uint25
     amplification: uint256 = current
 
     # update weights
-    num_assets: uint256 = pool.num_assets()
-    supply: uint256 = pool.supply()
+    if duration == 0:
+        progress = PRECISION
+    else:
+        progress += (PRECISION - progress) * span / duration
     vb_prod: uint256 = 0
     if _vb_sum > 0:
         vb_prod = PRECISION
-    lower: uint256 = 0
-    upper: uint256 = 0
+    l: int256 = 0
     for asset in range(MAX_NUM_ASSETS):
         if asset == num_assets:
             break
-        current, target, lower, upper = pool.weight(asset)
-        if duration == 0:
-            current = target
-        else:
-            if current > target:
-                current -= (current - target) * span / duration
+        packed_weight: uint256 = self._ramp_weight(shift(_packed_vbs[asset], PACKED_WEIGHT_SHIFT), progress)
+        packed_weights.append(packed_weight)
+        current = self._unpack_wn(packed_weight, 1)
+        if vb_prod > 0:
+            x: uint256 = unsafe_div(unsafe_mul(_supply, current), _packed_vbs[asset] & VB_MASK)
+            if x == 0:
+                vb_prod = 0
             else:
-                current += (target - current) * span / duration
-        packed_weights.append(self._pack_weight(current, target, lower, upper))
-        if _vb_sum > 0:
-            vb_prod = unsafe_div(unsafe_mul(vb_prod, self._pow_down(unsafe_div(unsafe_mul(supply, current), pool.virtual_balance(asset)), unsafe_mul(current, num_assets))), PRECISION)
+                l = unsafe_add(l, self._log_pow(x, unsafe_mul(current, num_assets)))
 
+    if vb_prod > 0:
+        vb_prod = self._exp_down(l)
     return amplification, vb_prod, packed_weights, True
 
 @internal
@@ -501,8 +821,8 @@ def _check_bands(_prev_ratio: uint256, _ratio: uint256, _packed_weight: uint256)
 @internal
 @pure
 def _calc_supply(_num_assets: uint256, _supply: uint256, _amplification: uint256, _vb_prod: uint256, _vb_sum: uint256, _up: bool) -> (uint256, uint256):
-    # s[n+1] = (A sum / w^n - s^(n+1) w^n /prod^n)) / (A w^n - 1)
-    #        = (l - s r) / d
+    # Newton's method on f(s) = l - d s - s r(s), r(s) = r[n] (s/s[n])^n
+    # s[n+1] = (l + n s r) / (d + (n + 1) r)
 
     l: uint256 = _amplification
     d: uint256 = l - PRECISION
@@ -512,11 +832,24 @@ def _calc_supply(_num_assets: uint256, _supply: uint256, _amplification: uint256
 
     num_assets: uint256 = _num_assets
     for _ in range(255):
-        sp: uint256 = unsafe_div(unsafe_sub(l, unsafe_mul(s, r)), d) # (l - s * r) / d
-        for i in range(MAX_NUM_ASSETS):
-            if i == num_assets:
+        sp: uint256 = unsafe_div(unsafe_add(l, unsafe_mul(unsafe_mul(num_assets, s), r)), unsafe_add(d, unsafe_mul(unsafe_add(num_assets, 1), r))) # (l + n s r) / (d + (n + 1) r)
+        if sp > unsafe_mul(s, MAX_SUPPLY_STEP):
+            # limit step, keeps the power of the ratio and its product with r within 256 bits
+            sp = unsafe_mul(s, MAX_SUPPLY_STEP)
+        precision: uint256 = PRECISION * PRECISION
+        if sp > unsafe_div(unsafe_mul(s, 14), 10):
+            precision = PRECISION
+        b: uint256 = unsafe_div(unsafe_mul(sp, precision), s) # sp / s
+        p: uint256 = precision
+        e: uint256 = num_assets
+        for i in range(6):
+            if e & 1 == 1:
+                p = unsafe_div(unsafe_mul(p, b), precision)
+            e = shift(e, -1)
+            if e == 0:
                 break
-            r = unsafe_div(unsafe_mul(r, sp), s) # r * sp / s
+            b = unsafe_div(unsafe_mul(b, b), precision)
+        r = r * p / precision # r * (sp / s)^n
         if sp >= s:
             if (sp - s) * PRECISION / s <= MAX_POW_REL_ERR:
                 if _up:
@@ -552,7 +885,10 @@ def _calc_vb(_wn: uint256, _y: uint256, _supply: uint256, _amplification: uint25
     b += _vb_sum
     f: uint256 = PRECISION * PRECISION / _wn
 
+    # the root is above the constant sum solution, start no lower than that
     y: uint256 = _y
+    if d > b and y < d - b:
+        y = d - b
     for _ in range(255):
         yp: uint256 = (y + b + d * f / PRECISION + c * f / self._pow_up(y, _wn) - b * f / PRECISION - d) * y / (f * y / PRECISION + y + b - d)
         if yp >= y:
@@ -569,8 +905,23 @@ def _calc_vb(_wn: uint256, _y: uint256, _supply: uint256, _amplification: uint25
 
 @internal
 @pure
-def _pack_weight(_weight: uint256, _target: uint256, _lower: uint256, _upper: uint256) -> uint256:
-    return unsafe_div(_weight, WEIGHT_SCALE) | shift(unsafe_div(_target, WEIGHT_SCALE), -TARGET_WEIGHT_SHIFT) | shift(unsafe_div(_lower, WEIGHT_SCALE), -LOWER_BAND_SHIFT) | shift(unsafe_div(_upper, WEIGHT_SCALE), -UPPER_BAND_SHIFT)
+def _slope(_amplification: uint256, _supply: uint256, _vb_prod: uint256, _vb: uint256, _wn: uint256) -> uint256:
+    # partial derivative of the invariant to a virtual balance: A f^n + D pi v_i / x_i
+    return _amplification + _supply * _vb_prod / _vb * _wn / PRECISION
+
+@internal
+@pure
+def _ramp_weight(_packed: uint256, _progress: uint256) -> uint256:
+    # interpolate weight towards target weight
+    if _progress == 0:
+        return _packed
+    weight: uint256 = _packed & WEIGHT_MASK
+    target: uint256 = shift(_packed, TARGET_WEIGHT_SHIFT) & WEIGHT_MASK
+    if weight > target:
+        weight = unsafe_sub(weight, unsafe_div(unsafe_mul(unsafe_sub(weight, target), _progress), PRECISION))
+    else:
+        weight = unsafe_add(weight, unsafe_div(unsafe_mul(unsafe_sub(target, weight), _progress), PRECISION))
+    return unsafe_sub(_packed, _packed & WEIGHT_MASK) | weight
 
 @internal
 @pure
@@ -586,7 +937,13 @@ def _unpack_wn(_packed: uint256, _num_assets: uint256) -> uint256:
 @pure
 def _pow_up(_x: uint256, _y: uint256) -> uint256:
     # guaranteed to be >= the actual value
-    p: uint256 = self._pow(_x, _y)
+    p: uint256 = 0
+    if _y % POW_EXACT_STEP == 0:
+        if _y < POW_EXACT_BOUND and _x > 0:
+            p = self._pow_exact(_x, _y, True)
+            if p > 0:
+                return p
+    p = self._pow(_x, _y)
     if p == 0:
         return 0
     # p + (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
@@ -596,7 +953,13 @@ def _pow_up(_x: uint256, _y: uint256) -> uint256:
 @pure
 def _pow_down(_x: uint256, _y: uint256) -> uint256:
     # guaranteed to be <= the actual value
-    p: uint256 = self._pow(_x, _y)
+    p: uint256 = 0
+    if _y % POW_EXACT_STEP == 0:
+        if _y < POW_EXACT_BOUND and _x > 0:
+            p = self._pow_exact(_x, _y, False)
+            if p > 0:
+                return p
+    p = self._pow(_x, _y)
     if p == 0:
         return 0
     # (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
@@ -605,6 +968,47 @@ def _pow_down(_x: uint256, _y: uint256) -> uint256:
         return 0
     return unsafe_sub(p, e)
 
+@internal
+@pure
+def _pow_exact(_x: uint256, _y: uint256, _up: bool) -> uint256:
+    # x^y by squaring, for integer and half-integer exponents below 256
+    # every step is rounded in the same direction, zero if it cannot be calculated this way
+    r: uint256 = PRECISION
+    if _y % PRECISION != 0:
+        # half-integer, start from sqrt(x)
+        if _x > max_value(uint256) / PRECISION:
+            return 0
+        s: uint256 = unsafe_mul(_x, PRECISION)
+        r = isqrt(s)
+        if _up and unsafe_mul(r, r) < s:
+            r = unsafe_add(r, 1)
+
+    b: uint256 = _x
+    n: uint256 = _y / PRECISION
+    for _ in range(8):
+        if n % 2 == 1:
+            r = self._mul_exact(r, b, _up)
+            if r == 0:
+                return 0
+        n = shift(n, -1)
+        if n == 0:
+            break
+        b = self._mul_exact(b, b, _up)
+        if b == 0:
+            return 0
+    return r
+
+@internal
+@pure
+def _mul_exact(_a: uint256, _b: uint256, _up: bool) -> uint256:
+    # a * b in 18 decimals, zero on overflow
+    if _a > max_value(uint256) / _b:
+        return 0
+    p: uint256 = unsafe_mul(_a, _b)
+    if _up and p % PRECISION > 0:
+        return unsafe_add(unsafe_div(p, PRECISION), 1)
+    return unsafe_div(p, PRECISION)
+
 @internal
 @pure
 def _pow(_x: uint256, _y: uint256) -> uint256:
@@ -631,6 +1035,48 @@ def _pow(_x: uint256, _y: uint256) -> uint256:
     l = unsafe_div(l, E18)
     return convert(self._exp(l), uint256)
 
+@internal
+@pure
+def _log_pow(_x: uint256, _y: uint256) -> int256:
+    # y log x, same as the first part of `_pow`
+    assert _x > 0 and shift(_x, -255) == 0 # dev: x out of bounds
+    assert _y < MILD_EXP_BOUND # dev: y out of bounds
+
+    x: int256 = convert(_x, int256)
+    y: int256= convert(_y, int256)
+    l: int256 = 0
+    if x > LOG36_LOWER and x < LOG36_UPPER:
+        l = self._log36(x)
+        # l / E18 * y + (l % E18) * y / E18
+        l = unsafe_add(unsafe_mul(unsafe_div(l, E18), y), unsafe_div(unsafe_mul(l % E18, y), E18))
+    else:
+        l = unsafe_mul(self._log(x), y)
+    return unsafe_div(l, E18)
+
+@internal
+@pure
+def _exp_up(_l: int256) -> uint256:
+    # guaranteed to be >= the actual value of e^l, for sums of up to `MAX_NUM_ASSETS` `_log_pow` terms
+    if _l < MIN_NAT_EXP:
+        # e^MIN_NAT_EXP < 2 wei
+        return 2
+    p: uint256 = convert(self._exp(_l), uint256)
+    # p + (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    return unsafe_add(unsafe_add(p, unsafe_div(unsafe_sub(unsafe_mul(p, MAX_POW_REL_ERR), 1), PRECISION)), 1)
+
+@internal
+@pure
+def _exp_down(_l: int256) -> uint256:
+    # guaranteed to be <= the actual value of e^l, for sums of up to `MAX_NUM_ASSETS` `_log_pow` terms
+    if _l < MIN_NAT_EXP:
+        return 0
+    p: uint256 = convert(self._exp(_l), uint256)
+    # (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    e: uint256 = unsafe_add(unsafe_div(unsafe_sub(unsafe_mul(p, MAX_POW_REL_ERR), 1), PRECISION), 1)
+    if p < e:
+        return 0
+    return unsafe_sub(p, e)
+
 @internal
 @pure
 def _log36(_x: int256) -> int256:
@@ -13,12 +13,15 @@ E18: constant(int256)              = E3 * E15
 E20: constant(int256)              = E3 * E17
 E36: constant(int256)              = E18 * E18
 MAX_POW_REL_ERR: constant(uint256) = 100 # 1e-16
+POW_EXACT_STEP: constant(uint256)  = PRECISION / 2
+POW_EXACT_BOUND: constant(uint256) = 256 * PRECISION
 MIN_NAT_EXP: constant(int256)      = -41 * E18
 MAX_NAT_EXP: constant(int256)      = 130 * E18
 LOG36_LOWER: constant(int256)      = E18 - E17
 LOG36_UPPER: constant(int256)      = E18 + E17
 MILD_EXP_BOUND: constant(uint256)  = 2**254 / 100_000_000_000_000_000_000
 MAX_N: constant(uint256)           = 32
+MAX_BATCH: constant(uint256)       = 256
 PRECISION: constant(uint256)       = 1_000_000_000_000_000_000
 
 # x_n = 2^(7-n), a_n = exp(x_n)
@@ -48,6 +51,19 @@ A10: constant(int256) = 11_331_4845_306_682_631_683
 X11: constant(int256) = X10 / 2
 A11: constant(int256) = 1_064_49_445_891_785_942_956
 
+# rational approximations of exp and log, in 2^96 binary fixed point
+Q96: constant(int256)             = 2**96
+LN2_Q96: constant(int256)         = 54_916_777_467_707_473_351_141_471_128 # ln(2) * 2^96
+RAT_EXP_MIN: constant(int256)     = -41_446_531_673_892_822_313 # e^x < 0.5 / E18
+RAT_EXP_K_OFFSET: constant(int256) = 2**95 + 64 * 2**96 # rounding and offset to keep the division positive
+RAT_EXP_P0: constant(int256)      = 4_385_272_521_454_847_904_659_076_985_693_276 * 2**96
+RAT_EXP_SCALE: constant(uint256)  = 3_822_833_074_963_236_453_042_738_258_902_158_003_155_416_615_667
+RAT_LOG_P0: constant(int256)      = 795_164_235_651_350_426_258_249_787_498 * 2**96
+RAT_LOG_SCALE: constant(int256)   = 1_677_202_110_996_718_588_342_820_967_067_443_963_516_166
+RAT_LOG_LN2: constant(int256)     = 16_597_577_552_685_614_221_487_285_958_193_947_469_193_820_559_219_878_177_908_093_499_208_371
+RAT_LOG_OFFSET: constant(int256)  = 600_920_179_829_731_861_736_702_779_321_621_459_595_472_258_049_074_101_567_377_883_020_018_308
+RAT_LOG_BASE: constant(int256)    = 2**174
+
 WEIGHT_MASK: constant(uint256) = 2**85 - 1
 LOWER_BAND_SHIFT: constant(int128) = -85
 UPPER_BAND_SHIFT: constant(int128) = -170
@@ -61,7 +77,13 @@ def pow_up(_x: uint256, _y: uint256) -> uint256:
 @pure
 def _pow_up(_x: uint256, _y: uint256) -> uint256:
     # guaranteed to be >= the actual value
-    p: uint256 = self._pow(_x, _y)
+    p: uint256 = 0
+    if _y % POW_EXACT_STEP == 0:
+        if _y < POW_EXACT_BOUND and _x > 0:
+            p = self._pow_exact(_x, _y, True)
+            if p > 0:
+                return p
+    p = self._pow(_x, _y)
     if p == 0:
         return 0
     # p + (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
@@ -76,7 +98,13 @@ def pow_down(_x: uint256, _y: uint256) -> uint256:
 @pure
 def _pow_down(_x: uint256, _y: uint256) -> uint256:
     # guaranteed to be <= the actual value
-    p: uint256 = self._pow(_x, _y)
+    p: uint256 = 0
+    if _y % POW_EXACT_STEP == 0:
+        if _y < POW_EXACT_BOUND and _x > 0:
+            p = self._pow_exact(_x, _y, False)
+            if p > 0:
+                return p
+    p = self._pow(_x, _y)
     if p == 0:
         return 0
     # (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
@@ -85,6 +113,47 @@ def _pow_down(_x: uint256, _y: uint256) -> uint256:
         return 0
     return unsafe_sub(p, e)
 
+@internal
+@pure
+def _pow_exact(_x: uint256, _y: uint256, _up: bool) -> uint256:
+    # x^y by squaring, for integer and half-integer exponents below 256
+    # every step is rounded in the same direction, zero if it cannot be calculated this way
+    r: uint256 = PRECISION
+    if _y % PRECISION != 0:
+        # half-integer, start from sqrt(x)
+        if _x > max_value(uint256) / PRECISION:
+            return 0
+        s: uint256 = unsafe_mul(_x, PRECISION)
+        r = isqrt(s)
+        if _up and unsafe_mul(r, r) < s:
+            r = unsafe_add(r, 1)
+
+    b: uint256 = _x
+    n: uint256 = _y / PRECISION
+    for _ in range(8):
+        if n % 2 == 1:
+            r = self._mul_exact(r, b, _up)
+            if r == 0:
+                return 0
+        n = shift(n, -1)
+        if n == 0:
+            break
+        b = self._mul_exact(b, b, _up)
+        if b == 0:
+            return 0
+    return r
+
+@internal
+@pure
+def _mul_exact(_a: uint256, _b: uint256, _up: bool) -> uint256:
+    # a * b in 18 decimals, zero on overflow
+    if _a > max_value(uint256) / _b:
+        return 0
+    p: uint256 = unsafe_mul(_a, _b)
+    if _up and p % PRECISION > 0:
+        return unsafe_add(unsafe_div(p, PRECISION), 1)
+    return unsafe_div(p, PRECISION)
+
 @internal
 @pure
 def _pow(_x: uint256, _y: uint256) -> uint256:
@@ -129,6 +198,56 @@ def ln36(_a: uint256) -> int256:
 def exponent(x: int256) -> int256:
     return self._exp(x)
 
+@external
+@pure
+def pow_up_many(_x: DynArray[uint256, MAX_BATCH], _y: DynArray[uint256, MAX_BATCH]) -> DynArray[uint256, MAX_BATCH]:
+    # evaluate a batch of inputs in a single call
+    assert len(_x) == len(_y)
+    res: DynArray[uint256, MAX_BATCH] = []
+    for i in range(MAX_BATCH):
+        if i == len(_x):
+            break
+        res.append(self._pow_up(_x[i], _y[i]))
+    return res
+
+@external
+@pure
+def pow_down_many(_x: DynArray[uint256, MAX_BATCH], _y: DynArray[uint256, MAX_BATCH]) -> DynArray[uint256, MAX_BATCH]:
+    assert len(_x) == len(_y)
+    res: DynArray[uint256, MAX_BATCH] = []
+    for i in range(MAX_BATCH):
+        if i == len(_x):
+            break
+        res.append(self._pow_down(_x[i], _y[i]))
+    return res
+
+@external
+@pure
+def ln_many(_a: DynArray[uint256, MAX_BATCH]) -> DynArray[int256, MAX_BATCH]:
+    res: DynArray[int256, MAX_BATCH] = []
+    for a in _a:
+        assert a > 0 # dev: out of bounds
+        res.append(self._log(convert(a, int256)))
+    return res
+
+@external
+@pure
+def ln36_many(_a: DynArray[uint256, MAX_BATCH]) -> DynArray[int256, MAX_BATCH]:
+    res: DynArray[int256, MAX_BATCH] = []
+    for v in _a:
+        a: int256 = convert(v, int256)
+        assert a > LOG36_LOWER and a < LOG36_UPPER
+        res.append(self._log36(a))
+    return res
+
+@external
+@pure
+def exponent_many(_x: DynArray[int256, MAX_BATCH]) -> DynArray[int256, MAX_BATCH]:
+    res: DynArray[int256, MAX_BATCH] = []
+    for x in _x:
+        res.append(self._exp(x))
+    return res
+
 @internal
 @pure
 def _log36(_x: int256) -> int256:
@@ -329,6 +448,232 @@ def __exp(_x: int256) -> int256:
     # p * c / E20 * f / 100
     return unsafe_div(unsafe_mul(unsafe_div(unsafe_mul(p, c), E20), f), 100)
 
+@external
+@pure
+def exponent_rational(x: int256) -> int256:
+    assert x >= MIN_NAT_EXP and x <= MAX_NAT_EXP
+    return self.__exp_rational(x)
+
+@external
+@pure
+def ln_rational(_a: uint256) -> int256:
+    assert _a > 0 # dev: out of bounds
+    return self.__log_rational(convert(_a, int256))
+
+@external
+@pure
+def exponent_rational_many(_x: DynArray[int256, MAX_BATCH]) -> DynArray[int256, MAX_BATCH]:
+    res: DynArray[int256, MAX_BATCH] = []
+    for x in _x:
+        assert x >= MIN_NAT_EXP and x <= MAX_NAT_EXP
+        res.append(self.__exp_rational(x))
+    return res
+
+@external
+@pure
+def ln_rational_many(_a: DynArray[uint256, MAX_BATCH]) -> DynArray[int256, MAX_BATCH]:
+    res: DynArray[int256, MAX_BATCH] = []
+    for a in _a:
+        assert a > 0 # dev: out of bounds
+        res.append(self.__log_rational(convert(a, int256)))
+    return res
+
+@external
+@pure
+def pow_rational_many(_x: DynArray[uint256, MAX_BATCH], _y: DynArray[uint256, MAX_BATCH]) -> (DynArray[uint256, MAX_BATCH], DynArray[uint256, MAX_BATCH]):
+    # x^y rounded up and down, same as `pow_up` and `pow_down` on the general path
+    assert len(_x) == len(_y)
+    up: DynArray[uint256, MAX_BATCH] = []
+    down: DynArray[uint256, MAX_BATCH] = []
+    for i in range(MAX_BATCH):
+        if i == len(_x):
+            break
+        p: uint256 = self._pow_rational(_x[i], _y[i])
+        if p == 0:
+            up.append(0)
+            down.append(0)
+            continue
+        # (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+        e: uint256 = unsafe_add(unsafe_div(unsafe_sub(unsafe_mul(p, MAX_POW_REL_ERR), 1), PRECISION), 1)
+        up.append(unsafe_add(p, e))
+        if p < e:
+            down.append(0)
+        else:
+            down.append(unsafe_sub(p, e))
+    return up, down
+
+@external
+@view
+def gas_exp(_x: DynArray[int256, MAX_BATCH], _rational: bool) -> uint256:
+    # total gas of evaluating every input, for benchmarks
+    r: int256 = 0
+    gas: uint256 = msg.gas
+    if _rational:
+        for x in _x:
+            r = self.__exp_rational(x)
+    else:
+        for x in _x:
+            r = self._exp(x)
+    return gas - msg.gas
+
+@external
+@view
+def gas_log(_a: DynArray[int256, MAX_BATCH], _rational: bool) -> uint256:
+    r: int256 = 0
+    gas: uint256 = msg.gas
+    if _rational:
+        for a in _a:
+            r = self.__log_rational(a)
+    else:
+        for a in _a:
+            r = self._log(a)
+    return gas - msg.gas
+
+@external
+@view
+def gas_pow(_x: DynArray[uint256, MAX_BATCH], _y: DynArray[uint256, MAX_BATCH], _rational: bool) -> uint256:
+    assert len(_x) == len(_y)
+    r: uint256 = 0
+    gas: uint256 = msg.gas
+    if _rational:
+        for i in range(MAX_BATCH):
+            if i == len(_x):
+                break
+            r = self._pow_rational(_x[i], _y[i])
+    else:
+        for i in range(MAX_BATCH):
+            if i == len(_x):
+                break
+            r = self._pow(_x[i], _y[i])
+    return gas - msg.gas
+
+@internal
+@pure
+def _pow_rational(_x: uint256, _y: uint256) -> uint256:
+    # same as `_pow`, with the rational approximations outside of the `ln36` band
+    if _y == 0:
+        return convert(E18, uint256) # x^0 == 1
+
+    if _x == 0:
+        return 0 # 0^y == 0
+
+    assert shift(_x, -255) == 0 # dev: x out of bounds
+    assert _y < MILD_EXP_BOUND # dev: y out of bounds
+
+    x: int256 = convert(_x, int256)
+    y: int256= convert(_y, int256)
+    l: int256 = 0
+    if x > LOG36_LOWER and x < LOG36_UPPER:
+        l = self._log36(x)
+        # l / E18 * y + (l % E18) * y / E18
+        l = unsafe_add(unsafe_mul(unsafe_div(l, E18), y), unsafe_div(unsafe_mul(l % E18, y), E18))
+    else:
+        l = unsafe_mul(self.__log_rational(x), y)
+    l = unsafe_div(l, E18)
+    assert l >= MIN_NAT_EXP and l <= MAX_NAT_EXP
+    return convert(self.__exp_rational(l), uint256)
+
+@internal
+@pure
+def __exp_rational(_x: int256) -> int256:
+    # e^x = 2^k e^r, k = round(x / ln 2), |r| <= ln(2) / 2
+    # e^r with a (6, 7)-term rational approximation, without the branches and 1/e^-x of `_exp`
+    # adapted from `wadExp` at https://github.com/transmissions11/solmate/blob/main/src/utils/SignedWadMath.sol
+    if _x <= RAT_EXP_MIN:
+        return 0
+
+    # to 2^96 basis: x * 2^96 / E18 = x * 2^78 / 5^18
+    x: int256 = unsafe_div(unsafe_mul(_x, 2**78), 5**18)
+    k: int256 = unsafe_sub(unsafe_div(unsafe_add(unsafe_div(unsafe_mul(x, Q96), LN2_Q96), RAT_EXP_K_OFFSET), Q96), 64)
+    x = unsafe_sub(x, unsafe_mul(k, LN2_Q96))
+
+    # p is monic and left in 2^192 basis, so the division is back in 2^96
+    y: int256 = unsafe_add(x, 1346386616545796478920950773328)
+    y = unsafe_add(unsafe_div(unsafe_mul(y, x), Q96), 57155421227552351082224309758442)
+    p: int256 = unsafe_sub(unsafe_add(y, x), 94201549194550492254356042504812)
+    p = unsafe_add(unsafe_div(unsafe_mul(p, y), Q96), 28719021644029726153956944680412240)
+    p = unsafe_add(unsafe_mul(p, x), RAT_EXP_P0)
+
+    # q has no real roots
+    q: int256 = unsafe_sub(x, 2855989394907223263936484059900)
+    q = unsafe_add(unsafe_div(unsafe_mul(q, x), Q96), 50020603652535783019961831881945)
+    q = unsafe_sub(unsafe_div(unsafe_mul(q, x), Q96), 533845033583426703283633433725380)
+    q = unsafe_add(unsafe_div(unsafe_mul(q, x), Q96), 3604857256930695427073651918091429)
+    q = unsafe_sub(unsafe_div(unsafe_mul(q, x), Q96), 14423608567350463180887372962807573)
+    q = unsafe_add(unsafe_div(unsafe_mul(q, x), Q96), 26449188498355588339934803723976023)
+
+    # r in (0.09, 0.25) * 2^96
+    r: uint256 = convert(unsafe_div(p, q), uint256)
+
+    # scale factor, 2^k and conversion to 18 decimals at once, k in [-61, 195]
+    return convert(shift(unsafe_mul(r, RAT_EXP_SCALE), convert(unsafe_sub(k, 195), int128)), int256)
+
+@internal
+@pure
+def __log_rational(_a: int256) -> int256:
+    # log a = k log 2 + log(a / 2^k), 1 <= a / 2^k < 2
+    # log of the remainder with an (8, 8)-term rational approximation, in 2^96 basis
+    # the conversion from 18 decimals is added as a constant at the end
+    # adapted from `wadLn` at https://github.com/transmissions11/solmate/blob/main/src/utils/SignedWadMath.sol
+    a: uint256 = convert(_a, uint256)
+
+    # most significant bit
+    m: uint256 = 0
+    v: uint256 = a
+    if v >= 2**128:
+        v = shift(v, -128)
+        m = 128
+    if v >= 2**64:
+        v = shift(v, -64)
+        m = unsafe_add(m, 64)
+    if v >= 2**32:
+        v = shift(v, -32)
+        m = unsafe_add(m, 32)
+    if v >= 2**16:
+        v = shift(v, -16)
+        m = unsafe_add(m, 16)
+    if v >= 2**8:
+        v = shift(v, -8)
+        m = unsafe_add(m, 8)
+    if v >= 2**4:
+        v = shift(v, -4)
+        m = unsafe_add(m, 4)
+    if v >= 2**2:
+        v = shift(v, -2)
+        m = unsafe_add(m, 2)
+    if v >= 2:
+        m = unsafe_add(m, 1)
+
+    k: int256 = unsafe_sub(convert(m, int256), 96)
+    x: int256 = convert(shift(a, convert(-k, int128)), int256)
+
+    # p is monic and left in 2^192 basis, so the division is back in 2^96
+    p: int256 = unsafe_add(x, 3273285459638523848632254066296)
+    p = unsafe_add(unsafe_div(unsafe_mul(p, x), Q96), 24828157081833163892658089445524)
+    p = unsafe_add(unsafe_div(unsafe_mul(p, x), Q96), 43456485725739037958740375743393)
+    p = unsafe_sub(unsafe_div(unsafe_mul(p, x), Q96), 11111509109440967052023855526967)
+    p = unsafe_sub(unsafe_div(unsafe_mul(p, x), Q96), 45023709667254063763336534515857)
+    p = unsafe_sub(unsafe_div(unsafe_mul(p, x), Q96), 14706773417378608786704636184526)
+    p = unsafe_sub(unsafe_mul(p, x), RAT_LOG_P0)
+
+    # q is monic, with no roots on [1, 2)
+    q: int256 = unsafe_add(x, 5573035233440673466300451813936)
+    q = unsafe_add(unsafe_div(unsafe_mul(q, x), Q96), 71694874799317883764090561454958)
+    q = unsafe_add(unsafe_div(unsafe_mul(q, x), Q96), 283447036172924575727196451306956)
+    q = unsafe_add(unsafe_div(unsafe_mul(q, x), Q96), 401686690394027663651624208769553)
+    q = unsafe_add(unsafe_div(unsafe_mul(q, x), Q96), 204048457590392012362485061816622)
+    q = unsafe_add(unsafe_div(unsafe_mul(q, x), Q96), 31853899698501571402653359427138)
+    q = unsafe_add(unsafe_div(unsafe_mul(q, x), Q96), 909429971244387300277376558375)
+
+    # r in (0, 0.125) * 2^96
+    r: int256 = unsafe_div(p, q)
+
+    # scale factor, k log 2 and log(2^96 / E18), in 5^18 * 2^192 basis, then to 18 decimals
+    r = unsafe_mul(r, RAT_LOG_SCALE)
+    r = unsafe_add(r, unsafe_mul(RAT_LOG_LN2, k))
+    r = unsafe_add(r, RAT_LOG_OFFSET)
+    return unsafe_div(r, RAT_LOG_BASE)
+
 @external
 @pure
 def pack_weight(_weight: uint256, _lower: uint256, _upper: uint256) -> uint256:
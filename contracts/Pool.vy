@@ -32,12 +32,14 @@ paused: public(bool)
 killed: public(bool)
 swap_fee_rate: public(uint256)
 ramp_step: public(uint256)
-ramp_last_time: public(uint256)
+packed_ramp: uint256 # ramp last time (128) | ramp progress (128)
 ramp_stop_time: public(uint256)
 target_amplification: public(uint256)
+# ramp progress: fraction of the way from stored to target weights at ramp last time
 packed_pool_vb: uint256 # vb_prod (128) | vb_sum (128)
 # vb_prod: pi, product term `product((w_i * D / x_i)^(w_i n))`
 # vb_sum: sigma, sum term `sum(x_i)`
+packed_rate_refresh: uint256 # block number (224) | flags of assets whose rate was read in that block (32)
 
 event Swap:
     account: indexed(address)
@@ -123,9 +125,14 @@ event SetGuardian:
 
 PRECISION: constant(uint256) = 1_000_000_000_000_000_000
 MAX_NUM_ASSETS: constant(uint256) = 32
+MAX_SUPPLY_STEP: constant(uint256) = 2 # largest ratio between consecutive iterates in `_calc_supply`
 ALL_ASSETS_FLAG: constant(uint256) = 14528991250861404666834535435384615765856667510756806797353855100662256435713 # sum((i+1) << 8*i)
 POOL_VB_MASK: constant(uint256) = 2**128 - 1
 POOL_VB_SHIFT: constant(int128) = -128
+RAMP_MASK: constant(uint256) = 2**128 - 1
+RAMP_PROGRESS_SHIFT: constant(int128) = -128
+RATE_REFRESH_MASK: constant(uint256) = 2**32 - 1
+RATE_REFRESH_SHIFT: constant(int128) = -32
 
 VB_MASK: constant(uint256) = 2**96 - 1
 RATE_MASK: constant(uint256) = 2**80 - 1
@@ -149,6 +156,8 @@ E18: constant(int256)              = E3 * E15
 E20: constant(int256)              = 100 * E18
 E36: constant(int256)              = E18 * E18
 MAX_POW_REL_ERR: constant(uint256) = 100 # 1e-16
+POW_EXACT_STEP: constant(uint256)  = PRECISION / 2
+POW_EXACT_BOUND: constant(uint256) = 256 * PRECISION
 MIN_NAT_EXP: constant(int256)      = -41 * E18
 MAX_NAT_EXP: constant(int256)      = 130 * E18
 LOG36_LOWER: constant(int256)      = E18 - E17
@@ -256,36 +265,47 @@ def swap(
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
     vb_prod, vb_sum = self._unpack_pool_vb(self.packed_pool_vb)
-    vb_prod, vb_sum = self._update_rates(unsafe_add(_i, 1) | shift(unsafe_add(_j, 1), 8), vb_prod, vb_sum)
+    progress: uint256 = 0
+    vb_prod, vb_sum, progress = self._update_rates(unsafe_add(_i, 1) | shift(unsafe_add(_j, 1), 8), vb_prod, vb_sum, False)
     prev_vb_sum: uint256 = vb_sum
 
     prev_vb_x: uint256 = 0
     rate_x: uint256 = 0
     packed_weight_x: uint256 = 0
     prev_vb_x, rate_x, packed_weight_x = self._unpack_vb(self.packed_vbs[_i])
-    wn_x: uint256 = self._unpack_wn(packed_weight_x, num_assets)
+    weight_x: uint256 = self._ramp_weight(packed_weight_x, progress)
+    wn_x: uint256 = self._unpack_wn(weight_x, num_assets)
 
     prev_vb_y: uint256 = 0
     rate_y: uint256 = 0
     packed_weight_y: uint256 = 0
     prev_vb_y, rate_y, packed_weight_y = self._unpack_vb(self.packed_vbs[_j])
-    wn_y: uint256 = self._unpack_wn(packed_weight_y, num_assets)
+    weight_y: uint256 = self._ramp_weight(packed_weight_y, progress)
+    wn_y: uint256 = self._unpack_wn(weight_y, num_assets)
 
     dx_fee: uint256 = _dx * self.swap_fee_rate / PRECISION
     dvb_x: uint256 = (_dx - dx_fee) * rate_x / PRECISION
     vb_x: uint256 = prev_vb_x + dvb_x
+
+    # initial guess along the tangent of the invariant
+    vb_y: uint256 = dvb_x * self._slope(self.amplification, self.supply, vb_prod, prev_vb_x, wn_x) / \
+        self._slope(self.amplification, self.supply, vb_prod, prev_vb_y, wn_y)
+    if vb_y < prev_vb_y / 2:
+        vb_y = prev_vb_y - vb_y
+    else:
+        vb_y = prev_vb_y / 2
     
     # update x_i and remove x_j from variables
     vb_prod = vb_prod * self._pow_up(prev_vb_y, wn_y) / self._pow_down(vb_x * PRECISION / prev_vb_x, wn_x)
     vb_sum = vb_sum + dvb_x - prev_vb_y
 
     # calulate new balance of out token
-    vb_y: uint256 = self._calc_vb(wn_y, prev_vb_y, self.supply, self.amplification, vb_prod, vb_sum)
+    vb_y = self._calc_vb(wn_y, vb_y, self.supply, self.amplification, vb_prod, vb_sum)
     vb_sum += vb_y
 
     # check bands
-    self._check_bands(prev_vb_x * PRECISION / prev_vb_sum, vb_x * PRECISION / vb_sum, packed_weight_x)
-    self._check_bands(prev_vb_y * PRECISION / prev_vb_sum, vb_y * PRECISION / vb_sum, packed_weight_y)
+    self._check_bands(prev_vb_x * PRECISION / prev_vb_sum, vb_x * PRECISION / vb_sum, weight_x)
+    self._check_bands(prev_vb_y * PRECISION / prev_vb_sum, vb_y * PRECISION / vb_sum, weight_y)
 
     dy: uint256 = (prev_vb_y - vb_y) * PRECISION / rate_y
     assert dy >= _min_dy, "slippage"
@@ -343,30 +363,37 @@ def swap_exact_out(
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
     vb_prod, vb_sum = self._unpack_pool_vb(self.packed_pool_vb)
-    vb_prod, vb_sum = self._update_rates(unsafe_add(_i, 1) | shift(unsafe_add(_j, 1), 8), vb_prod, vb_sum)
+    progress: uint256 = 0
+    vb_prod, vb_sum, progress = self._update_rates(unsafe_add(_i, 1) | shift(unsafe_add(_j, 1), 8), vb_prod, vb_sum, False)
     prev_vb_sum: uint256 = vb_sum
 
     prev_vb_x: uint256 = 0
     rate_x: uint256 = 0
     packed_weight_x: uint256 = 0
     prev_vb_x, rate_x, packed_weight_x = self._unpack_vb(self.packed_vbs[_i])
-    wn_x: uint256 = self._unpack_wn(packed_weight_x, num_assets)
+    weight_x: uint256 = self._ramp_weight(packed_weight_x, progress)
+    wn_x: uint256 = self._unpack_wn(weight_x, num_assets)
 
     prev_vb_y: uint256 = 0
     rate_y: uint256 = 0
     packed_weight_y: uint256 = 0
     prev_vb_y, rate_y, packed_weight_y = self._unpack_vb(self.packed_vbs[_j])
-    wn_y: uint256 = self._unpack_wn(packed_weight_y, num_assets)
+    weight_y: uint256 = self._ramp_weight(packed_weight_y, progress)
+    wn_y: uint256 = self._unpack_wn(weight_y, num_assets)
 
     dvb_y: uint256 = _dy * rate_y / PRECISION
     vb_y: uint256 = prev_vb_y - dvb_y
 
+    # initial guess along the tangent of the invariant
+    vb_x: uint256 = prev_vb_x + dvb_y * self._slope(self.amplification, self.supply, vb_prod, prev_vb_y, wn_y) / \
+        self._slope(self.amplification, self.supply, vb_prod, prev_vb_x, wn_x)
+
     # update x_j and remove x_i from variables
     vb_prod = vb_prod * self._pow_up(prev_vb_x, wn_x) / self._pow_down(vb_y * PRECISION / prev_vb_y, wn_y)
     vb_sum = vb_sum - dvb_y - prev_vb_x
 
     # calulate new balance of in token
-    vb_x: uint256 = self._calc_vb(wn_x, prev_vb_x, self.supply, self.amplification, vb_prod, vb_sum)
+    vb_x = self._calc_vb(wn_x, vb_x, self.supply, self.amplification, vb_prod, vb_sum)
     dx: uint256 = (vb_x - prev_vb_x) * PRECISION / rate_x
     dx_fee: uint256 = self.swap_fee_rate
     dx_fee = dx * dx_fee / (PRECISION - dx_fee)
@@ -376,8 +403,8 @@ def swap_exact_out(
     assert dx <= _max_dx, "slippage"
 
     # check bands
-    self._check_bands(prev_vb_x * PRECISION / prev_vb_sum, vb_x * PRECISION / vb_sum, packed_weight_x)
-    self._check_bands(prev_vb_y * PRECISION / prev_vb_sum, vb_y * PRECISION / vb_sum, packed_weight_y)
+    self._check_bands(prev_vb_x * PRECISION / prev_vb_sum, vb_x * PRECISION / vb_sum, weight_x)
+    self._check_bands(prev_vb_y * PRECISION / prev_vb_sum, vb_y * PRECISION / vb_sum, weight_y)
 
     # update variables
     self.packed_vbs[_i] = self._pack_vb(vb_x, rate_x, packed_weight_x)
@@ -440,11 +467,14 @@ def add_liquidity(
     assert sh > 0 # dev: need to deposit at least one asset
 
     # update rates
-    vb_prod, vb_sum = self._update_rates(assets, vb_prod, vb_sum)
+    progress: uint256 = 0
+    vb_prod, vb_sum, progress = self._update_rates(assets, vb_prod, vb_sum, False)
     prev_supply: uint256 = self.supply
 
     vb_prod_final: uint256 = vb_prod
     vb_sum_final: uint256 = vb_sum
+    log_prod_final: int256 = 0
+    log_prod: int256 = 0
     fee_rate: uint256 = self.swap_fee_rate / 2
     prev_vb_sum: uint256 = vb_sum
     prev_ratios: DynArray[uint256, MAX_NUM_ASSETS] = []
@@ -466,26 +496,32 @@ def add_liquidity(
 
         if prev_supply > 0:
             prev_ratios.append(prev_vb * PRECISION / prev_vb_sum)
+            if progress > 0:
+                packed_weight = self._ramp_weight(packed_weight, progress)
             wn: uint256 = self._unpack_wn(packed_weight, num_assets)
 
-            # update product and sum of virtual balances
-            vb_prod_final = vb_prod_final * self._pow_up(prev_vb * PRECISION / vb, wn) / PRECISION
+            # update product and sum of virtual balances, product in log space
+            log_prod_final = unsafe_add(log_prod_final, self._log_pow(prev_vb * PRECISION / vb, wn))
             # the `D^n` factor will be updated in `_calc_supply()`
             vb_sum_final += dvb
 
             # remove fees from balance and recalculate sum and product
             fee: uint256 = (dvb - prev_vb * lowest / PRECISION) * fee_rate / PRECISION
-            vb_prod = vb_prod * self._pow_up(prev_vb * PRECISION / (vb - fee), wn) / PRECISION
+            log_prod = unsafe_add(log_prod, self._log_pow(prev_vb * PRECISION / (vb - fee), wn))
             vb_sum += dvb - fee
         assert ERC20(self.assets[asset]).transferFrom(msg.sender, self, amount, default_return_value=True)
 
     supply: uint256 = prev_supply
     if prev_supply == 0:
         # initital deposit, calculate necessary variables
-        vb_prod, vb_sum = self._calc_vb_prod_sum()
+        vb_prod, vb_sum = self._calc_vb_prod_sum(progress)
         assert vb_prod > 0 # dev: amounts must be non-zero
         supply = vb_sum
     else:
+        # factor in all deposits at once
+        vb_prod_final = vb_prod_final * self._exp_up(log_prod_final) / PRECISION
+        vb_prod = vb_prod * self._exp_up(log_prod) / PRECISION
+
         # check bands
         j: uint256 = 0
         for asset in range(MAX_NUM_ASSETS):
@@ -494,6 +530,8 @@ def add_liquidity(
             if _amounts[asset] == 0:
                 continue
             vb, rate, packed_weight = self._unpack_vb(self.packed_vbs[asset])
+            if progress > 0:
+                packed_weight = self._ramp_weight(packed_weight, progress)
             self._check_bands(prev_ratios[j], vb * PRECISION / vb_sum_final, packed_weight)
             j = unsafe_add(j, 1)
 
@@ -542,7 +580,6 @@ def remove_liquidity(
     log RemoveLiquidity(msg.sender, _receiver, _lp_amount)
 
     # update necessary variables and transfer assets
-    vb_prod: uint256 = PRECISION
     vb_sum: uint256 = 0
 
     prev_vb: uint256 = 0
@@ -552,19 +589,18 @@ def remove_liquidity(
         if asset == num_assets:
             break
         prev_vb, rate, packed_weight = self._unpack_vb(self.packed_vbs[asset])
-        weight: uint256 = self._unpack_wn(packed_weight, 1)
-
         dvb: uint256 = prev_vb * _lp_amount / prev_supply
         vb: uint256 = prev_vb - dvb
         self.packed_vbs[asset] = self._pack_vb(vb, rate, packed_weight)
-        
-        vb_prod = unsafe_div(unsafe_mul(vb_prod, self._pow_down(unsafe_div(unsafe_mul(supply, weight), vb), unsafe_mul(weight, num_assets))), PRECISION)
         vb_sum = unsafe_add(vb_sum, vb)
 
         amount: uint256 = dvb * PRECISION / rate
         assert amount >= _min_amounts[asset], "slippage"
         assert ERC20(self.assets[asset]).transfer(_receiver, amount, default_return_value=True)
 
+    vb_prod: uint256 = 0
+    if supply > 0:
+        vb_prod = self._calc_vb_prod(supply, shift(self.packed_ramp, RAMP_PROGRESS_SHIFT))
     self.packed_pool_vb = self._pack_pool_vb(vb_prod, vb_sum)
 
 @external
@@ -590,7 +626,8 @@ def remove_liquidity_single(
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
     vb_prod, vb_sum = self._unpack_pool_vb(self.packed_pool_vb)
-    vb_prod, vb_sum = self._update_rates(unsafe_add(_asset, 1), vb_prod, vb_sum)
+    progress: uint256 = 0
+    vb_prod, vb_sum, progress = self._update_rates(unsafe_add(_asset, 1), vb_prod, vb_sum, False)
     prev_vb_sum: uint256 = vb_sum
 
     # update supply
@@ -603,7 +640,16 @@ def remove_liquidity_single(
     rate: uint256 = 0
     packed_weight: uint256 = 0
     prev_vb, rate, packed_weight = self._unpack_vb(self.packed_vbs[_asset])
-    wn: uint256 = self._unpack_wn(packed_weight, num_assets)
+    weight: uint256 = self._ramp_weight(packed_weight, progress)
+    wn: uint256 = self._unpack_wn(weight, num_assets)
+
+    # initial guess along the tangent of the invariant
+    vb: uint256 = _lp_amount * (self.amplification - PRECISION + (num_assets + 1) * vb_prod) / \
+        self._slope(self.amplification, prev_supply, vb_prod, prev_vb, wn)
+    if vb < prev_vb / 2:
+        vb = prev_vb - vb
+    else:
+        vb = prev_vb / 2
 
     # update variables
     vb_prod = vb_prod * self._pow_up(prev_vb, wn) / PRECISION
@@ -614,7 +660,7 @@ def remove_liquidity_single(
     vb_sum = vb_sum - prev_vb
 
     # calculate new balance of asset
-    vb: uint256 = self._calc_vb(wn, prev_vb, supply, self.amplification, vb_prod, vb_sum)
+    vb = self._calc_vb(wn, vb, supply, self.amplification, vb_prod, vb_sum)
     dvb: uint256 = prev_vb - vb
     fee: uint256 = dvb * self.swap_fee_rate / 2 / PRECISION
     dvb -= fee
@@ -631,12 +677,14 @@ def remove_liquidity_single(
         if asset == num_assets:
             break
         if asset == _asset:
-            self._check_bands(prev_vb * PRECISION / prev_vb_sum, vb * PRECISION / vb_sum, packed_weight)
+            self._check_bands(prev_vb * PRECISION / prev_vb_sum, vb * PRECISION / vb_sum, weight)
         else:
             vb_loop: uint256 = 0
             rate_loop: uint256 = 0
             packed_weight_loop: uint256 = 0
             vb_loop, rate_loop, packed_weight_loop = self._unpack_vb(self.packed_vbs[asset])
+            if progress > 0:
+                packed_weight_loop = self._ramp_weight(packed_weight_loop, progress)
             self._check_bands(vb_loop * PRECISION / prev_vb_sum, vb_loop * PRECISION / vb_sum, packed_weight_loop)
 
     if fee > 0:
@@ -655,6 +703,7 @@ def update_rates(_assets: DynArray[uint256, MAX_NUM_ASSETS]):
     @notice Update the stored rate of any of the pool's assets
     @param _assets Array of indices of assets to update
     @dev If no assets are passed in, every asset will be updated
+    @dev Always reads the rate providers, also for rates that have already been read in the current block
     """
     num_assets: uint256 = self.num_assets
     assets: uint256 = 0
@@ -668,8 +717,9 @@ def update_rates(_assets: DynArray[uint256, MAX_NUM_ASSETS]):
         assets = ALL_ASSETS_FLAG
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
+    progress: uint256 = 0
     vb_prod, vb_sum = self._unpack_pool_vb(self.packed_pool_vb)
-    vb_prod, vb_sum = self._update_rates(assets, vb_prod, vb_sum)
+    vb_prod, vb_sum, progress = self._update_rates(assets, vb_prod, vb_sum, True)
     self.packed_pool_vb = self._pack_pool_vb(vb_prod, vb_sum)
 
 @external
@@ -683,8 +733,9 @@ def update_weights() -> bool:
     updated: bool = False
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
+    progress: uint256 = 0
     vb_prod, vb_sum = self._unpack_pool_vb(self.packed_pool_vb)
-    vb_prod, updated = self._update_weights(vb_prod)
+    vb_prod, updated, progress = self._update_weights(vb_prod)
     if updated and vb_sum > 0:
         supply: uint256 = 0
         supply, vb_prod = self._update_supply(self.supply, vb_prod, vb_sum)
@@ -700,6 +751,18 @@ def vb_prod_sum() -> (uint256, uint256):
     """
     return self._unpack_pool_vb(self.packed_pool_vb)
 
+@external
+@view
+def rates_refreshed() -> uint256:
+    """
+    @notice Get the assets whose rate has been read from their provider in the current block
+    @return Integer where bit `i` is set if the rate of asset `i` has been read
+    """
+    packed: uint256 = self.packed_rate_refresh
+    if shift(packed, RATE_REFRESH_SHIFT) != block.number:
+        return 0
+    return packed & RATE_REFRESH_MASK
+
 @external
 @view
 def virtual_balance(_asset: uint256) -> uint256:
@@ -729,18 +792,37 @@ def weight(_asset: uint256) -> (uint256, uint256, uint256, uint256):
     @notice Get the weight of an asset
     @param _asset Index of the asset
     @return Tuple with weight, target weight, lower band width and upper weight band width
-    @dev Does not take into account any active ramp
+    @dev Weight as of the last ramp step, does not take into account any pending step
     """
     assert _asset < self.num_assets # dev: index out of bounds
     weight: uint256 = 0
     target: uint256 = 0
     lower: uint256 = 0
     upper: uint256 = 0
-    weight, target, lower, upper = self._unpack_weight(shift(self.packed_vbs[_asset], PACKED_WEIGHT_SHIFT))
-    if self.ramp_last_time == 0:
+    packed_ramp: uint256 = self.packed_ramp
+    weight, target, lower, upper = self._unpack_weight(self._ramp_weight(shift(self.packed_vbs[_asset], PACKED_WEIGHT_SHIFT), shift(packed_ramp, RAMP_PROGRESS_SHIFT)))
+    if packed_ramp == 0:
         target = weight
     return weight, target, lower, upper
 
+@external
+@view
+def ramp_last_time() -> uint256:
+    """
+    @notice Get the time of the last ramp step
+    @return Timestamp of the last step, or start of the ramp. Zero if no ramp is active
+    """
+    return self.packed_ramp & RAMP_MASK
+
+@external
+@view
+def ramp_progress() -> uint256:
+    """
+    @notice Get the progress of the active ramp as of the last step
+    @return Fraction of the way from the stored weights to the target weights (18 decimals)
+    """
+    return shift(self.packed_ramp, RAMP_PROGRESS_SHIFT)
+
 @external
 @view
 def packed_weight(_asset: uint256) -> uint256:
@@ -748,11 +830,41 @@ def packed_weight(_asset: uint256) -> uint256:
     @notice Get the packed weight of an asset in a packed format
     @param _asset Index of the asset
     @return Weight in packed format
-    @dev Does not take into account any active ramp
+    @dev Raw storage format: during a ramp the weight is the one at its start,
+        the current weight is interpolated towards the target by `ramp_progress`
     """
     assert _asset < self.num_assets # dev: index out of bounds
     return shift(self.packed_vbs[_asset], PACKED_WEIGHT_SHIFT)
 
+@external
+@view
+def get_state() -> (
+    uint256, uint256, uint256, uint256, uint256, uint256, uint256, uint256, uint256,
+    DynArray[uint256, MAX_NUM_ASSETS], DynArray[address, MAX_NUM_ASSETS]
+):
+    """
+    @notice Get a snapshot of the pool state in a single call
+    @return Tuple with supply, amplification, target amplification, swap fee rate,
+        ramp step, packed ramp, ramp stop time, packed pool virtual balance,
+        packed rate refresh, packed virtual balances and assets
+    @dev Values are returned in their raw storage format and do not take into account
+        any pending rate update or active ramp. The packed ramp holds the ramp last time
+        and progress, see `ramp_last_time` and `ramp_progress`. Target weights in the packed
+        virtual balances are only meaningful while the ramp last time is non-zero.
+        The packed rate refresh holds a block number and the flags of the assets whose rate
+        was read in that block, see `rates_refreshed`
+    """
+    num_assets: uint256 = self.num_assets
+    packed_vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    assets: DynArray[address, MAX_NUM_ASSETS] = []
+    for asset in range(MAX_NUM_ASSETS):
+        if asset == num_assets:
+            break
+        packed_vbs.append(self.packed_vbs[asset])
+        assets.append(self.assets[asset])
+    return self.supply, self.amplification, self.target_amplification, self.swap_fee_rate, \
+        self.ramp_step, self.packed_ramp, self.ramp_stop_time, self.packed_pool_vb, self.packed_rate_refresh, packed_vbs, assets
+
 # PRIVILEGED FUNCTIONS
 
 @external
@@ -819,7 +931,7 @@ def add_asset(
     prev_num_assets: uint256 = self.num_assets
     assert prev_num_assets < MAX_NUM_ASSETS # dev: pool is full
     assert _amplification > 0
-    assert self.ramp_last_time == 0 # dev: ramp active
+    assert self.packed_ramp == 0 # dev: ramp active
     assert self.supply > 0 # dev: pool empty
 
     assert _weight > 0 and _weight <= PRECISION/100
@@ -860,7 +972,7 @@ def add_asset(
     # recalculate variables
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
-    vb_prod, vb_sum = self._calc_vb_prod_sum()
+    vb_prod, vb_sum = self._calc_vb_prod_sum(0)
 
     # update supply
     prev_supply: uint256 = self.supply
@@ -975,8 +1087,9 @@ def set_rate_provider(_asset: uint256, _rate_provider: address):
     self.rate_providers[_asset] = _rate_provider
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
+    progress: uint256 = 0
     vb_prod, vb_sum = self._unpack_pool_vb(self.packed_pool_vb)
-    vb_prod, vb_sum = self._update_rates(_asset + 1, vb_prod, vb_sum)
+    vb_prod, vb_sum, progress = self._update_rates(_asset + 1, vb_prod, vb_sum, True)
     self.packed_pool_vb = self._pack_pool_vb(vb_prod, vb_sum)
     log SetRateProvider(_asset, _rate_provider)
 
@@ -1005,16 +1118,17 @@ def set_ramp(
     updated: bool = False
     vb_prod: uint256 = 0
     vb_sum: uint256 = 0
+    progress: uint256 = 0
     vb_prod, vb_sum = self._unpack_pool_vb(self.packed_pool_vb)
-    vb_prod, updated = self._update_weights(vb_prod)
+    vb_prod, updated, progress = self._update_weights(vb_prod)
     if updated:
         supply: uint256 = 0
         supply, vb_prod = self._update_supply(self.supply, vb_prod, vb_sum)
         self.packed_pool_vb = self._pack_pool_vb(vb_prod, vb_sum)
     
-    assert self.ramp_last_time == 0 # dev: ramp active
+    assert self.packed_ramp == 0 # dev: ramp active
 
-    self.ramp_last_time = _start
+    self.packed_ramp = _start
     self.ramp_stop_time = _start + _duration
     
     self.target_amplification = _amplification
@@ -1055,9 +1169,11 @@ def set_ramp_step(_ramp_step: uint256):
 def stop_ramp():
     """
     @notice Stop an active ramp
+    @dev Weights stay at their value as of the last ramp step
     """
     assert msg.sender == self.management
-    self.ramp_last_time = 0
+    self._store_ramp_weights(shift(self.packed_ramp, RAMP_PROGRESS_SHIFT))
+    self.packed_ramp = 0
     self.ramp_stop_time = 0
     log StopRamp()
 
@@ -1107,15 +1223,17 @@ def set_guardian(_guardian: address):
 # INTERNAL FUNCTIONS
 
 @internal
-def _update_rates(_assets: uint256, _vb_prod: uint256, _vb_sum: uint256) -> (uint256, uint256):
+def _update_rates(_assets: uint256, _vb_prod: uint256, _vb_sum: uint256, _force: bool) -> (uint256, uint256, uint256):
     """
     @notice Update rates of specific assets
     @param _assets Integer where each byte represents an asset index offset by one
     @param _vb_prod Product term (pi) before update
     @param _vb_sum Sum term (sigma) before update
-    @return Tuple with new product and sum term
+    @param _force Read the rates even if they have already been read in the current block
+    @return Tuple with new product and sum term and ramp progress
     @dev Loops through the bytes in `_assets` until a zero or a number larger than the number of assets is encountered
     @dev Update weights (if needed) prior to checking any rates
+    @dev Skips assets whose rate has already been read in the current block, unless forced
     @dev Will recalculate supply and mint/burn to staking contract if any weight or rate has updated
     @dev Will revert if any rate increases by more than 10%, unless called by management
     """
@@ -1124,13 +1242,28 @@ def _update_rates(_assets: uint256, _vb_prod: uint256, _vb_sum: uint256) -> (uin
     vb_prod: uint256 = 0
     vb_sum: uint256 = _vb_sum
     updated: bool = False
-    vb_prod, updated = self._update_weights(_vb_prod)
+    progress: uint256 = 0
+    vb_prod, updated, progress = self._update_weights(_vb_prod)
     num_assets: uint256 = self.num_assets
+    log_prod: int256 = 0
+
+    # flags of assets whose rate has been read in this block
+    packed_refresh: uint256 = self.packed_rate_refresh
+    refreshed: uint256 = 0
+    if shift(packed_refresh, RATE_REFRESH_SHIFT) == block.number:
+        refreshed = packed_refresh & RATE_REFRESH_MASK
+    prev_refreshed: uint256 = refreshed
+
     for i in range(MAX_NUM_ASSETS):
         asset: uint256 = shift(_assets, unsafe_mul(-8, convert(i, int128))) & 255
         if asset == 0 or asset > num_assets:
             break
         asset = unsafe_sub(asset, 1)
+        flag: uint256 = shift(1, convert(asset, int128))
+        if refreshed & flag != 0 and not _force:
+            # rate already up to date
+            continue
+        refreshed = refreshed | flag
         provider: address = self.rate_providers[asset]
 
         prev_vb: uint256 = 0
@@ -1151,47 +1284,60 @@ def _update_rates(_assets: uint256, _vb_prod: uint256, _vb_sum: uint256) -> (uin
         vb: uint256 = 0
         if prev_rate > 0 and vb_sum > 0:
             # factor out old rate and factor in new
-            wn: uint256 = self._unpack_wn(packed_weight, num_assets)
-            vb_prod = vb_prod * self._pow_up(prev_rate * PRECISION / rate, wn) / PRECISION
+            wn: uint256 = packed_weight
+            if progress > 0:
+                wn = self._ramp_weight(packed_weight, progress)
+            wn = self._unpack_wn(wn, num_assets)
+            log_prod = unsafe_add(log_prod, self._log_pow(prev_rate * PRECISION / rate, wn))
             vb = prev_vb * rate / prev_rate
             vb_sum = vb_sum + vb - prev_vb
         self.packed_vbs[asset] = self._pack_vb(vb, rate, packed_weight)
         log RateUpdate(asset, rate)
 
+    if refreshed != prev_refreshed:
+        self.packed_rate_refresh = shift(block.number, -RATE_REFRESH_SHIFT) | refreshed
+
+    if log_prod != 0:
+        vb_prod = vb_prod * self._exp_up(log_prod) / PRECISION
+
     if not updated and vb_prod == _vb_prod and vb_sum == _vb_sum:
         # no weight and no rate changes
-        return vb_prod, vb_sum
+        return vb_prod, vb_sum, progress
 
     # recalculate supply and mint/burn token to staking address
     supply: uint256 = 0
     supply, vb_prod = self._update_supply(self.supply, vb_prod, vb_sum)
-    return vb_prod, vb_sum
+    return vb_prod, vb_sum, progress
 
 @internal
-def _update_weights(_vb_prod: uint256) -> (uint256, bool):
+def _update_weights(_vb_prod: uint256) -> (uint256, bool, uint256):
     """
     @notice Apply a step in amplitude and weight ramp, if applicable
     @param _vb_prod Product term (pi) before update
-    @return Tuple with new product term and flag indicating if a step has been taken
+    @return Tuple with new product term, flag indicating if a step has been taken and ramp progress
     @dev Caller is responsible for updating supply if a step has been taken
+    @dev During a ramp only the progress is stored, weights are interpolated when read
     """
-    span: uint256 = self.ramp_last_time
+    packed_ramp: uint256 = self.packed_ramp
+    if packed_ramp == 0:
+        # no ramp is active
+        return _vb_prod, False, 0
+
+    span: uint256 = packed_ramp & RAMP_MASK
+    progress: uint256 = shift(packed_ramp, RAMP_PROGRESS_SHIFT)
     duration: uint256 = self.ramp_stop_time
-    if span == 0 or span > block.timestamp or (block.timestamp - span < self.ramp_step and duration > block.timestamp):
+    if span > block.timestamp or (block.timestamp - span < self.ramp_step and duration > block.timestamp):
         # scenarios:
-        #  1) no ramp is active
-        #  2) ramp is scheduled for in the future
-        #  3) weights have been updated too recently and ramp hasnt finished yet
-        return _vb_prod, False
+        #  1) ramp is scheduled for in the future
+        #  2) weights have been updated too recently and ramp hasnt finished yet
+        return _vb_prod, False, progress
 
     if block.timestamp < duration:
         # ramp in progress
         duration -= span
-        self.ramp_last_time = block.timestamp
     else:
         # ramp has finished
         duration = 0
-        self.ramp_last_time = 0
         self.ramp_stop_time = 0
     span = block.timestamp - span
     
@@ -1208,32 +1354,39 @@ def _update_weights(_vb_prod: uint256) -> (uint256, bool):
     self.amplification = current
 
     # update weights
+    if duration == 0:
+        self._store_ramp_weights(PRECISION)
+        self.packed_ramp = 0
+        progress = 0
+    else:
+        progress += (PRECISION - progress) * span / duration
+        self.packed_ramp = block.timestamp | shift(progress, -RAMP_PROGRESS_SHIFT)
+
+    # recalculate the product in full. an update of the previous product needs the logarithm
+    # of every changed base `w_i D / x_i` too, and accumulates rounding with every step
+    vb_prod: uint256 = 0
+    supply: uint256 = self.supply
+    if supply > 0:
+        vb_prod = self._calc_vb_prod(supply, progress)
+    return vb_prod, True, progress
+
+@internal
+def _store_ramp_weights(_progress: uint256):
+    """
+    @notice Write the interpolated weights to storage
+    @param _progress Fraction of the ramp completed (18 decimals)
+    """
+    if _progress == 0:
+        return
     num_assets: uint256 = self.num_assets
     vb: uint256 = 0
     rate: uint256 = 0
     packed_weight: uint256 = 0
-    lower: uint256 = 0
-    upper: uint256 = 0
     for asset in range(MAX_NUM_ASSETS):
         if asset == num_assets:
             break
         vb, rate, packed_weight = self._unpack_vb(self.packed_vbs[asset])
-        current, target, lower, upper = self._unpack_weight(packed_weight)
-        if duration == 0:
-            current = target
-        else:
-            if current > target:
-                current -= (current - target) * span / duration
-            else:
-                current += (target - current) * span / duration
-        packed_weight = self._pack_weight(current, target, lower, upper)
-        self.packed_vbs[asset] = self._pack_vb(vb, rate, packed_weight)
-
-    vb_prod: uint256 = 0
-    supply: uint256 = self.supply
-    if supply > 0:
-        vb_prod = self._calc_vb_prod(supply)
-    return vb_prod, True
+        self.packed_vbs[asset] = self._pack_vb(vb, rate, self._ramp_weight(packed_weight, _progress))
 
 @internal
 def _update_supply(_supply: uint256, _vb_prod: uint256, _vb_sum: uint256) -> (uint256, uint256):
@@ -1288,9 +1441,10 @@ def _check_bands(_prev_ratio: uint256, _ratio: uint256, _packed_weight: uint256)
 
 @internal
 @view
-def _calc_vb_prod_sum() -> (uint256, uint256):
+def _calc_vb_prod_sum(_progress: uint256) -> (uint256, uint256):
     """
     @notice Calculate product term (pi) and sum term (sigma)
+    @param _progress Ramp progress
     @return Tuple with product term and sum term
     """
     s: uint256 = 0
@@ -1299,19 +1453,21 @@ def _calc_vb_prod_sum() -> (uint256, uint256):
         if asset == num_assets:
             break
         s = unsafe_add(s, self.packed_vbs[asset] & VB_MASK)
-    p: uint256 = self._calc_vb_prod(s)
+    p: uint256 = self._calc_vb_prod(s, _progress)
     return p, s
 
 @internal
 @view
-def _calc_vb_prod(_s: uint256) -> uint256:
+def _calc_vb_prod(_s: uint256, _progress: uint256) -> uint256:
     """
     @notice Calculate product term (pi)
     @param _s Supply to use in product term
+    @param _progress Ramp progress
     @param Product term
+    @dev Accumulates the logarithm of the product, exponentiates once
     """
     num_assets: uint256 = self.num_assets
-    p: uint256 = PRECISION
+    l: int256 = 0
     for asset in range(MAX_NUM_ASSETS):
         if asset == num_assets:
             break
@@ -1319,12 +1475,17 @@ def _calc_vb_prod(_s: uint256) -> uint256:
         rate: uint256 = 0
         weight: uint256 = 0
         vb, rate, weight = self._unpack_vb(self.packed_vbs[asset])
+        if _progress > 0:
+            weight = self._ramp_weight(weight, _progress)
         weight = self._unpack_wn(weight, 1)
         
         assert weight > 0 and vb > 0 # dev: borked
-        # p = product((D * w_i / vb_i)^(w_i n))
-        p = unsafe_div(unsafe_mul(p, self._pow_down(unsafe_div(unsafe_mul(_s, weight), vb), unsafe_mul(weight, num_assets))), PRECISION)
-    return p
+        x: uint256 = unsafe_div(unsafe_mul(_s, weight), vb)
+        if x == 0:
+            return 0
+        # log p = sum(w_i n log(D * w_i / vb_i))
+        l = unsafe_add(l, self._log_pow(x, unsafe_mul(weight, num_assets)))
+    return self._exp_down(l)
 
 @internal
 @pure
@@ -1347,8 +1508,12 @@ def _calc_supply(
     @return Tuple with new supply and product term
     """
     
-    # D[m+1] = (A f^n sigma - D[m] pi[m] )) / (A f^n - 1)
-    #        = (l - s r) / d
+    # Find root of f(D) = A f^n sigma - (A f^n - 1) D - D pi(D) using Newton's method
+    # pi(D) = pi[m] (D/D[m])^n, so f'(D) = -(A f^n - 1) - (n + 1) pi(D)
+    # D[m+1] = D[m] - f(D[m]) / f'(D[m])
+    #        = (A f^n sigma + n D[m] pi[m]) / (A f^n - 1 + (n + 1) pi[m])
+    #        = (l + n s r) / (d + (n + 1) r)
+    # f is decreasing and concave, so after the first step the iterates approach the root from above
 
     l: uint256 = _amplification # left: A f^n sigma
     d: uint256 = l - PRECISION # denominator: A f^n - 1
@@ -1358,12 +1523,31 @@ def _calc_supply(
 
     for _ in range(255):
         assert s > 0
-        sp: uint256 = unsafe_div(unsafe_sub(l, unsafe_mul(s, r)), d) # D[m+1] = (l - s * r) / d
+        sp: uint256 = unsafe_div(
+            unsafe_add(l, unsafe_mul(unsafe_mul(_num_assets, s), r)),
+            unsafe_add(d, unsafe_mul(unsafe_add(_num_assets, 1), r))
+        ) # D[m+1] = (l + n s r) / (d + (n + 1) r)
+        # limit the step, so that the power of the ratio below and its product with pi stay within 256 bits.
+        # f is concave, so the next steps still converge to the root
+        if sp > unsafe_mul(s, MAX_SUPPLY_STEP):
+            sp = unsafe_mul(s, MAX_SUPPLY_STEP)
         # update product term pi[m+1] = (D[m+1]/D[m])^n pi[m]
-        for i in range(MAX_NUM_ASSETS):
-            if i == _num_assets:
+        # by exponentiation by squaring of the ratio, in log2(n) steps.
+        # ratio in 36 decimals, unless it is large enough for its power to overflow
+        precision: uint256 = PRECISION * PRECISION
+        if sp > unsafe_div(unsafe_mul(s, 14), 10):
+            precision = PRECISION
+        b: uint256 = unsafe_div(unsafe_mul(sp, precision), s) # D[m+1]/D[m]
+        p: uint256 = precision
+        e: uint256 = _num_assets
+        for i in range(6): # n <= 32
+            if e & 1 == 1:
+                p = unsafe_div(unsafe_mul(p, b), precision)
+            e = shift(e, -1)
+            if e == 0:
                 break
-            r = unsafe_div(unsafe_mul(r, sp), s) # r * sp / s
+            b = unsafe_div(unsafe_mul(b, b), precision)
+        r = r * p / precision # r * (sp / s)^n
         delta: uint256 = 0
         if sp >= s:
             delta = unsafe_sub(sp, s)
@@ -1414,7 +1598,10 @@ def _calc_vb(
     b += _vb_sum
     q: uint256 = PRECISION * PRECISION / _wn # q = 1/v_i = 1/(w_i n)
 
+    # the root is above the constant sum solution D - b', start no lower than that
     y: uint256 = _y
+    if _supply > b and y < _supply - b:
+        y = _supply - b
     for _ in range(255):
         assert y > 0
         yp: uint256 = (y + b + _supply * q / PRECISION + c * q / self._pow_up(y, _wn) - b * q / PRECISION - _supply) * y / (q * y / PRECISION + y + b - _supply)
@@ -1431,6 +1618,20 @@ def _calc_vb(
     
     raise # dev: no convergence
 
+@internal
+@pure
+def _slope(_amplification: uint256, _supply: uint256, _vb_prod: uint256, _vb: uint256, _wn: uint256) -> uint256:
+    """
+    @notice Partial derivative of the invariant to a virtual balance, at constant supply
+    @param _amplification Amplification factor `A f^n`
+    @param _supply Supply
+    @param _vb_prod Product term
+    @param _vb Virtual balance of the asset
+    @param _wn Asset weight times number of assets
+    @return Partial derivative `A f^n + D pi v_i / x_i`
+    """
+    return _amplification + _supply * _vb_prod / _vb * _wn / PRECISION
+
 @internal
 @pure
 def _pack_vb(_vb: uint256, _rate: uint256, _packed_weight: uint256) -> uint256:
@@ -1488,6 +1689,25 @@ def _unpack_wn(_packed: uint256, _num_assets: uint256) -> uint256:
     """
     return unsafe_mul(unsafe_mul(_packed & WEIGHT_MASK, WEIGHT_SCALE), _num_assets)
 
+@internal
+@pure
+def _ramp_weight(_packed: uint256, _progress: uint256) -> uint256:
+    """
+    @notice Interpolate weight towards target weight
+    @param _packed Packed weight
+    @param _progress Fraction of the way from weight to target weight (18 decimals)
+    @return Packed weight with interpolated weight
+    """
+    if _progress == 0:
+        return _packed
+    weight: uint256 = _packed & WEIGHT_MASK
+    target: uint256 = shift(_packed, TARGET_WEIGHT_SHIFT) & WEIGHT_MASK
+    if weight > target:
+        weight = unsafe_sub(weight, unsafe_div(unsafe_mul(unsafe_sub(weight, target), _progress), PRECISION))
+    else:
+        weight = unsafe_add(weight, unsafe_div(unsafe_mul(unsafe_sub(target, weight), _progress), PRECISION))
+    return unsafe_sub(_packed, _packed & WEIGHT_MASK) | weight
+
 @internal
 @pure
 def _pack_pool_vb(_prod: uint256, _sum: uint256) -> uint256:
@@ -1520,7 +1740,13 @@ def _pow_up(_x: uint256, _y: uint256) -> uint256:
     @return `x^y` in 18 decimals, rounded up
     @dev Guaranteed to be at least as big as the actual value
     """
-    p: uint256 = self._pow(_x, _y)
+    p: uint256 = 0
+    if _y % POW_EXACT_STEP == 0:
+        if _y < POW_EXACT_BOUND and _x > 0:
+            p = self._pow_exact(_x, _y, True)
+            if p > 0:
+                return p
+    p = self._pow(_x, _y)
     if p == 0:
         return 0
     # p + (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
@@ -1536,7 +1762,13 @@ def _pow_down(_x: uint256, _y: uint256) -> uint256:
     @return `x^y` in 18 decimals, rounded down
     @dev Guaranteed to be at most as big as the actual value
     """
-    p: uint256 = self._pow(_x, _y)
+    p: uint256 = 0
+    if _y % POW_EXACT_STEP == 0:
+        if _y < POW_EXACT_BOUND and _x > 0:
+            p = self._pow_exact(_x, _y, False)
+            if p > 0:
+                return p
+    p = self._pow(_x, _y)
     if p == 0:
         return 0
     # (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
@@ -1545,6 +1777,60 @@ def _pow_down(_x: uint256, _y: uint256) -> uint256:
         return 0
     return unsafe_sub(p, e)
 
+@internal
+@pure
+def _pow_exact(_x: uint256, _y: uint256, _up: bool) -> uint256:
+    """
+    @notice Calculate `x` to power of `y` by squaring, for integer and half-integer exponents
+    @param _x Base (18 decimals), non-zero
+    @param _y Exponent (18 decimals), multiple of 0.5 below 256
+    @param _up Round every step up instead of down
+    @return `x^y` in 18 decimals, or zero if it cannot be calculated this way
+    @dev Rounded up the result is at least as big as the actual value, rounded down at most as big
+    @dev Equal weights give an exponent of exactly 1, which takes a single multiplication
+    """
+    r: uint256 = PRECISION
+    if _y % PRECISION != 0:
+        # half-integer, start from sqrt(x)
+        if _x > max_value(uint256) / PRECISION:
+            return 0
+        s: uint256 = unsafe_mul(_x, PRECISION)
+        r = isqrt(s)
+        if _up and unsafe_mul(r, r) < s:
+            r = unsafe_add(r, 1)
+
+    b: uint256 = _x
+    n: uint256 = _y / PRECISION
+    for _ in range(8):
+        if n % 2 == 1:
+            r = self._mul_exact(r, b, _up)
+            if r == 0:
+                return 0
+        n = shift(n, -1)
+        if n == 0:
+            break
+        b = self._mul_exact(b, b, _up)
+        if b == 0:
+            return 0
+    return r
+
+@internal
+@pure
+def _mul_exact(_a: uint256, _b: uint256, _up: bool) -> uint256:
+    """
+    @notice Multiply two non-zero fixed point numbers
+    @param _a First factor (18 decimals)
+    @param _b Second factor (18 decimals)
+    @param _up Round up instead of down
+    @return Product in 18 decimals, or zero on overflow
+    """
+    if _a > max_value(uint256) / _b:
+        return 0
+    p: uint256 = unsafe_mul(_a, _b)
+    if _up and p % PRECISION > 0:
+        return unsafe_add(unsafe_div(p, PRECISION), 1)
+    return unsafe_div(p, PRECISION)
+
 @internal
 @pure
 def _pow(_x: uint256, _y: uint256) -> uint256:
@@ -1578,6 +1864,65 @@ def _pow(_x: uint256, _y: uint256) -> uint256:
     l = unsafe_div(l, E18)
     return convert(self._exp(l), uint256)
 
+@internal
+@pure
+def _log_pow(_x: uint256, _y: uint256) -> int256:
+    """
+    @notice Calculate `y log x`, the natural logarithm of `x^y`
+    @param _x Base (18 decimals)
+    @param _y Exponent (18 decimals)
+    @return `y log x` in 18 decimals
+    @dev A product of powers can be calculated with a single exponentiation of the sum of these
+    @dev Same as the first part of `_pow`, which is kept inline to save an internal call
+    """
+    assert _x > 0 and shift(_x, -255) == 0 # dev: x out of bounds
+    assert _y < MILD_EXP_BOUND # dev: y out of bounds
+
+    x: int256 = convert(_x, int256)
+    y: int256= convert(_y, int256)
+    l: int256 = 0
+    if x > LOG36_LOWER and x < LOG36_UPPER:
+        l = self._log36(x)
+        # l / E18 * y + (l % E18) * y / E18
+        l = unsafe_add(unsafe_mul(unsafe_div(l, E18), y), unsafe_div(unsafe_mul(l % E18, y), E18))
+    else:
+        l = unsafe_mul(self._log(x), y)
+    return unsafe_div(l, E18)
+
+@internal
+@pure
+def _exp_up(_l: int256) -> uint256:
+    """
+    @notice Calculate natural exponent `e^l`, rounded up
+    @param _l Exponent (18 decimals), typically a sum of `_log_pow` values
+    @return `e^l` in 18 decimals, rounded up
+    @dev Guaranteed to be at least as big as the actual value for sums of up to `MAX_NUM_ASSETS` terms
+    @dev Below `MIN_NAT_EXP` the actual value is less than 2 wei, which is returned as upper bound
+    """
+    if _l < MIN_NAT_EXP:
+        return 2
+    p: uint256 = convert(self._exp(_l), uint256)
+    # p + (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    return unsafe_add(unsafe_add(p, unsafe_div(unsafe_sub(unsafe_mul(p, MAX_POW_REL_ERR), 1), PRECISION)), 1)
+
+@internal
+@pure
+def _exp_down(_l: int256) -> uint256:
+    """
+    @notice Calculate natural exponent `e^l`, rounded down
+    @param _l Exponent (18 decimals), typically a sum of `_log_pow` values
+    @return `e^l` in 18 decimals, rounded down
+    @dev Guaranteed to be at most as big as the actual value for sums of up to `MAX_NUM_ASSETS` terms
+    """
+    if _l < MIN_NAT_EXP:
+        return 0
+    p: uint256 = convert(self._exp(_l), uint256)
+    # (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    e: uint256 = unsafe_add(unsafe_div(unsafe_sub(unsafe_mul(p, MAX_POW_REL_ERR), 1), PRECISION), 1)
+    if p < e:
+        return 0
+    return unsafe_sub(p, e)
+
 @internal
 @pure
 def _log36(_x: int256) -> int256:
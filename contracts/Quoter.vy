@@ -0,0 +1,975 @@
+# @version 0.3.7
+
+# Stateless quoter: the pool state is passed in as arguments instead of read from storage,
+# so that hypothetical states can be quoted, such as after a pending rate update or in the middle of a bundle.
+# State is in the raw storage format of `Pool.get_state()`, in the same order:
+#   _supply: supply of LP tokens
+#   _amplification: amplification (A f^n)
+#   _target_amplification: amplification at the end of the ramp
+#   _fee_rate: swap fee rate (18 decimals)
+#   _ramp_step: minimum time between ramp steps
+#   _packed_ramp: time of the last ramp step (128) | ramp progress (128), zero if no ramp is active
+#   _ramp_stop_time: end time of the ramp
+#   _packed_pool_vb: vb_prod (128) | vb_sum (128)
+#   _packed_vbs: per asset x_i = b_i r_i (96) | r_i (80) | w_i (20) | target w_i (20) | lower (20) | upper (20)
+#   _rates: optional new rate of every asset, applied to the assets touched by the operation
+#       exactly as the pool would. Leave empty to quote with the rates in `_packed_vbs`
+# During a ramp the weights and amplification are interpolated as of the current block, as the pool does.
+# The 10% cap on rate increases is not enforced.
+
+PRECISION: constant(uint256) = 1_000_000_000_000_000_000
+MAX_NUM_ASSETS: constant(uint256) = 32
+MAX_SUPPLY_STEP: constant(uint256) = 2
+
+WEIGHT_SCALE: constant(uint256) = 1_000_000_000_000
+WEIGHT_MASK: constant(uint256) = 2**20 - 1
+TARGET_WEIGHT_SHIFT: constant(int128) = -20
+LOWER_BAND_SHIFT: constant(int128) = -40
+UPPER_BAND_SHIFT: constant(int128) = -60
+
+POOL_VB_MASK: constant(uint256) = 2**128 - 1
+POOL_VB_SHIFT: constant(int128) = -128
+RAMP_MASK: constant(uint256) = 2**128 - 1
+RAMP_PROGRESS_SHIFT: constant(int128) = -128
+VB_MASK: constant(uint256) = 2**96 - 1
+RATE_MASK: constant(uint256) = 2**80 - 1
+RATE_SHIFT: constant(int128) = -96
+PACKED_WEIGHT_SHIFT: constant(int128) = -176
+
+# powers of 10
+E3: constant(int256)               = 1_000
+E6: constant(int256)               = E3 * E3
+E9: constant(int256)               = E3 * E6
+E12: constant(int256)              = E3 * E9
+E15: constant(int256)              = E3 * E12
+E17: constant(int256)              = 100 * E15
+E18: constant(int256)              = E3 * E15
+E20: constant(int256)              = 100 * E18
+E36: constant(int256)              = E18 * E18
+MAX_POW_REL_ERR: constant(uint256) = 100 # 1e-16
+POW_EXACT_STEP: constant(uint256)  = PRECISION / 2
+POW_EXACT_BOUND: constant(uint256) = 256 * PRECISION
+MIN_NAT_EXP: constant(int256)      = -41 * E18
+MAX_NAT_EXP: constant(int256)      = 130 * E18
+LOG36_LOWER: constant(int256)      = E18 - E17
+LOG36_UPPER: constant(int256)      = E18 + E17
+MILD_EXP_BOUND: constant(uint256)  = 2**254 / 100_000_000_000_000_000_000
+
+# x_n = 2^(7-n), a_n = exp(x_n)
+# in 20 decimals for n >= 2
+X0: constant(int256)  = 128 * E18 # 18 decimals
+A0: constant(int256)  = 38_877_084_059_945_950_922_200 * E15 * E18 # no decimals
+X1: constant(int256)  = X0 / 2 # 18 decimals
+A1: constant(int256)  = 6_235_149_080_811_616_882_910 * E6 # no decimals
+X2: constant(int256)  = X1 * 100 / 2
+A2: constant(int256)  = 7_896_296_018_268_069_516_100 * E12
+X3: constant(int256)  = X2 / 2
+A3: constant(int256)  = 888_611_052_050_787_263_676 * E6
+X4: constant(int256)  = X3 / 2
+A4: constant(int256)  = 298_095_798_704_172_827_474 * E3
+X5: constant(int256)  = X4 / 2
+A5: constant(int256)  = 5_459_815_003_314_423_907_810
+X6: constant(int256)  = X5 / 2
+A6: constant(int256)  = 738_905_609_893_065_022_723
+X7: constant(int256)  = X6 / 2
+A7: constant(int256)  = 271_828_182_845_904_523_536
+X8: constant(int256)  = X7 / 2
+A8: constant(int256)  = 164_872_127_070_012_814_685
+X9: constant(int256)  = X8 / 2
+A9: constant(int256)  = 128_402_541_668_774_148_407
+X10: constant(int256) = X9 / 2
+A10: constant(int256) = 11_331_4845_306_682_631_683
+X11: constant(int256) = X10 / 2
+A11: constant(int256) = 1_064_49_445_891_785_942_956
+
+@external
+@view
+def quote_swap(
+    _i: uint256,
+    _j: uint256,
+    _dx: uint256,
+    _supply: uint256,
+    _amplification: uint256,
+    _target_amplification: uint256,
+    _fee_rate: uint256,
+    _ramp_step: uint256,
+    _packed_ramp: uint256,
+    _ramp_stop_time: uint256,
+    _packed_pool_vb: uint256,
+    _packed_vbs: DynArray[uint256, MAX_NUM_ASSETS],
+    _rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+) -> uint256:
+    """
+    @notice Quote a swap in the given pool state
+    @param _i Index of input asset
+    @param _j Index of output asset
+    @param _dx Amount of input asset to take
+    @param _supply Supply of LP tokens
+    @param _amplification Amplification factor (A f^n) as of the last ramp step
+    @param _target_amplification Amplification factor at the end of the ramp
+    @param _fee_rate Swap fee rate (18 decimals)
+    @param _ramp_step Minimum time between ramp steps
+    @param _packed_ramp Packed time of the last ramp step and ramp progress
+    @param _ramp_stop_time End time of the ramp
+    @param _packed_pool_vb Packed product and sum term
+    @param _packed_vbs Packed virtual balance, rate and weights of every asset
+    @param _rates New rate of every asset, empty to use the rates in `_packed_vbs`
+    @return Amount of output asset `Pool.swap` would send
+    """
+    num_assets: uint256 = len(_packed_vbs)
+    assert _i != _j # dev: same input and output asset
+    assert _i < num_assets and _j < num_assets # dev: index out of bounds
+    assert _dx > 0 # dev: zero amount
+
+    # update rates for from and to assets
+    supply: uint256 = 0
+    amplification: uint256 = 0
+    vb_prod: uint256 = 0
+    vb_sum: uint256 = 0
+    vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+    packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    supply, amplification, vb_prod, vb_sum, vbs, rates, packed_weights = self._update_rates(
+        unsafe_add(_i, 1) | shift(unsafe_add(_j, 1), 8), _supply, _amplification, _target_amplification,
+        _ramp_step, _packed_ramp, _ramp_stop_time, _packed_pool_vb, _packed_vbs, _rates
+    )
+    prev_vb_sum: uint256 = vb_sum
+
+    prev_vb_x: uint256 = vbs[_i]
+    rate_x: uint256 = rates[_i]
+    wn_x: uint256 = self._unpack_wn(packed_weights[_i], num_assets)
+    prev_vb_y: uint256 = vbs[_j]
+    rate_y: uint256 = rates[_j]
+    wn_y: uint256 = self._unpack_wn(packed_weights[_j], num_assets)
+
+    dx_fee: uint256 = _dx * _fee_rate / PRECISION
+    dvb_x: uint256 = (_dx - dx_fee) * rate_x / PRECISION
+    vb_x: uint256 = prev_vb_x + dvb_x
+
+    # initial guess along the tangent of the invariant
+    vb_y: uint256 = dvb_x * self._slope(amplification, supply, vb_prod, prev_vb_x, wn_x) / \
+        self._slope(amplification, supply, vb_prod, prev_vb_y, wn_y)
+    if vb_y < prev_vb_y / 2:
+        vb_y = prev_vb_y - vb_y
+    else:
+        vb_y = prev_vb_y / 2
+
+    # update x_i and remove x_j from variables
+    vb_prod = vb_prod * self._pow_up(prev_vb_y, wn_y) / self._pow_down(vb_x * PRECISION / prev_vb_x, wn_x)
+    vb_sum = vb_sum + dvb_x - prev_vb_y
+
+    # calulate new balance of out token
+    vb_y = self._calc_vb(wn_y, vb_y, supply, amplification, vb_prod, vb_sum)
+    vb_sum += vb_y
+
+    # check bands
+    self._check_bands(prev_vb_x * PRECISION / prev_vb_sum, vb_x * PRECISION / vb_sum, packed_weights[_i])
+    self._check_bands(prev_vb_y * PRECISION / prev_vb_sum, vb_y * PRECISION / vb_sum, packed_weights[_j])
+
+    return (prev_vb_y - vb_y) * PRECISION / rate_y
+
+@external
+@view
+def quote_add(
+    _amounts: DynArray[uint256, MAX_NUM_ASSETS],
+    _supply: uint256,
+    _amplification: uint256,
+    _target_amplification: uint256,
+    _fee_rate: uint256,
+    _ramp_step: uint256,
+    _packed_ramp: uint256,
+    _ramp_stop_time: uint256,
+    _packed_pool_vb: uint256,
+    _packed_vbs: DynArray[uint256, MAX_NUM_ASSETS],
+    _rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+) -> uint256:
+    """
+    @notice Quote a deposit in the given pool state
+    @param _amounts Array of amount for each asset to take
+    @param _supply Supply of LP tokens
+    @param _amplification Amplification factor (A f^n) as of the last ramp step
+    @param _target_amplification Amplification factor at the end of the ramp
+    @param _fee_rate Swap fee rate (18 decimals)
+    @param _ramp_step Minimum time between ramp steps
+    @param _packed_ramp Packed time of the last ramp step and ramp progress
+    @param _ramp_stop_time End time of the ramp
+    @param _packed_pool_vb Packed product and sum term
+    @param _packed_vbs Packed virtual balance, rate and weights of every asset
+    @param _rates New rate of every asset, empty to use the rates in `_packed_vbs`
+    @return Amount of LP tokens `Pool.add_liquidity` would mint
+    @dev Does not quote the first deposit
+    """
+    num_assets: uint256 = len(_packed_vbs)
+    assert len(_amounts) == num_assets # dev: lengths dont match
+    assert _supply > 0 # dev: pool empty
+    # for simplicity we dont give quotes for the first deposit
+
+    # find lowest relative increase in balance
+    assets: uint256 = 0
+    lowest: uint256 = max_value(uint256)
+    sh: int128 = 0
+    for asset in range(MAX_NUM_ASSETS):
+        if asset == num_assets:
+            break
+        if _amounts[asset] > 0:
+            assets = assets | shift(unsafe_add(asset, 1), sh)
+            sh = unsafe_add(sh, 8)
+            if lowest > 0:
+                packed: uint256 = _packed_vbs[asset]
+                lowest = min(_amounts[asset] * (shift(packed, RATE_SHIFT) & RATE_MASK) / (packed & VB_MASK), lowest)
+        else:
+            lowest = 0
+    assert sh > 0 # dev: need to deposit at least one asset
+
+    # update rates
+    prev_supply: uint256 = 0
+    amplification: uint256 = 0
+    vb_prod: uint256 = 0
+    vb_sum: uint256 = 0
+    vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+    packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    prev_supply, amplification, vb_prod, vb_sum, vbs, rates, packed_weights = self._update_rates(
+        assets, _supply, _amplification, _target_amplification, _ramp_step, _packed_ramp, _ramp_stop_time, _packed_pool_vb, _packed_vbs, _rates
+    )
+
+    vb_sum_final: uint256 = vb_sum
+    log_prod: int256 = 0
+    fee_rate: uint256 = _fee_rate / 2
+    prev_vb_sum: uint256 = vb_sum
+    for asset in range(MAX_NUM_ASSETS):
+        if asset == num_assets:
+            break
+
+        amount: uint256 = _amounts[asset]
+        if amount == 0:
+            continue
+        prev_vb: uint256 = vbs[asset]
+        dvb: uint256 = amount * rates[asset] / PRECISION
+        vb: uint256 = prev_vb + dvb
+        wn: uint256 = self._unpack_wn(packed_weights[asset], num_assets)
+        vb_sum_final += dvb
+
+        # remove fees from balance and recalculate sum and product, product in log space
+        fee: uint256 = (dvb - prev_vb * lowest / PRECISION) * fee_rate / PRECISION
+        log_prod = unsafe_add(log_prod, self._log_pow(prev_vb * PRECISION / (vb - fee), wn))
+        vb_sum += dvb - fee
+
+    # factor in all deposits at once
+    vb_prod = vb_prod * self._exp_up(log_prod) / PRECISION
+
+    # check bands
+    for asset in range(MAX_NUM_ASSETS):
+        if asset == num_assets:
+            break
+        amount: uint256 = _amounts[asset]
+        if amount == 0:
+            continue
+        prev_vb: uint256 = vbs[asset]
+        vb: uint256 = prev_vb + amount * rates[asset] / PRECISION
+        self._check_bands(prev_vb * PRECISION / prev_vb_sum, vb * PRECISION / vb_sum_final, packed_weights[asset])
+
+    supply: uint256 = 0
+    supply, vb_prod = self._calc_supply(num_assets, prev_supply, amplification, vb_prod, vb_sum, False)
+    return supply - prev_supply
+
+@external
+@view
+def quote_remove_single(
+    _asset: uint256,
+    _lp_amount: uint256,
+    _supply: uint256,
+    _amplification: uint256,
+    _target_amplification: uint256,
+    _fee_rate: uint256,
+    _ramp_step: uint256,
+    _packed_ramp: uint256,
+    _ramp_stop_time: uint256,
+    _packed_pool_vb: uint256,
+    _packed_vbs: DynArray[uint256, MAX_NUM_ASSETS],
+    _rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+) -> uint256:
+    """
+    @notice Quote a single sided withdrawal in the given pool state
+    @param _asset Index of asset to withdraw
+    @param _lp_amount Amount of LP tokens to burn
+    @param _supply Supply of LP tokens
+    @param _amplification Amplification factor (A f^n) as of the last ramp step
+    @param _target_amplification Amplification factor at the end of the ramp
+    @param _fee_rate Swap fee rate (18 decimals)
+    @param _ramp_step Minimum time between ramp steps
+    @param _packed_ramp Packed time of the last ramp step and ramp progress
+    @param _ramp_stop_time End time of the ramp
+    @param _packed_pool_vb Packed product and sum term
+    @param _packed_vbs Packed virtual balance, rate and weights of every asset
+    @param _rates New rate of every asset, empty to use the rates in `_packed_vbs`
+    @return Amount of asset `Pool.remove_liquidity_single` would send
+    """
+    num_assets: uint256 = len(_packed_vbs)
+    assert _asset < num_assets # dev: index out of bounds
+
+    # update rate
+    prev_supply: uint256 = 0
+    amplification: uint256 = 0
+    vb_prod: uint256 = 0
+    vb_sum: uint256 = 0
+    vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+    packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    prev_supply, amplification, vb_prod, vb_sum, vbs, rates, packed_weights = self._update_rates(
+        unsafe_add(_asset, 1), _supply, _amplification, _target_amplification, _ramp_step, _packed_ramp, _ramp_stop_time, _packed_pool_vb, _packed_vbs, _rates
+    )
+    prev_vb_sum: uint256 = vb_sum
+
+    supply: uint256 = prev_supply - _lp_amount
+    prev_vb: uint256 = vbs[_asset]
+    wn: uint256 = self._unpack_wn(packed_weights[_asset], num_assets)
+
+    # initial guess along the tangent of the invariant
+    vb: uint256 = _lp_amount * (amplification - PRECISION + (num_assets + 1) * vb_prod) / \
+        self._slope(amplification, prev_supply, vb_prod, prev_vb, wn)
+    if vb < prev_vb / 2:
+        vb = prev_vb - vb
+    else:
+        vb = prev_vb / 2
+
+    # update variables
+    vb_prod = vb_prod * self._pow_up(prev_vb, wn) / PRECISION
+    for i in range(MAX_NUM_ASSETS):
+        if i == num_assets:
+            break
+        vb_prod = vb_prod * supply / prev_supply
+    vb_sum = vb_sum - prev_vb
+
+    # calculate new balance of asset
+    vb = self._calc_vb(wn, vb, supply, amplification, vb_prod, vb_sum)
+    dvb: uint256 = prev_vb - vb
+    fee: uint256 = dvb * _fee_rate / 2 / PRECISION
+    dvb -= fee
+    vb += fee
+    vb_sum = vb_sum + vb
+
+    for asset in range(MAX_NUM_ASSETS):
+        if asset == num_assets:
+            break
+        if asset == _asset:
+            self._check_bands(prev_vb * PRECISION / prev_vb_sum, vb * PRECISION / vb_sum, packed_weights[asset])
+        else:
+            self._check_bands(vbs[asset] * PRECISION / prev_vb_sum, vbs[asset] * PRECISION / vb_sum, packed_weights[asset])
+
+    return dvb * PRECISION / rates[_asset]
+
+@internal
+@view
+def _update_rates(
+    _assets: uint256,
+    _supply: uint256,
+    _amplification: uint256,
+    _target_amplification: uint256,
+    _ramp_step: uint256,
+    _packed_ramp: uint256,
+    _ramp_stop_time: uint256,
+    _packed_pool_vb: uint256,
+    _packed_vbs: DynArray[uint256, MAX_NUM_ASSETS],
+    _rates: DynArray[uint256, MAX_NUM_ASSETS]
+) -> (uint256, uint256, uint256, uint256, DynArray[uint256, MAX_NUM_ASSETS], DynArray[uint256, MAX_NUM_ASSETS], DynArray[uint256, MAX_NUM_ASSETS]):
+    # unpack state, take a ramp step and apply the new rates of specific assets, same as `Pool._update_rates`
+    # returns supply, amplification, product and sum term, virtual balances, rates and packed weights
+    num_assets: uint256 = len(_packed_vbs)
+    assert len(_rates) == 0 or len(_rates) == num_assets # dev: lengths dont match
+    prev_vb_prod: uint256 = _packed_pool_vb & POOL_VB_MASK
+    vb_sum: uint256 = shift(_packed_pool_vb, POOL_VB_SHIFT)
+
+    vbs: DynArray[uint256, MAX_NUM_ASSETS] = []
+    rates: DynArray[uint256, MAX_NUM_ASSETS] = []
+    for asset in range(MAX_NUM_ASSETS):
+        if asset == num_assets:
+            break
+        packed: uint256 = _packed_vbs[asset]
+        vbs.append(packed & VB_MASK)
+        rates.append(shift(packed, RATE_SHIFT) & RATE_MASK)
+
+    amplification: uint256 = 0
+    vb_prod: uint256 = 0
+    packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    updated: bool = False
+    amplification, vb_prod, packed_weights, updated = self._update_weights(
+        prev_vb_prod, vb_sum, _supply, _amplification, _target_amplification, _ramp_step, _packed_ramp, _ramp_stop_time, _packed_vbs
+    )
+
+    log_prod: int256 = 0
+    prev_vb_sum: uint256 = vb_sum
+    for i in range(MAX_NUM_ASSETS):
+        asset: uint256 = shift(_assets, unsafe_mul(-8, convert(i, int128))) & 255
+        if len(_rates) == 0 or asset == 0 or asset > num_assets:
+            break
+        asset = unsafe_sub(asset, 1)
+        rate: uint256 = _rates[asset]
+        assert rate > 0 # dev: no rate
+        prev_rate: uint256 = rates[asset]
+        if rate == prev_rate:
+            # no rate change
+            continue
+
+        vb: uint256 = 0
+        if prev_rate > 0 and vb_sum > 0:
+            # factor out old rate and factor in new
+            wn: uint256 = self._unpack_wn(packed_weights[asset], num_assets)
+            log_prod = unsafe_add(log_prod, self._log_pow(prev_rate * PRECISION / rate, wn))
+            vb = vbs[asset] * rate / prev_rate
+            vb_sum = vb_sum + vb - vbs[asset]
+        vbs[asset] = vb
+        rates[asset] = rate
+
+    if log_prod != 0:
+        vb_prod = vb_prod * self._exp_up(log_prod) / PRECISION
+
+    if not updated and vb_prod == prev_vb_prod and vb_sum == prev_vb_sum:
+        # no weight and no rate changes
+        return _supply, amplification, vb_prod, vb_sum, vbs, rates, packed_weights
+
+    # recalculate supply
+    supply: uint256 = 0
+    if _supply > 0:
+        supply, vb_prod = self._calc_supply(num_assets, _supply, amplification, vb_prod, vb_sum, True)
+    return supply, amplification, vb_prod, vb_sum, vbs, rates, packed_weights
+
+@internal
+@view
+def _update_weights(
+    _vb_prod: uint256, _vb_sum: uint256, _supply: uint256, _amplification: uint256, _target_amplification: uint256,
+    _ramp_step: uint256, _packed_ramp: uint256, _ramp_stop_time: uint256, _packed_vbs: DynArray[uint256, MAX_NUM_ASSETS]
+) -> (uint256, uint256, DynArray[uint256, MAX_NUM_ASSETS], bool):
+    # step in the amplification and weight ramp as of the current block, same as `Pool._update_weights`
+    # returns amplification, product term, interpolated packed weights and whether a step has been taken
+    packed_weights: DynArray[uint256, MAX_NUM_ASSETS] = []
+    num_assets: uint256 = len(_packed_vbs)
+    progress: uint256 = shift(_packed_ramp, RAMP_PROGRESS_SHIFT)
+    span: uint256 = _packed_ramp & RAMP_MASK
+    duration: uint256 = _ramp_stop_time
+    if span == 0 or span > block.timestamp or (block.timestamp - span < _ramp_step and duration > block.timestamp):
+        # weights as of the last ramp step
+        for asset in range(MAX_NUM_ASSETS):
+            if asset == num_assets:
+                break
+            packed_weights.append(self._ramp_weight(shift(_packed_vbs[asset], PACKED_WEIGHT_SHIFT), progress))
+        return _amplification, _vb_prod, packed_weights, False
+
+    if block.timestamp < duration:
+        # ramp in progress
+        duration -= span
+    else:
+        # ramp has finished
+        duration = 0
+    span = block.timestamp - span
+
+    # update amplification
+    current: uint256 = _amplification
+    target: uint256 = _target_amplification
+    if duration == 0:
+        current = target
+    else:
+        if current > target:
+            current = current - (current - target) * span / duration
+        else:
+            current = current + (target - current) * span / duration
+    amplification: uint256 = current
+
+    # update weights
+    if duration == 0:
+        progress = PRECISION
+    else:
+        progress += (PRECISION - progress) * span / duration
+    vb_prod: uint256 = 0
+    if _vb_sum > 0:
+        vb_prod = PRECISION
+    l: int256 = 0
+    for asset in range(MAX_NUM_ASSETS):
+        if asset == num_assets:
+            break
+        packed_weight: uint256 = self._ramp_weight(shift(_packed_vbs[asset], PACKED_WEIGHT_SHIFT), progress)
+        packed_weights.append(packed_weight)
+        current = self._unpack_wn(packed_weight, 1)
+        if vb_prod > 0:
+            x: uint256 = unsafe_div(unsafe_mul(_supply, current), _packed_vbs[asset] & VB_MASK)
+            if x == 0:
+                vb_prod = 0
+            else:
+                l = unsafe_add(l, self._log_pow(x, unsafe_mul(current, num_assets)))
+
+    if vb_prod > 0:
+        vb_prod = self._exp_down(l)
+    return amplification, vb_prod, packed_weights, True
+
+@internal
+@pure
+def _ramp_weight(_packed: uint256, _progress: uint256) -> uint256:
+    # interpolate weight towards target weight
+    if _progress == 0:
+        return _packed
+    weight: uint256 = _packed & WEIGHT_MASK
+    target: uint256 = shift(_packed, TARGET_WEIGHT_SHIFT) & WEIGHT_MASK
+    if weight > target:
+        weight = unsafe_sub(weight, unsafe_div(unsafe_mul(unsafe_sub(weight, target), _progress), PRECISION))
+    else:
+        weight = unsafe_add(weight, unsafe_div(unsafe_mul(unsafe_sub(target, weight), _progress), PRECISION))
+    return unsafe_sub(_packed, _packed & WEIGHT_MASK) | weight
+
+@internal
+@pure
+def _check_bands(_prev_ratio: uint256, _ratio: uint256, _packed_weight: uint256):
+    weight: uint256 = unsafe_mul(_packed_weight & WEIGHT_MASK, WEIGHT_SCALE)
+
+    # lower limit check
+    limit: uint256 = unsafe_mul(shift(_packed_weight, LOWER_BAND_SHIFT) & WEIGHT_MASK, WEIGHT_SCALE)
+    if limit > weight:
+        limit = 0
+    else:
+        limit = unsafe_sub(weight, limit)
+    if _ratio < limit:
+        assert _ratio > _prev_ratio # dev: ratio below lower band
+
+    # upper limit check
+    limit = min(unsafe_add(weight, unsafe_mul(shift(_packed_weight, UPPER_BAND_SHIFT), WEIGHT_SCALE)), PRECISION)
+    if _ratio > limit:
+        assert _ratio < _prev_ratio # dev: ratio above upper band
+
+@internal
+@pure
+def _calc_supply(_num_assets: uint256, _supply: uint256, _amplification: uint256, _vb_prod: uint256, _vb_sum: uint256, _up: bool) -> (uint256, uint256):
+    # Newton's method on f(s) = l - d s - s r(s), r(s) = r[n] (s/s[n])^n
+    # s[n+1] = (l + n s r) / (d + (n + 1) r)
+
+    l: uint256 = _amplification
+    d: uint256 = l - PRECISION
+    s: uint256 = _supply
+    r: uint256 = _vb_prod
+    l = l * _vb_sum
+
+    num_assets: uint256 = _num_assets
+    for _ in range(255):
+        sp: uint256 = unsafe_div(unsafe_add(l, unsafe_mul(unsafe_mul(num_assets, s), r)), unsafe_add(d, unsafe_mul(unsafe_add(num_assets, 1), r))) # (l + n s r) / (d + (n + 1) r)
+        if sp > unsafe_mul(s, MAX_SUPPLY_STEP):
+            # limit step, keeps the power of the ratio and its product with r within 256 bits
+            sp = unsafe_mul(s, MAX_SUPPLY_STEP)
+        precision: uint256 = PRECISION * PRECISION
+        if sp > unsafe_div(unsafe_mul(s, 14), 10):
+            precision = PRECISION
+        b: uint256 = unsafe_div(unsafe_mul(sp, precision), s) # sp / s
+        p: uint256 = precision
+        e: uint256 = num_assets
+        for i in range(6):
+            if e & 1 == 1:
+                p = unsafe_div(unsafe_mul(p, b), precision)
+            e = shift(e, -1)
+            if e == 0:
+                break
+            b = unsafe_div(unsafe_mul(b, b), precision)
+        r = r * p / precision # r * (sp / s)^n
+        if sp >= s:
+            if (sp - s) * PRECISION / s <= MAX_POW_REL_ERR:
+                if _up:
+                    sp += sp * MAX_POW_REL_ERR / PRECISION
+                else:
+                    sp -= sp * MAX_POW_REL_ERR / PRECISION
+                return sp, r
+        else:
+            if (s - sp) * PRECISION / s <= MAX_POW_REL_ERR:
+                if _up:
+                    sp += sp * MAX_POW_REL_ERR / PRECISION
+                else:
+                    sp -= sp * MAX_POW_REL_ERR / PRECISION
+                return sp, r
+        s = sp
+
+    raise # dev: no convergence
+
+@internal
+@pure
+def _calc_vb(_wn: uint256, _y: uint256, _supply: uint256, _amplification: uint256, _vb_prod: uint256, _vb_sum: uint256) -> uint256:
+    # y = x_j, sum' = sum(x_i, i != j), prod' = prod(x_i^w_i, i != j)
+    # w = product(w_i), v_i = w_i n, f_i = 1/v_i
+    # Iteratively find root of g(y) using Newton's method
+    # g(y) = y^(v_j + 1) + (sum' + (w^n / A - 1) D y^(w_j n) - D^(n+1) w^2n / prod'^n
+    #      = y^(v_j + 1) + b y^(v_j) - c
+    # y[n+1] = y[n] - g(y[n])/g'(y[n])
+    #        = (y[n]^2 + b (1 - f_j) y[n] + c f_j y[n]^(1 - v_j)) / (f_j + 1) y[n] + b)
+
+    d: uint256 = _supply
+    b: uint256 = d * PRECISION / _amplification # actually b + D
+    c: uint256 = _vb_prod * b / PRECISION
+    b += _vb_sum
+    f: uint256 = PRECISION * PRECISION / _wn
+
+    # the root is above the constant sum solution, start no lower than that
+    y: uint256 = _y
+    if d > b and y < d - b:
+        y = d - b
+    for _ in range(255):
+        yp: uint256 = (y + b + d * f / PRECISION + c * f / self._pow_up(y, _wn) - b * f / PRECISION - d) * y / (f * y / PRECISION + y + b - d)
+        if yp >= y:
+            if (yp - y) * PRECISION / y <= MAX_POW_REL_ERR:
+                yp += yp * MAX_POW_REL_ERR / PRECISION
+                return yp
+        else:
+            if (y - yp) * PRECISION / y <= MAX_POW_REL_ERR:
+                yp += yp * MAX_POW_REL_ERR / PRECISION
+                return yp
+        y = yp
+    
+    raise # dev: no convergence
+
+@internal
+@pure
+def _slope(_amplification: uint256, _supply: uint256, _vb_prod: uint256, _vb: uint256, _wn: uint256) -> uint256:
+    # partial derivative of the invariant to a virtual balance: A f^n + D pi v_i / x_i
+    return _amplification + _supply * _vb_prod / _vb * _wn / PRECISION
+
+@internal
+@pure
+def _unpack_wn(_packed: uint256, _num_assets: uint256) -> uint256:
+    return unsafe_mul(unsafe_mul(_packed & WEIGHT_MASK, WEIGHT_SCALE), _num_assets)
+
+@internal
+@pure
+def _pow_up(_x: uint256, _y: uint256) -> uint256:
+    # guaranteed to be >= the actual value
+    p: uint256 = 0
+    if _y % POW_EXACT_STEP == 0:
+        if _y < POW_EXACT_BOUND and _x > 0:
+            p = self._pow_exact(_x, _y, True)
+            if p > 0:
+                return p
+    p = self._pow(_x, _y)
+    if p == 0:
+        return 0
+    # p + (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    return unsafe_add(unsafe_add(p, unsafe_div(unsafe_sub(unsafe_mul(p, MAX_POW_REL_ERR), 1), PRECISION)), 1)
+
+@internal
+@pure
+def _pow_down(_x: uint256, _y: uint256) -> uint256:
+    # guaranteed to be <= the actual value
+    p: uint256 = 0
+    if _y % POW_EXACT_STEP == 0:
+        if _y < POW_EXACT_BOUND and _x > 0:
+            p = self._pow_exact(_x, _y, False)
+            if p > 0:
+                return p
+    p = self._pow(_x, _y)
+    if p == 0:
+        return 0
+    # (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    e: uint256 = unsafe_add(unsafe_div(unsafe_sub(unsafe_mul(p, MAX_POW_REL_ERR), 1), PRECISION), 1)
+    if p < e:
+        return 0
+    return unsafe_sub(p, e)
+
+@internal
+@pure
+def _pow_exact(_x: uint256, _y: uint256, _up: bool) -> uint256:
+    # x^y by squaring, for integer and half-integer exponents below 256
+    # every step is rounded in the same direction, zero if it cannot be calculated this way
+    r: uint256 = PRECISION
+    if _y % PRECISION != 0:
+        # half-integer, start from sqrt(x)
+        if _x > max_value(uint256) / PRECISION:
+            return 0
+        s: uint256 = unsafe_mul(_x, PRECISION)
+        r = isqrt(s)
+        if _up and unsafe_mul(r, r) < s:
+            r = unsafe_add(r, 1)
+
+    b: uint256 = _x
+    n: uint256 = _y / PRECISION
+    for _ in range(8):
+        if n % 2 == 1:
+            r = self._mul_exact(r, b, _up)
+            if r == 0:
+                return 0
+        n = shift(n, -1)
+        if n == 0:
+            break
+        b = self._mul_exact(b, b, _up)
+        if b == 0:
+            return 0
+    return r
+
+@internal
+@pure
+def _mul_exact(_a: uint256, _b: uint256, _up: bool) -> uint256:
+    # a * b in 18 decimals, zero on overflow
+    if _a > max_value(uint256) / _b:
+        return 0
+    p: uint256 = unsafe_mul(_a, _b)
+    if _up and p % PRECISION > 0:
+        return unsafe_add(unsafe_div(p, PRECISION), 1)
+    return unsafe_div(p, PRECISION)
+
+@internal
+@pure
+def _pow(_x: uint256, _y: uint256) -> uint256:
+    # x^y
+    if _y == 0:
+        return convert(E18, uint256) # x^0 == 1
+
+    if _x == 0:
+        return 0 # 0^y == 0
+    
+    assert shift(_x, -255) == 0 # dev: x out of bounds
+    assert _y < MILD_EXP_BOUND # dev: y out of bounds
+
+    # x^y = e^log(x^y)) = e^(y log x)
+    x: int256 = convert(_x, int256)
+    y: int256= convert(_y, int256)
+    l: int256 = 0
+    if x > LOG36_LOWER and x < LOG36_UPPER:
+        l = self._log36(x)
+        # l / E18 * y + (l % E18) * y / E18
+        l = unsafe_add(unsafe_mul(unsafe_div(l, E18), y), unsafe_div(unsafe_mul(l % E18, y), E18))
+    else:
+        l = unsafe_mul(self._log(x), y)
+    l = unsafe_div(l, E18)
+    return convert(self._exp(l), uint256)
+
+@internal
+@pure
+def _log_pow(_x: uint256, _y: uint256) -> int256:
+    # y log x, same as the first part of `_pow`
+    assert _x > 0 and shift(_x, -255) == 0 # dev: x out of bounds
+    assert _y < MILD_EXP_BOUND # dev: y out of bounds
+
+    x: int256 = convert(_x, int256)
+    y: int256= convert(_y, int256)
+    l: int256 = 0
+    if x > LOG36_LOWER and x < LOG36_UPPER:
+        l = self._log36(x)
+        # l / E18 * y + (l % E18) * y / E18
+        l = unsafe_add(unsafe_mul(unsafe_div(l, E18), y), unsafe_div(unsafe_mul(l % E18, y), E18))
+    else:
+        l = unsafe_mul(self._log(x), y)
+    return unsafe_div(l, E18)
+
+@internal
+@pure
+def _exp_up(_l: int256) -> uint256:
+    # guaranteed to be >= the actual value of e^l, for sums of up to `MAX_NUM_ASSETS` `_log_pow` terms
+    if _l < MIN_NAT_EXP:
+        # e^MIN_NAT_EXP < 2 wei
+        return 2
+    p: uint256 = convert(self._exp(_l), uint256)
+    # p + (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    return unsafe_add(unsafe_add(p, unsafe_div(unsafe_sub(unsafe_mul(p, MAX_POW_REL_ERR), 1), PRECISION)), 1)
+
+@internal
+@pure
+def _exp_down(_l: int256) -> uint256:
+    # guaranteed to be <= the actual value of e^l, for sums of up to `MAX_NUM_ASSETS` `_log_pow` terms
+    if _l < MIN_NAT_EXP:
+        return 0
+    p: uint256 = convert(self._exp(_l), uint256)
+    # (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    e: uint256 = unsafe_add(unsafe_div(unsafe_sub(unsafe_mul(p, MAX_POW_REL_ERR), 1), PRECISION), 1)
+    if p < e:
+        return 0
+    return unsafe_sub(p, e)
+
+@internal
+@pure
+def _log36(_x: int256) -> int256:
+    x: int256 = unsafe_mul(_x, E18)
+    
+    # Taylor series
+    # z = (x - 1) / (x + 1)
+    # c = log x = 2 * sum(z^(2n + 1) / (2n + 1))
+
+    z: int256 = unsafe_div(unsafe_mul(unsafe_sub(x, E36), E36), unsafe_add(x, E36)) # (x - E36) * E36 / (x + E36)
+    zsq: int256 = unsafe_div(unsafe_mul(z, z), E36)
+    n: int256 = z
+    c: int256 = z
+
+    n = unsafe_div(unsafe_mul(n, zsq), E36) # n * zsq / E36
+    c = unsafe_add(c, n / 3)
+    n = unsafe_div(unsafe_mul(n, zsq), E36)
+    c = unsafe_add(c, n / 5)
+    n = unsafe_div(unsafe_mul(n, zsq), E36)
+    c = unsafe_add(c, n / 7)
+    n = unsafe_div(unsafe_mul(n, zsq), E36)
+    c = unsafe_add(c, n / 9)
+    n = unsafe_div(unsafe_mul(n, zsq), E36)
+    c = unsafe_add(c, n / 11)
+    n = unsafe_div(unsafe_mul(n, zsq), E36)
+    c = unsafe_add(c, n / 13)
+    n = unsafe_div(unsafe_mul(n, zsq), E36)
+    c = unsafe_add(c, n / 15)
+
+    return unsafe_mul(c, 2)
+
+@internal
+@pure
+def _log(_a: int256) -> int256:
+    if _a < E18:
+        # 1/a > 1, log(a) = -log(1/a)
+        return -self.__log(unsafe_div(unsafe_mul(E18, E18), _a))
+    return self.__log(_a)
+
+@internal
+@pure
+def __log(_a: int256) -> int256:
+    # log a = sum(k_n x_n) + log(rem)
+    #       = log(product(a_n^k_n) * rem)
+    # k_n = {0,1}, x_n = 2^(7-n), log(a_n) = x_n
+    a: int256 = _a
+    s: int256 = 0
+
+    # divide out a_ns
+    if a >= unsafe_mul(A0, E18):
+        a = unsafe_div(a, A0)
+        s = unsafe_add(s, X0)
+    if a >= unsafe_mul(A1, E18):
+        a = unsafe_div(a, A1)
+        s = unsafe_add(s, X1)
+    
+    # other terms are in 20 decimals
+    a = unsafe_mul(a, 100)
+    s = unsafe_mul(s, 100)
+
+    if a >= A2:
+        a = unsafe_div(unsafe_mul(a, E20), A2) # a * E20 / A2
+        s = unsafe_add(s, X2)
+    if a >= A3:
+        a = unsafe_div(unsafe_mul(a, E20), A3)
+        s = unsafe_add(s, X3)
+    if a >= A4:
+        a = unsafe_div(unsafe_mul(a, E20), A4)
+        s = unsafe_add(s, X4)
+    if a >= A5:
+        a = unsafe_div(unsafe_mul(a, E20), A5)
+        s = unsafe_add(s, X5)
+    if a >= A6:
+        a = unsafe_div(unsafe_mul(a, E20), A6)
+        s = unsafe_add(s, X6)
+    if a >= A7:
+        a = unsafe_div(unsafe_mul(a, E20), A7)
+        s = unsafe_add(s, X7)
+    if a >= A8:
+        a = unsafe_div(unsafe_mul(a, E20), A8)
+        s = unsafe_add(s, X8)
+    if a >= A9:
+        a = unsafe_div(unsafe_mul(a, E20), A9)
+        s = unsafe_add(s, X9)
+    if a >= A10:
+        a = unsafe_div(unsafe_mul(a, E20), A10)
+        s = unsafe_add(s, X10)
+    if a >= A11:
+        a = unsafe_div(unsafe_mul(a, E20), A11)
+        s = unsafe_add(s, X11)
+
+    # a < A11 (1.06), taylor series for remainder
+    # z = (a - 1) / (a + 1)
+    # c = log a = 2 * sum(z^(2n + 1) / (2n + 1))
+    z: int256 = unsafe_div(unsafe_mul(unsafe_sub(a, E20),  E20), unsafe_add(a, E20)) # (a - E20) * E20 / (a + E20)
+    zsq: int256 = unsafe_div(unsafe_mul(z, z), E20) # z * z / E20
+    n: int256 = z
+    c: int256 = z
+
+    n = unsafe_div(unsafe_mul(n, zsq), E20) # n * zsq / E20
+    c = unsafe_add(c, unsafe_div(n, 3)) # c + n / 3
+    n = unsafe_div(unsafe_mul(n, zsq), E20)
+    c = unsafe_add(c, unsafe_div(n, 5))
+    n = unsafe_div(unsafe_mul(n, zsq), E20)
+    c = unsafe_add(c, unsafe_div(n, 7))
+    n = unsafe_div(unsafe_mul(n, zsq), E20)
+    c = unsafe_add(c, unsafe_div(n, 9))
+    n = unsafe_div(unsafe_mul(n, zsq), E20)
+    c = unsafe_add(c, unsafe_div(n, 11))
+
+    c = unsafe_mul(c, 2)
+    return unsafe_div(unsafe_add(s, c), 100) # (s + c) / 100
+
+@internal
+@pure
+def _exp(_x: int256) -> int256:
+    assert _x >= MIN_NAT_EXP and _x <= MAX_NAT_EXP
+    if _x < 0:
+        # exp(-x) = 1/exp(x)
+        return unsafe_mul(E18, E18) / self.__exp(-_x)
+    return self.__exp(_x)
+
+@internal
+@pure
+def __exp(_x: int256) -> int256:
+    # e^x = e^(sum(k_n x_n) + rem)
+    #     = product(e^(k_n x_n)) * e^(rem)
+    #     = product(a_n^k_n) * e^(rem)
+    # k_n = {0,1}, x_n = 2^(7-n), a_n = exp(x_n)
+    x: int256 = _x
+
+    # subtract out x_ns
+    f: int256 = 1
+    if x >= X0:
+        x = unsafe_sub(x, X0)
+        f = A0
+    elif x >= X1:
+        x = unsafe_sub(x, X1)
+        f = A1
+
+    # other terms are in 20 decimals
+    x = unsafe_mul(x, 100)
+
+    p: int256 = E20
+    if x >= X2:
+        x = unsafe_sub(x, X2)
+        p = unsafe_div(unsafe_mul(p, A2), E20) # p * A2 / E20
+    if x >= X3:
+        x = unsafe_sub(x, X3)
+        p = unsafe_div(unsafe_mul(p, A3), E20)
+    if x >= X4:
+        x = unsafe_sub(x, X4)
+        p = unsafe_div(unsafe_mul(p, A4), E20)
+    if x >= X5:
+        x = unsafe_sub(x, X5)
+        p = unsafe_div(unsafe_mul(p, A5), E20)
+    if x >= X6:
+        x = unsafe_sub(x, X6)
+        p = unsafe_div(unsafe_mul(p, A6), E20)
+    if x >= X7:
+        x = unsafe_sub(x, X7)
+        p = unsafe_div(unsafe_mul(p, A7), E20)
+    if x >= X8:
+        x = unsafe_sub(x, X8)
+        p = unsafe_div(unsafe_mul(p, A8), E20)
+    if x >= X9:
+        x = unsafe_sub(x, X9)
+        p = unsafe_div(unsafe_mul(p, A9), E20)
+    
+    # x < X9 (0.25), taylor series for remainder
+    # c = e^x = sum(x^n / n!)
+    n: int256 = x
+    c: int256 = unsafe_add(E20, x)
+
+    n = unsafe_div(unsafe_div(unsafe_mul(n, x), E20), 2) # n * x / E20 / 2
+    c = unsafe_add(c, n)
+    n = unsafe_div(unsafe_div(unsafe_mul(n, x), E20), 3)
+    c = unsafe_add(c, n)
+    n = unsafe_div(unsafe_div(unsafe_mul(n, x), E20), 4)
+    c = unsafe_add(c, n)
+    n = unsafe_div(unsafe_div(unsafe_mul(n, x), E20), 5)
+    c = unsafe_add(c, n)
+    n = unsafe_div(unsafe_div(unsafe_mul(n, x), E20), 6)
+    c = unsafe_add(c, n)
+    n = unsafe_div(unsafe_div(unsafe_mul(n, x), E20), 7)
+    c = unsafe_add(c, n)
+    n = unsafe_div(unsafe_div(unsafe_mul(n, x), E20), 8)
+    c = unsafe_add(c, n)
+    n = unsafe_div(unsafe_div(unsafe_mul(n, x), E20), 9)
+    c = unsafe_add(c, n)
+    n = unsafe_div(unsafe_div(unsafe_mul(n, x), E20), 10)
+    c = unsafe_add(c, n)
+    n = unsafe_div(unsafe_div(unsafe_mul(n, x), E20), 11)
+    c = unsafe_add(c, n)
+    n = unsafe_div(unsafe_div(unsafe_mul(n, x), E20), 12)
+    c = unsafe_add(c, n)
+
+    # p * c / E20 * f / 100
+    return unsafe_div(unsafe_mul(unsafe_div(unsafe_mul(p, c), E20), f), 100)
@@ -23,8 +23,12 @@ treasury: public(address)
 
 # voting
 half_time: public(uint256)
-previous_packed_weights: HashMap[address, uint256]
+num_weight_checkpoints: public(HashMap[address, uint256])
+weight_checkpoints: HashMap[address, HashMap[uint256, uint256]] # packed vote weight at the end of each week with an update
 packed_weights: HashMap[address, uint256]
+previous_packed_total_weight: uint256
+packed_total_weight: uint256
+total_weight_start: uint256 # sum of shares times effective start time over all accounts
 
 # ERC20 state
 totalSupply: public(uint256)
@@ -99,6 +103,8 @@ UPDATED_MASK: constant(uint256) = 2**56 - 1
 UPDATED_SHIFT: constant(int128) = -72
 SHARES_MASK: constant(uint256) = 2**128 - 1
 SHARES_SHIFT: constant(int128) = -128
+MAX_ACCOUNTS: constant(uint256) = 256
+CHECKPOINT_SEARCH_STEPS: constant(uint256) = 17 # enough for 2**16 weeks
 
 @external
 def __init__(_asset: address):
@@ -454,22 +460,74 @@ def vote_weight(_account: address) -> uint256:
     @param _account Account to find get the vote weight for
     @return Vote weight
     """
-    current_week: uint256 = block.timestamp / WEEK_LENGTH - 1
+    return self._vote_weight(_account, block.timestamp / WEEK_LENGTH, self.half_time)
 
-    packed_weight: uint256 = self.packed_weights[_account]
-    week: uint256 = packed_weight & WEEK_MASK
-    if week > current_week:
-        packed_weight = self.previous_packed_weights[_account]
+@external
+@view
+def vote_weights(_accounts: DynArray[address, MAX_ACCOUNTS]) -> DynArray[uint256, MAX_ACCOUNTS]:
+    """
+    @notice Get the voting weight of multiple accounts
+    @dev Vote weights are always evaluated at the end of last week
+    @param _accounts Accounts to get the vote weight for
+    @return Array with vote weight of each account
+    """
+    current_week: uint256 = block.timestamp / WEEK_LENGTH
+    half_time: uint256 = self.half_time
+    weights: DynArray[uint256, MAX_ACCOUNTS] = []
+    for account in _accounts:
+        weights.append(self._vote_weight(account, current_week, half_time))
+    return weights
 
-    t: uint256 = 0
-    updated: uint256 = 0 
-    shares: uint256 = 0
-    week, t, updated, shares = self._unpack_weight(packed_weight)
-    
-    if week > 0:
-        t += block.timestamp / WEEK_LENGTH * WEEK_LENGTH - updated
+@external
+@view
+def vote_weight_at(_account: address, _week: uint256) -> uint256:
+    """
+    @notice Get the voting weight of an account at the start of a past week
+    @dev Equal to the result of `vote_weight` during that week, 
+        evaluated with the current voting half time
+    @param _account Account to get the vote weight for
+    @param _week Week number, at most the current week
+    @return Vote weight
+    """
+    assert _week <= block.timestamp / WEEK_LENGTH # dev: future week
 
-    return shares * t / (t + self.half_time)
+    packed_weight: uint256 = self.packed_weights[_account]
+    if packed_weight & WEEK_MASK >= _week:
+        # binary search for the last checkpoint before the week
+        low: uint256 = 0
+        high: uint256 = self.num_weight_checkpoints[_account]
+        for _ in range(CHECKPOINT_SEARCH_STEPS):
+            if low == high:
+                break
+            mid: uint256 = (low + high) / 2
+            if self.weight_checkpoints[_account][mid] & WEEK_MASK < _week:
+                low = mid + 1
+            else:
+                high = mid
+        if low == 0:
+            return 0
+        packed_weight = self.weight_checkpoints[_account][low - 1]
+    return self._calc_vote_weight(packed_weight, _week, self.half_time)
+
+@external
+@view
+def total_vote_weight() -> uint256:
+    """
+    @notice Get the approximate sum of the voting weights of all accounts
+    @dev Vote weights are always evaluated at the end of last week
+    @dev All shares are treated as a single account, staked since the share weighted
+        average of the effective start times of all accounts. Since vote weight is concave
+        in the time staked, the result is never below the sum of the individual vote weights.
+        It exceeds it by at most `sum(s * (t - t_avg)**2) / t_half**2`, plus less than
+        `sum(s) / t_half` and one per account due to rounding. It is exact if all accounts 
+        have the same effective start time
+    @return Total vote weight
+    """
+    current_week: uint256 = block.timestamp / WEEK_LENGTH
+    packed_weight: uint256 = self.packed_total_weight
+    if packed_weight & WEEK_MASK >= current_week:
+        packed_weight = self.previous_packed_total_weight
+    return self._calc_vote_weight(packed_weight, current_week, self.half_time)
 
 @external
 @view
@@ -640,6 +698,45 @@ def _withdraw(_assets: uint256, _shares: uint256, _receiver: address, _owner: ad
     log Transfer(_owner, empty(address), _shares)
     log Withdraw(msg.sender, _receiver, _owner, _assets, _shares)
 
+@internal
+@view
+def _vote_weight(_account: address, _current_week: uint256, _half_time: uint256) -> uint256:
+    """
+    @notice Get the voting weight of an account at the end of last week
+    @param _account Account to get the vote weight for
+    @param _current_week Current week number
+    @param _half_time Time to reach half of the maximum vote weight
+    @return Vote weight
+    """
+    packed_weight: uint256 = self.packed_weights[_account]
+    if packed_weight & WEEK_MASK >= _current_week:
+        num_checkpoints: uint256 = self.num_weight_checkpoints[_account]
+        if num_checkpoints == 0:
+            return 0
+        packed_weight = self.weight_checkpoints[_account][num_checkpoints - 1]
+    return self._calc_vote_weight(packed_weight, _current_week, _half_time)
+
+@internal
+@pure
+def _calc_vote_weight(_packed: uint256, _current_week: uint256, _half_time: uint256) -> uint256:
+    """
+    @notice Calculate the voting weight at the end of last week from packed parameters
+    @param _packed Packed vote weight
+    @param _current_week Current week number
+    @param _half_time Time to reach half of the maximum vote weight
+    @return Vote weight
+    """
+    week: uint256 = 0
+    t: uint256 = 0
+    updated: uint256 = 0 
+    shares: uint256 = 0
+    week, t, updated, shares = self._unpack_weight(_packed)
+    
+    if week > 0:
+        t += _current_week * WEEK_LENGTH - updated
+
+    return shares * t / (t + _half_time)
+
 @internal
 @view
 def _get_totals() -> (uint256, uint256):
@@ -833,7 +930,11 @@ def _update_account_shares(_account: address, _change: uint256, _add: bool):
     last_shares: uint256 = 0
     week, t, updated, last_shares = self._unpack_weight(self.packed_weights[_account])
     if week > 0 and current_week > week:
-        self.previous_packed_weights[_account] = self.packed_weights[_account]
+        # first update this week, checkpoint the weight at the end of the last week with an update
+        num_checkpoints: uint256 = self.num_weight_checkpoints[_account]
+        self.weight_checkpoints[_account][num_checkpoints] = self.packed_weights[_account]
+        self.num_weight_checkpoints[_account] = num_checkpoints + 1
+    last_start: uint256 = updated - t
 
     if shares == 0:
         t = 0
@@ -847,6 +948,32 @@ def _update_account_shares(_account: address, _change: uint256, _add: bool):
             t = prev_shares * t * half_time / (shares * (t + half_time) - prev_shares * t)
 
     self.packed_weights[_account] = self._pack_weight(current_week, t, block.timestamp, shares)
+    self._update_total_weight(current_week, prev_shares, last_start, shares, block.timestamp - t)
+
+@internal
+def _update_total_weight(_current_week: uint256, _last_shares: uint256, _last_start: uint256, _shares: uint256, _start: uint256):
+    """
+    @notice Replace the contribution of an account to the total vote weight
+    @param _current_week Current week number
+    @param _last_shares Previous amount of shares of the account
+    @param _last_start Previous effective start time of the account
+    @param _shares New amount of shares of the account
+    @param _start New effective start time of the account
+    @dev 
+        The total is packed like the vote weight of a single account that holds all shares
+        and has been staking since the share weighted average start time, rounded down
+    """
+    packed: uint256 = self.packed_total_weight
+    week: uint256 = packed & WEEK_MASK
+    if week > 0 and _current_week > week:
+        self.previous_packed_total_weight = packed
+
+    shares: uint256 = shift(packed, SHARES_SHIFT) + _shares - _last_shares
+    start: uint256 = self.total_weight_start + _shares * _start - _last_shares * _last_start
+    self.total_weight_start = start
+    if shares > 0:
+        start /= shares
+    self.packed_total_weight = self._pack_weight(_current_week, 0, start, shares)
 
 @internal
 @pure
@@ -0,0 +1,32 @@
+# @version 0.3.7
+
+from vyper.interfaces import ERC20
+
+interface Pool:
+    def assets(_i: uint256) -> address: view
+    def swap(_i: uint256, _j: uint256, _dx: uint256, _min_dy: uint256, _receiver: address) -> uint256: nonpayable
+    def update_rates(_assets: DynArray[uint256, 32]): nonpayable
+
+interface RateProvider:
+    def set_rate(_asset: address, _rate: uint256): nonpayable
+
+MAX_SWAPS: constant(uint256) = 16
+
+@external
+def swap(_pool: address, _i: DynArray[uint256, MAX_SWAPS], _j: DynArray[uint256, MAX_SWAPS], _dx: DynArray[uint256, MAX_SWAPS]):
+    # execute several swaps in a single transaction, paid from own balance
+    assert len(_j) == len(_i) and len(_dx) == len(_i)
+    for k in range(MAX_SWAPS):
+        if k == len(_i):
+            break
+        ERC20(Pool(_pool).assets(_i[k])).approve(_pool, _dx[k])
+        Pool(_pool).swap(_i[k], _j[k], _dx[k], 0, msg.sender)
+
+@external
+def swap_update_rate(_pool: address, _i: uint256, _j: uint256, _dx: uint256, _provider: address, _rate: uint256):
+    # swap, change the rate of the output asset and update it, in a single transaction
+    asset: address = Pool(_pool).assets(_j)
+    ERC20(Pool(_pool).assets(_i)).approve(_pool, _dx)
+    Pool(_pool).swap(_i, _j, _dx, 0, msg.sender)
+    RateProvider(_provider).set_rate(asset, _rate)
+    Pool(_pool).update_rates([_j])
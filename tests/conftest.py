@@ -1,23 +1,79 @@
 import math
+import os
 import pytest
+import sys
+
+# make the python model in `yeth/` importable from the tests
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from yeth.pool import Pool
 
 PRECISION = 1_000_000_000_000_000_000
 MAX = 2**256 - 1
 DAY_LENGTH = 24 * 60 * 60
 WEEK_LENGTH = 7 * DAY_LENGTH
+WEIGHTS = [PRECISION*1//10, PRECISION*2//10, PRECISION*3//10, PRECISION*4//10]
 
-@pytest.fixture
+def pytest_configure(config):
+    # marker of pytest-xdist, registered here so that it is known without the plugin
+    config.addinivalue_line('markers', 'xdist_group(name): run all tests of the group on the same worker')
+
+# contracts are deployed once per session, every test starts from the same state
+@pytest.fixture(autouse=True)
+def isolation(chain):
+    with chain.isolate():
+        yield
+
+@pytest.fixture(scope='session')
 def deployer(accounts):
     return accounts[0]
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def alice(accounts):
     return accounts[1]
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def bob(accounts):
     return accounts[2]
 
+@pytest.fixture(scope='session')
+def token(project, deployer):
+    return project.Token.deploy(sender=deployer)
+
+@pytest.fixture
+def weights():
+    # fresh copy, tests are free to modify it
+    return list(WEIGHTS)
+
+@pytest.fixture
+def model(weights):
+    # python model of a seeded pool, with the same rates as `pool`
+    n = len(weights)
+    rates = [(i + 2) * PRECISION for i in range(n)]
+    model = Pool.create(calc_w_prod(weights), weights, rates)
+    total = 1_000 * PRECISION
+    model.add_liquidity([total * weights[i] // rates[i] for i in range(n)])
+    model.swap_fee_rate = PRECISION // 1000
+    return model
+
+@pytest.fixture(scope='session')
+def pool(project, deployer, alice, bob, token):
+    assets, provider = deploy_assets(project, deployer, len(WEIGHTS))
+    pool = project.Pool.deploy(token, calc_w_prod(WEIGHTS), assets, [provider for _ in range(len(WEIGHTS))], WEIGHTS, sender=deployer)
+    pool.set_staking(deployer, sender=deployer)
+    token.set_minter(pool, sender=deployer)
+    for asset in assets:
+        asset.approve(pool, MAX, sender=alice)
+        asset.approve(pool, MAX, sender=bob)
+    return assets, provider, pool
+
+@pytest.fixture(scope='session')
+def estimator(project, deployer, pool):
+    return project.Estimator.deploy(pool[2], sender=deployer)
+
+@pytest.fixture(scope='session')
+def quoter(project, deployer):
+    return project.Quoter.deploy(sender=deployer)
+
 def deploy_assets(project, deployer, n):
     assets = []
     provider = project.MockRateProvider.deploy(sender=deployer)
@@ -0,0 +1,100 @@
+"""
+Generate golden vectors for the `Math.vy` tests.
+Every row holds an input `x` and exponent `y` with reference values for `ln`, `ln36`,
+`exponent`, `pow_up` and `pow_down`, calculated with mpmath at high precision.
+Columns are empty when the input is outside of the domain of the function.
+Inputs are drawn from a fixed seed, so the output is reproducible.
+    python tests/generate_math_vectors.py
+    python tests/generate_math_vectors.py --points 100000 --output /tmp/math_vectors.csv.gz
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import os
+import random
+from mpmath import mp, mpf, log, exp, ceil, floor
+
+E3 = 1_000
+E6 = E3 * E3
+E9 = E3 * E6
+E18 = E9 * E9
+LOG36_LOWER = E18 * 9 // 10
+LOG36_UPPER = E18 * 11 // 10
+MIN_NAT_EXP = -41 * E18
+MAX_NAT_EXP = 130 * E18
+MAX_Y = 4 * E18
+
+PATH = os.path.join(os.path.dirname(__file__), 'data', 'math_vectors.csv.gz')
+COLUMNS = ['x', 'y', 'ln', 'ln36', 'exp', 'pow_up', 'pow_down']
+# ranges of `x`, same number of points is drawn from each
+RANGES = [
+    (MIN_NAT_EXP, 0),
+    (1, E18),
+    (LOG36_LOWER + 1, LOG36_UPPER),
+    (E18, 10 * E18),
+    (10 * E18, 100 * E18),
+    (100 * E18, MAX_NAT_EXP + 1),
+    (MAX_NAT_EXP + 1, E3 * E18),
+    (E3 * E18, E6 * E18),
+    (E6 * E18, E9 * E18),
+]
+
+def vector(x, y):
+    """
+    Calculate the reference values of a single input
+    @param x Input, with 18 decimals. Only `exp` is defined for negative values
+    @param y Exponent, with 18 decimals
+    @return Row of reference values, `None` outside of the domain of the function
+        ln: `ln(x)` with 18 decimals, rounded towards zero
+        ln36: `ln(x) * y`, rounded towards zero. `ln36` is only defined close to one
+            and is compared after scaling by `y`, as it is used in `pow`
+        exp: `e^x` with 18 decimals, rounded down
+        pow_up, pow_down: `x^y` with 18 decimals, rounded up and down
+    """
+    row = [x, y, None, None, None, None, None]
+    if MIN_NAT_EXP <= x <= MAX_NAT_EXP:
+        row[4] = int(exp(mpf(x) / E18) * E18)
+    if x <= 0:
+        return row
+
+    lnx = log(mpf(x) / E18)
+    row[2] = int(lnx * E18)
+    if LOG36_LOWER < x < LOG36_UPPER:
+        row[3] = int(lnx * y)
+
+    # keep clear of the exponent bounds, where the rounding of the contract decides
+    l = lnx * y
+    if MIN_NAT_EXP + E9 < l < MAX_NAT_EXP - E9:
+        p = exp(l / E18) * E18
+        row[5] = int(ceil(p))
+        row[6] = int(floor(p))
+    return row
+
+def generate(points, seed):
+    rng = random.Random(seed)
+    for low, high in RANGES:
+        for _ in range(points):
+            yield vector(rng.randrange(low, high), rng.randrange(0, MAX_Y))
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate golden vectors for the Math.vy tests')
+    parser.add_argument('--points', type=int, default=200, help='number of points per range')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dps', type=int, default=60, help='mpmath decimal precision')
+    parser.add_argument('--output', default=PATH)
+    args = parser.parse_args()
+
+    mp.dps = args.dps
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    # fixed mtime, so the same vectors produce the same file
+    with open(args.output, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as z:
+        with io.TextIOWrapper(z, newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            for row in generate(args.points, args.seed):
+                writer.writerow(['' if v is None else v for v in row])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+from conftest import *
+import json
+import os
+import pytest
+import random
+
+# gas benchmark of the user facing pool operations for a range of pool sizes,
+# and of the exp and log implementations in `Math.vy`
+# GAS_REPORT: path of the report, defaults to `gas_report.json`
+# GAS_THRESHOLD: maximum allowed increase over the baseline in percent, defaults to baseline value
+# GAS_UPDATE_BASELINE: when set, write the measurements to the baseline instead of comparing against it
+# gas depends on the EVM, comparing against a baseline recorded on another provider is an error
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'gas_baseline.json')
+REPORT_PATH = os.environ.get('GAS_REPORT', 'gas_report.json')
+UPDATE_BASELINE = os.environ.get('GAS_UPDATE_BASELINE', '') not in ('', '0')
+
+# the report is collected by a module fixture, keep all measurements on the same worker
+pytestmark = pytest.mark.xdist_group('gas')
+
+SIZES = [2, 4, 8, 16, 32]
+DISTRIBUTIONS = ['uniform', 'linear']
+IMBALANCES = [0, 20] # percent
+AMPLIFICATION = 450 * PRECISION
+MATH_SAMPLES = 100
+
+def distribute(n, distribution):
+    if distribution == 'uniform':
+        weights = [PRECISION // n for _ in range(n)]
+    else:
+        total = n * (n + 1) // 2
+        weights = [PRECISION * (i + 1) // total for i in range(n)]
+    weights[-1] += PRECISION - sum(weights)
+    return weights
+
+@pytest.fixture(scope='module')
+def baseline():
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+@pytest.fixture(scope='module')
+def report(chain, baseline):
+    report = {}
+    yield report
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    if UPDATE_BASELINE:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump({'provider': chain.provider.name, 'threshold': baseline['threshold'], 'gas': report}, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+@pytest.mark.parametrize('imbalance', IMBALANCES)
+@pytest.mark.parametrize('distribution', DISTRIBUTIONS)
+@pytest.mark.parametrize('n', SIZES)
+def test_gas(project, chain, deployer, alice, bob, baseline, report, n, distribution, imbalance):
+    weights = distribute(n, distribution)
+    token = project.Token.deploy(sender=deployer)
+    assets, provider = deploy_assets(project, deployer, n)
+    pool = project.Pool.deploy(token, AMPLIFICATION, assets, [provider for _ in range(n)], weights, sender=deployer)
+    pool.set_staking(deployer, sender=deployer)
+    token.set_minter(pool, sender=deployer)
+
+    # seed pool, with every other asset over- or underweight
+    total = 1_000 * PRECISION
+    amts = []
+    for i in range(n):
+        asset = assets[i]
+        asset.approve(pool, MAX, sender=alice)
+        sign = 1 if i % 2 == 0 else -1
+        amt = total * weights[i] * (100 + sign * imbalance) // 100 // provider.rate(asset)
+        amts.append(amt)
+        asset.mint(alice, 2 * amt, sender=alice)
+    pool.add_liquidity(amts, 0, deployer, sender=alice)
+    small = [amt // 1000 for amt in amts]
+    lp = pool.supply() // 1000
+
+    # every operation starts from the seeded state
+    gas = {}
+    with chain.isolate():
+        gas['swap'] = pool.swap(0, n - 1, small[0], 0, bob, sender=alice).gas_used
+    with chain.isolate():
+        # bundle of swaps back and forth, rates are only read by the first one
+        bundler = project.MockBundler.deploy(sender=deployer)
+        assets[0].mint(bundler, 2 * small[0], sender=alice)
+        assets[n - 1].mint(bundler, 2 * small[-1], sender=alice)
+        gas['swap_bundle'] = bundler.swap(pool, [0, n - 1, 0, n - 1], [n - 1, 0, n - 1, 0], small[:1] + small[-1:] + small[:1] + small[-1:], sender=alice).gas_used
+    with chain.isolate():
+        gas['swap_exact_out'] = pool.swap_exact_out(0, n - 1, small[-1], MAX, bob, sender=alice).gas_used
+    with chain.isolate():
+        gas['add_liquidity'] = pool.add_liquidity(small, 0, sender=alice).gas_used
+    with chain.isolate():
+        gas['remove_liquidity'] = pool.remove_liquidity(lp, [0 for _ in range(n)], sender=deployer).gas_used
+    with chain.isolate():
+        gas['remove_liquidity_single'] = pool.remove_liquidity_single(0, lp, 0, sender=deployer).gas_used
+    with chain.isolate():
+        for asset in assets:
+            provider.set_rate(asset, provider.rate(asset) * 1001 // 1000, sender=alice)
+        gas['update_rates'] = pool.update_rates(list(range(n)), sender=alice).gas_used
+    with chain.isolate():
+        ts = chain.pending_timestamp
+        pool.set_ramp(AMPLIFICATION, list(reversed(weights)), WEEK_LENGTH, ts, sender=deployer)
+        chain.pending_timestamp = ts + WEEK_LENGTH // 2
+        gas['update_weights'] = pool.update_weights(sender=alice).gas_used
+    with chain.isolate():
+        # swap that takes a ramp step
+        ts = chain.pending_timestamp
+        pool.set_ramp(AMPLIFICATION, list(reversed(weights)), WEEK_LENGTH, ts, sender=deployer)
+        chain.pending_timestamp = ts + WEEK_LENGTH // 4
+        pool.update_weights(sender=alice)
+        chain.pending_timestamp = ts + WEEK_LENGTH // 2
+        gas['swap_ramp'] = pool.swap(0, n - 1, small[0], 0, bob, sender=alice).gas_used
+
+    check_baseline(chain, baseline, report, f'{n}-{distribution}-{imbalance}', gas)
+
+@pytest.mark.parametrize('fn', ['exp', 'log', 'pow'])
+def test_math_gas(project, chain, deployer, baseline, report, fn):
+    # average gas of the current and the rational exp and log in `Math.vy`, over the domain
+    math = project.Math.deploy(sender=deployer)
+    rng = random.Random(0)
+    if fn == 'exp':
+        args = [[rng.randrange(-41 * PRECISION, 130 * PRECISION) for _ in range(MATH_SAMPLES)]]
+    elif fn == 'log':
+        # spread over orders of magnitude
+        args = [[rng.randrange(1, 10**(3 * k % 36 + 3)) for k in range(MATH_SAMPLES)]]
+    else:
+        args = [
+            [rng.randrange(PRECISION // 100, 100 * PRECISION) for _ in range(MATH_SAMPLES)],
+            [rng.randrange(1, 4 * PRECISION) for _ in range(MATH_SAMPLES)],
+        ]
+    gas_fn = getattr(math, f'gas_{fn}')
+    gas = {variant: gas_fn(*args, rational) // MATH_SAMPLES for variant, rational in [('current', False), ('rational', True)]}
+    check_baseline(chain, baseline, report, f'math-{fn}', gas)
+
+def check_baseline(chain, baseline, report, key, gas):
+    report[key] = gas
+    if UPDATE_BASELINE:
+        return
+    assert baseline['provider'] == chain.provider.name, \
+        f"baseline recorded on {baseline['provider']}, not {chain.provider.name}, rerun with GAS_UPDATE_BASELINE=1 to record it"
+
+    threshold = float(os.environ.get('GAS_THRESHOLD', baseline['threshold']))
+    expected = baseline['gas'].get(key)
+    assert expected is not None, f'{key} missing from baseline'
+    regressions = {
+        op: f'{expected[op]} -> {gas[op]}' for op in gas
+        if op in expected and gas[op] > expected[op] * (100 + threshold) / 100
+    }
+    assert not regressions, f'{key} regressed by more than {threshold}%: {regressions}'
@@ -1,123 +1,156 @@
-from mpmath import *
+import ape
+import csv
+import gzip
+import itertools
+import os
+import pytest
 import random
-
-mp.dps = 20
+from yeth.math import pow_down, pow_exact, pow_up
 
 E3 = 1_000
 E6 = E3 * E3
 E9 = E3 * E6
 E18 = E9 * E9
 MAX_REL_ERR = 200
-N_ITER = 100
-
-def test_log(project, accounts):
-    math = project.Math.deploy(sender=accounts[0])
-    random.seed()
-
-    for _ in range(N_ITER):
-        x = random.randrange(0, E18)
-        a = int(log(mpf(x) / E18) * E18)
-        b = math.ln(x)
-        assert abs(a - b) <= 2
-
-    for _ in range(N_ITER):
-        x = random.randrange(0, E3 * E18)
-        a = int(log(mpf(x) / E18) * E18)
-        b = math.ln(x)
-        assert abs(a - b) <= 2
-
-    for _ in range(N_ITER):
-        x = random.randrange(0, E6 * E18)
-        a = int(log(mpf(x) / E18) * E18)
-        b = math.ln(x)
-        assert abs(a - b) <= 2
-
-def test_log36(project, accounts):
-    math = project.Math.deploy(sender=accounts[0])
-    random.seed()
-
-    for _ in range(N_ITER):
-        x = random.randrange(E18 * 9 // 10, E18 * 11 // 10)
-        y = random.randrange(0, 4 * E18)
-        a = int(log(mpf(x) / E18) * y)
-        b = math.ln36(x)
-        b = (b // E18 * y + (b % E18) * y // E18) // E18
-        assert abs(a - b) <= 2
-
-def test_exp(project, accounts):
-    math = project.Math.deploy(sender=accounts[0])
-    random.seed()
-
-    for _ in range(N_ITER):
-        x = random.randrange(0, E18)
-        a = int(exp(mpf(x) / E18) * E18)
-        b = math.exponent(x)
-        e = abs((b * MAX_REL_ERR - 1) // E18 + 1)
-        assert abs(a - b) <= e
-
-    for _ in range(N_ITER):
-        x = random.randrange(E18, 10 * E18)
-        a = int(exp(mpf(x) / E18) * E18)
-        b = math.exponent(x)
-        e = abs((b * MAX_REL_ERR - 1) // E18 + 1)
-        assert abs(a - b) <= e
-
-    for _ in range(N_ITER):
-        x = random.randrange(10 * E18, 100 * E18)
-        a = int(exp(mpf(x) / E18) * E18)
-        b = math.exponent(x)
+MAX_BATCH = 256
+
+# golden vectors generated by `tests/generate_math_vectors.py`
+# MATH_VECTORS: path of a vector file, defaults to `tests/data/math_vectors.csv.gz`
+# MATH_BATCH_SIZE: number of vectors per test, defaults to 500
+VECTORS_PATH = os.environ.get('MATH_VECTORS', os.path.join(os.path.dirname(__file__), 'data', 'math_vectors.csv.gz'))
+BATCH_SIZE = int(os.environ.get('MATH_BATCH_SIZE', 500))
+
+@pytest.fixture(scope='module')
+def math(project, accounts):
+    return project.Math.deploy(sender=accounts[0])
+
+def read_vectors(start=0, stop=None):
+    # stream rows from the golden vector file, empty columns are outside of the domain
+    with gzip.open(VECTORS_PATH, 'rt', newline='') as f:
+        rows = csv.reader(f)
+        next(rows)
+        for row in itertools.islice(rows, start, stop):
+            yield [int(v) if v else None for v in row]
+
+NUM_BATCHES = -(-sum(1 for _ in read_vectors()) // BATCH_SIZE)
+
+def evaluate(fn, *args):
+    # evaluate in as few calls as possible
+    res = []
+    for i in range(0, len(args[0]), MAX_BATCH):
+        res += fn(*[arg[i:i + MAX_BATCH] for arg in args])
+    return res
+
+# every batch is a separate test, so they can be distributed over workers
+# the rational approximations of exp and log are held to the same tolerances
+@pytest.mark.parametrize('rational', [False, True])
+@pytest.mark.parametrize('batch', range(NUM_BATCHES))
+def test_vectors(math, batch, rational):
+    rows = list(read_vectors(batch * BATCH_SIZE, (batch + 1) * BATCH_SIZE))
+    x, y, ln, ln36, exp, pow_up, pow_down = [[row[k] for row in rows] for k in range(7)]
+    if rational:
+        ln_many, exp_many = math.ln_rational_many, math.exponent_rational_many
+        pow_many = math.pow_rational_many
+    else:
+        ln_many, exp_many = math.ln_many, math.exponent_many
+        pow_many = lambda x, y: (math.pow_up_many(x, y), math.pow_down_many(x, y))
+
+    idx = [k for k in range(len(rows)) if ln[k] is not None]
+    res = evaluate(ln_many, [x[k] for k in idx])
+    for k, b in zip(idx, res):
+        assert abs(b - ln[k]) <= 2, x[k]
+
+    # `ln36` has no rational variant
+    idx = [k for k in range(len(rows)) if ln36[k] is not None and not rational]
+    res = evaluate(math.ln36_many, [x[k] for k in idx])
+    for k, b in zip(idx, res):
+        b = (b // E18 * y[k] + (b % E18) * y[k] // E18) // E18
+        assert abs(b - ln36[k]) <= 2, x[k]
+
+    idx = [k for k in range(len(rows)) if exp[k] is not None]
+    res = evaluate(exp_many, [x[k] for k in idx])
+    for k, b in zip(idx, res):
         e = abs((b * MAX_REL_ERR - 1) // E18 + 1)
-        assert abs(a - b) <= e
-
-def test_pow(project, accounts):
-    math = project.Math.deploy(sender=accounts[0])
-    random.seed()
-
-    for _ in range(N_ITER):
-        x = random.randrange(0, E18)
-        y = random.randrange(0, 4 * E18)
-        a = int(pow(mpf(x) / E18, mpf(y) / E18) * E18)
-        b = math.pow_up(x, y)
-        c = math.pow_down(x, y)
-        e = max(2, (a * MAX_REL_ERR - 1) // E18 + 1)
-        assert b >= a and b - a <= e
-        assert c <= a and a - c <= e
-
-    for _ in range(N_ITER):
-        x = random.randrange(E18, E3 * E18)
-        y = random.randrange(0, 4 * E18)
-        a = int(pow(mpf(x) / E18, mpf(y) / E18) * E18)
-        b = math.pow_up(x, y)
-        c = math.pow_down(x, y)
-        e = (a * MAX_REL_ERR - 1) // E18 + 1
-        assert b >= a and b - a <= e
-        assert c <= a and a - c <= e
-
-    for _ in range(N_ITER):
-        x = random.randrange(E3 * E18, E6 * E18)
-        y = random.randrange(0, 4 * E18)
-        a = int(pow(mpf(x) / E18, mpf(y) / E18) * E18)
-        b = math.pow_up(x, y)
-        c = math.pow_down(x, y)
-
-        e = (a * MAX_REL_ERR - 1) // E18 + 1
-        assert b >= a and b - a <= e
-        assert c <= a and a - c <= e
-
-    for _ in range(N_ITER):
-        x = random.randrange(E6 * E18, E9 * E18)
-        y = random.randrange(0, 4 * E18)
-        a = int(pow(mpf(x) / E18, mpf(y) / E18) * E18)
-        b = math.pow_up(x, y)
-        c = math.pow_down(x, y)
-
-        e = (a * MAX_REL_ERR - 1) // E18 + 1
-        assert b >= a and b - a <= e
-        assert c <= a and a - c <= e
-
-def test_D_2d_equal(project, accounts):
-    math = project.Math.deploy(sender=accounts[0])
-    
+        assert abs(b - exp[k]) <= e, x[k]
+
+    idx = [k for k in range(len(rows)) if pow_up[k] is not None]
+    up, down = [], []
+    for i in range(0, len(idx), MAX_BATCH):
+        u, d = pow_many([x[k] for k in idx[i:i + MAX_BATCH]], [y[k] for k in idx[i:i + MAX_BATCH]])
+        up += u
+        down += d
+    for k, b, c in zip(idx, up, down):
+        e = max(2, (pow_up[k] * MAX_REL_ERR - 1) // E18 + 1)
+        assert b >= pow_up[k] and b - pow_up[k] <= e, (x[k], y[k])
+        e = max(2, (pow_down[k] * MAX_REL_ERR - 1) // E18 + 1)
+        assert c <= pow_down[k] and pow_down[k] - c <= e, (x[k], y[k])
+
+def test_many(math):
+    x = [E18 // 3, E18, 5 * E18]
+    y = [E18 // 2, 2 * E18, 3 * E18]
+    assert math.ln_many(x) == [math.ln(v) for v in x]
+    assert math.ln36_many([E18 * 95 // 100, E18]) == [math.ln36(E18 * 95 // 100), 0]
+    assert math.exponent_many([-x[2], 0, x[2]]) == [math.exponent(-x[2]), E18, math.exponent(x[2])]
+    assert math.pow_up_many(x, y) == [math.pow_up(x[k], y[k]) for k in range(3)]
+    assert math.pow_down_many(x, y) == [math.pow_down(x[k], y[k]) for k in range(3)]
+    assert math.ln_many([]) == []
+
+    with ape.reverts():
+        math.pow_up_many(x, y[:-1])
+    with ape.reverts(dev_message='dev: out of bounds'):
+        math.ln_many([E18, 0])
+    with ape.reverts():
+        math.ln36_many([E18, 2 * E18])
+
+def test_rational(math):
+    x = [E18 // 3, E18, 5 * E18]
+    assert math.ln_rational_many(x) == [math.ln_rational(v) for v in x]
+    assert math.ln_rational(E18) == 0
+    assert math.exponent_rational_many([-x[2], 0, x[2]]) == [math.exponent_rational(-x[2]), E18, math.exponent_rational(x[2])]
+    up, down = math.pow_rational_many(x, [2 * E18, 0, E18 // 2])
+    assert down[1] < E18 < up[1]
+    assert down[0] < E18 // 9 < up[0]
+
+    with ape.reverts(dev_message='dev: out of bounds'):
+        math.ln_rational(0)
+    with ape.reverts():
+        math.exponent_rational(131 * E18)
+    with ape.reverts():
+        math.exponent_rational(-42 * E18)
+
+    # the benchmark measures every input
+    assert 0 < math.gas_exp([E18], True) < math.gas_exp([E18, 2 * E18], True)
+
+def test_pow_exact(math):
+    # integer and half-integer exponents are calculated by squaring
+    # fixed seed, a failure has to be reproducible
+    rng = random.Random(0)
+    for m in list(range(1, 9)) + [16, 31, 64]:
+        y = m * E18 // 2
+        # keep y log x within the exponent bounds for the largest exponent
+        for low, high in [(E18 // 2, E18), (E18 * 9 // 10, E18 * 11 // 10), (E18, 10 * E18)]:
+            x = rng.randrange(low, high)
+            up = math.pow_up(x, y)
+            down = math.pow_down(x, y)
+            assert up == pow_up(x, y) and down == pow_down(x, y)
+
+            # (up / E18)^2 >= (x / E18)^m >= (down / E18)^2
+            assert up ** 2 * E18 ** m >= x ** m * E18 ** 2
+            assert down ** 2 * E18 ** m <= x ** m * E18 ** 2
+            assert up - down <= max(m, (up * MAX_REL_ERR - 1) // E18 + 1)
+
+    # equal weights
+    x = rng.randrange(E18, 10 * E18)
+    assert math.pow_up(x, E18) == x and math.pow_down(x, E18) == x
+    assert math.pow_up(x, 0) == E18 and math.pow_down(x, 0) == E18
+
+    # overflow of the squares falls back to the general calculation
+    x = 10**46
+    assert math.pow_up(x, 2 * E18) > math.pow_down(x, 2 * E18) > 0
+    assert pow_exact(x, 2 * E18, True) == 0
+    assert math.pow_up(x, 2 * E18) == pow_up(x, 2 * E18)
+
+def test_D_2d_equal(math):
     a = 10 * E18
     w = [E18*5//10, E18*5//10]
     t = 1_000 * E18
@@ -133,9 +166,7 @@ def test_D_2d_equal(project, accounts):
     ds = sn - s
     assert 1 - ds / dx < 0.0005 # 0.05%
 
-def test_D_2d_weighted(project, accounts):
-    math = project.Math.deploy(sender=accounts[0])
-
+def test_D_2d_weighted(math):
     a = 10 * E18
     w = [E18*8//10, E18*2//10]
     t = 1_000 * E18
@@ -162,9 +193,7 @@ def test_D_2d_weighted(project, accounts):
     loss_20 = 1 - ds / dx
     assert loss_20 < 0.0015 and loss_20 > loss_80 # 0.15%
 
-def test_D_4d_weighted(project, accounts):
-    math = project.Math.deploy(sender=accounts[0])
-
+def test_D_4d_weighted(math):
     a = 10 * E18
     w = [E18*1//10, E18*2//10, E18*3//10, E18*4//10]
     t = 1_000_000 * E18
@@ -172,9 +201,7 @@ def test_D_4d_weighted(project, accounts):
     s, _, _ = math.solve_D(a, w, x, 1)
     assert abs(t - s) / t < 1e-20
 
-def test_y_4d(project, accounts):
-    math = project.Math.deploy(sender=accounts[0])
-
+def test_y_4d(math):
     n = 4
     a = 10 * E18
     w = [E18//n for _ in range(n)]
@@ -189,9 +216,7 @@ def test_y_4d(project, accounts):
     d2, _, _ = math.solve_D(a, w, x, 1)
     assert (d - d2) / d < 1e-16
 
-def test_weight_packing(project, accounts):
-    math = project.Math.deploy(sender=accounts[0])
-
+def test_weight_packing(math):
     weight = E18 * 5 // 10
     lower = E18 // 10
     upper = E18 * 9 // 10
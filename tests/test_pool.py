@@ -6,21 +6,23 @@ PRECISION = 1_000_000_000_000_000_000
 MAX = 2**256 - 1
 ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
 
-@pytest.fixture
-def deployer(accounts):
-    return accounts[0]
-
-@pytest.fixture
-def alice(accounts):
-    return accounts[1]
-
-@pytest.fixture
-def bob(accounts):
-    return accounts[2]
+@pytest.fixture(scope='module')
+def equal_pool(project, deployer, alice, bob, token):
+    # empty pool with 4 equally weighted assets, shared by the tests in this module
+    n = 4
+    assets, provider = deploy_assets(project, deployer, n)
+    weights = [PRECISION//n for _ in range(n)]
+    pool = project.Pool.deploy(token, calc_w_prod(weights) * 10, assets, [provider for _ in range(n)], weights, sender=deployer)
+    pool.set_staking(deployer, sender=deployer)
+    token.set_minter(pool, sender=deployer)
+    for asset in assets:
+        asset.approve(pool, MAX, sender=alice)
+        asset.approve(pool, MAX, sender=bob)
+    return assets, provider, pool
 
-@pytest.fixture
-def token(project, deployer):
-    return project.Token.deploy(sender=deployer)
+@pytest.fixture(scope='module')
+def equal_estimator(project, deployer, equal_pool):
+    return project.Estimator.deploy(equal_pool[2], sender=deployer)
 
 def deploy_assets(project, deployer, n):
     assets = []
@@ -31,23 +33,18 @@ def deploy_assets(project, deployer, n):
         assets.append(asset)
     return assets, provider
 
-def test_withdraw(project, deployer, alice, token):
-    n = 4
-    assets, provider = deploy_assets(project, deployer, n)
-    weights = [PRECISION//n for _ in range(n)]
-    pool = project.Pool.deploy(token, calc_w_prod(weights) * 10, assets, [provider for _ in range(n)], weights, sender=deployer)
-    token.set_minter(pool, sender=deployer)
-    estimator = project.Estimator.deploy(pool, sender=deployer)
+def test_withdraw(deployer, alice, token, equal_estimator, equal_pool):
+    assets, provider, pool = equal_pool
+    n = len(assets)
 
     amt = n * 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt // n, sender=deployer)
 
     pool.add_liquidity([amt // n for _ in range(n)], 0, sender=alice)
 
     # remove liquidity
-    expect = estimator.get_remove_lp(token.balanceOf(alice)//10)
+    expect = equal_estimator.get_remove_lp(token.balanceOf(alice)//10)
     pool.remove_liquidity(token.balanceOf(alice)//10, [0 for _ in range(n)], sender=alice)
 
     for i in range(n):
@@ -55,17 +52,12 @@ def test_withdraw(project, deployer, alice, token):
         assert bal == expect[i]
         assert abs(bal - amt // n // 10) <= 1
 
-def test_withdraw_single(project, deployer, alice, bob, token):
-    n = 4
-    assets, provider = deploy_assets(project, deployer, n)
-    weights = [PRECISION//n for _ in range(n)]
-    pool = project.Pool.deploy(token, calc_w_prod(weights) * 10, assets, [provider for _ in range(n)], weights, sender=deployer)
-    token.set_minter(pool, sender=deployer)
-    estimator = project.Estimator.deploy(pool, sender=deployer)
+def test_withdraw_single(deployer, alice, bob, token, equal_estimator, equal_pool):
+    assets, provider, pool = equal_pool
+    n = len(assets)
 
     amt = n * 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt // n, sender=deployer)
 
     pool.add_liquidity([amt // n for _ in range(n)], 0, sender=alice)
@@ -73,16 +65,15 @@ def test_withdraw_single(project, deployer, alice, bob, token):
 
     # add single sided liquidity
     amt = amt // n // 10
-    assets[0].approve(pool, MAX, sender=bob)
     assets[0].mint(bob, amt, sender=bob)
     amts = [amt if i == 0 else 0 for i in range(n)]
-    expect = estimator.get_add_lp(amts)
+    expect = equal_estimator.get_add_lp(amts)
     pool.add_liquidity(amts, 0, sender=bob)
     bal = token.balanceOf(bob)
     assert bal == expect
 
     # remove single sided liquidity
-    expect = estimator.get_remove_single_lp(0, bal)
+    expect = equal_estimator.get_remove_single_lp(0, bal)
     pool.remove_liquidity_single(0, bal, 0, sender=bob)
     vb_prod2, vb_sum2 = pool.vb_prod_sum()
 
@@ -93,17 +84,12 @@ def test_withdraw_single(project, deployer, alice, bob, token):
     assert abs(vb_sum2 - vb_sum) / vb_sum < 1e-15
     assert abs(vb_prod2 - vb_prod) / vb_prod < 1e-14
 
-def test_swap(project, deployer, alice, bob, token):
-    n = 4
-    assets, provider = deploy_assets(project, deployer, n)
-    weights = [PRECISION//n for _ in range(n)]
-    pool = project.Pool.deploy(token, calc_w_prod(weights) * 10, assets, [provider for _ in range(n)], weights, sender=deployer)
-    token.set_minter(pool, sender=deployer)
-    estimator = project.Estimator.deploy(pool, sender=deployer)
+def test_swap(deployer, alice, bob, equal_estimator, equal_pool):
+    assets, provider, pool = equal_pool
+    n = len(assets)
 
     amt = n * 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt // n, sender=deployer)
     pool.add_liquidity([amt // n for _ in range(n)], 0, sender=alice)
 
@@ -111,9 +97,8 @@ def test_swap(project, deployer, alice, bob, token):
 
     # swap asset 0 for asset 1
     swap = 10 * PRECISION
-    assets[0].approve(pool, MAX, sender=bob)
     assets[0].mint(bob, swap, sender=deployer)
-    expect = estimator.get_dy(0, 1, swap)
+    expect = equal_estimator.get_dy(0, 1, swap)
     pool.swap(0, 1, swap, 0, sender=bob)
     assert assets[0].balanceOf(bob) == 0
     bal = assets[1].balanceOf(bob)
@@ -123,7 +108,6 @@ def test_swap(project, deployer, alice, bob, token):
     assert (swap - bal) / swap < 1e-3
 
     # swap back and receive ~ original amount back
-    assets[1].approve(pool, MAX, sender=bob)
     pool.swap(1, 0, bal, 0, sender=bob)
     bal2 = assets[0].balanceOf(bob)
     assert bal2 > bal
@@ -136,28 +120,22 @@ def test_swap(project, deployer, alice, bob, token):
     assert vb_sum2 > vb_sum
     assert (vb_sum2 - vb_sum) / vb_sum < 2e-14
 
-def test_swap_fee(project, chain, deployer, alice, bob, token):
-    n = 4
-    assets, provider = deploy_assets(project, deployer, n)
-    weights = [PRECISION//n for _ in range(n)]
-    pool = project.Pool.deploy(token, calc_w_prod(weights) * 10, assets, [provider for _ in range(n)], weights, sender=deployer)
-    token.set_minter(pool, sender=deployer)
-    estimator = project.Estimator.deploy(pool, sender=deployer)
+def test_swap_fee(chain, deployer, alice, bob, equal_estimator, equal_pool):
+    assets, provider, pool = equal_pool
+    n = len(assets)
 
     amts = [170 * PRECISION, 50 * PRECISION, 20 * PRECISION, 160 * PRECISION]
     for i in range(n):
         asset = assets[i]
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amts[i], sender=deployer)
     pool.add_liquidity(amts, 0, sender=alice)
 
     # swap without a fee
     swap = 10 * PRECISION
-    assets[0].approve(pool, MAX, sender=bob)
     assets[0].mint(bob, swap, sender=deployer)
 
     id = chain.snapshot()
-    expect = estimator.get_dy(0, 1, swap)
+    expect = equal_estimator.get_dy(0, 1, swap)
     pool.swap(0, 1, swap, 0, sender=bob)
     full_out = assets[1].balanceOf(bob)
     assert full_out == expect
@@ -168,7 +146,7 @@ def test_swap_fee(project, chain, deployer, alice, bob, token):
     pool.set_staking(deployer, sender=deployer)
     pool.set_swap_fee_rate(fee_rate, sender=deployer)
     
-    expect = estimator.get_dy(0, 1, swap)
+    expect = equal_estimator.get_dy(0, 1, swap)
     pool.swap(0, 1, swap, 0, sender=bob)
     out = assets[1].balanceOf(bob)
     assert out == expect
@@ -176,17 +154,12 @@ def test_swap_fee(project, chain, deployer, alice, bob, token):
     # fee is charged on input so not exact on output
     assert abs(fee_rate - actual_fee_rate) / fee_rate < 0.01
 
-def test_swap_exact_out(project, deployer, alice, bob, token):
-    n = 4
-    assets, provider = deploy_assets(project, deployer, n)
-    weights = [PRECISION//n for _ in range(n)]
-    pool = project.Pool.deploy(token, calc_w_prod(weights) * 10, assets, [provider for _ in range(n)], weights, sender=deployer)
-    token.set_minter(pool, sender=deployer)
-    estimator = project.Estimator.deploy(pool, sender=deployer)
+def test_swap_exact_out(deployer, alice, bob, equal_estimator, equal_pool):
+    assets, provider, pool = equal_pool
+    n = len(assets)
 
     amt = n * 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt // n, sender=deployer)
     pool.add_liquidity([amt // n for _ in range(n)], 0, sender=alice)
 
@@ -194,9 +167,8 @@ def test_swap_exact_out(project, deployer, alice, bob, token):
 
     # swap asset 0 for asset 1
     swap = 10 * PRECISION
-    assets[0].approve(pool, MAX, sender=bob)
     assets[0].mint(bob, 2 * swap, sender=deployer)
-    expect = estimator.get_dx(0, 1, swap)
+    expect = equal_estimator.get_dx(0, 1, swap)
     pool.swap_exact_out(0, 1, swap, MAX, sender=bob)
     assert assets[1].balanceOf(bob) == swap
     amt = 2 * swap - assets[0].balanceOf(bob)
@@ -210,7 +182,6 @@ def test_swap_exact_out(project, deployer, alice, bob, token):
     assets[1].mint(bob, 2 * swap, sender=deployer)
 
     # swap back at a cost ~ previous swap output
-    assets[1].approve(pool, MAX, sender=bob)
     pool.swap_exact_out(1, 0, amt, MAX, sender=bob)
     assert assets[0].balanceOf(bob) == 2 * swap
     amt2 = 2 * swap - assets[1].balanceOf(bob)
@@ -224,27 +195,21 @@ def test_swap_exact_out(project, deployer, alice, bob, token):
     assert vb_sum2 > vb_sum
     assert (vb_sum2 - vb_sum) / vb_sum < 2e-14
 
-def test_swap_exact_out_fee(project, chain, deployer, alice, bob, token):
-    n = 4
+def test_swap_exact_out_fee(chain, deployer, alice, bob, token, equal_estimator, equal_pool):
+    assets, provider, pool = equal_pool
+    n = len(assets)
     fee_rate = PRECISION * 3 // 1000 # 0.3%
-    assets, provider = deploy_assets(project, deployer, n)
-    weights = [PRECISION//n for _ in range(n)]
-    pool = project.Pool.deploy(token, calc_w_prod(weights) * 10, assets, [provider for _ in range(n)], weights, sender=deployer)
-    token.set_minter(pool, sender=deployer)
-    estimator = project.Estimator.deploy(pool, sender=deployer)
 
     amt = n * 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt // n, sender=deployer)
     pool.add_liquidity([amt // n for _ in range(n)], 0, sender=alice)
 
     # swap without a fee
     swap = 10 * PRECISION
-    assets[0].approve(pool, MAX, sender=bob)
     assets[0].mint(bob, 2 * swap, sender=deployer)
     id = chain.snapshot()
-    expect = estimator.get_dx(0, 1, swap)
+    expect = equal_estimator.get_dx(0, 1, swap)
     pool.swap_exact_out(0, 1, swap, MAX, sender=bob)
     base_amt = 2 * swap - assets[0].balanceOf(bob)
     assert base_amt == expect
@@ -261,7 +226,7 @@ def test_swap_exact_out_fee(project, chain, deployer, alice, bob, token):
     pool.set_staking(deployer, sender=deployer)
     pool.set_swap_fee_rate(fee_rate, sender=deployer)
 
-    expect = estimator.get_dx(0, 1, swap)
+    expect = equal_estimator.get_dx(0, 1, swap)
     pool.swap_exact_out(0, 1, swap, MAX, sender=bob)
     amt = 2 * swap - assets[0].balanceOf(bob)
     assert amt == expect
@@ -279,18 +244,13 @@ def test_swap_exact_out_fee(project, chain, deployer, alice, bob, token):
     assert abs(vb_prod2 - vb_prod) / vb_prod < 1e-14
     assert vb_sum == vb_sum2
 
-def test_rate_update(project, deployer, alice, token):
-    n = 4
-    assets, provider = deploy_assets(project, deployer, n)
-    weights = [PRECISION//n for _ in range(n)]
-    pool = project.Pool.deploy(token, calc_w_prod(weights) * 10, assets, [provider for _ in range(n)], weights, sender=deployer)
-    pool.set_staking(deployer, sender=deployer)
-    token.set_minter(pool, sender=deployer)
+def test_rate_update(deployer, alice, token, equal_pool):
+    assets, provider, pool = equal_pool
+    n = len(assets)
 
     # add some liquidity
     amt = n * 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt // n, sender=deployer)
     pool.add_liquidity([amt // n for _ in range(n)], 0, sender=alice)
 
@@ -390,23 +350,16 @@ def test_add_asset(project, deployer, alice, token):
     assert w1 == w2
     assert token.balanceOf(deployer) == token.balanceOf(alice)
 
-def test_pause(project, chain, deployer, alice, bob, token):
+def test_pause(chain, deployer, alice, bob, equal_pool):
     management = deployer
     guardian = alice
 
-    n = 4
-    weights = [PRECISION//n for _ in range(n)]
-    assets, provider = deploy_assets(project, deployer, n)
-    
-    amplification = calc_w_prod(weights) * 10
-    pool = project.Pool.deploy(token, amplification, assets, [provider for _ in range(n)], weights, sender=deployer)
-    pool.set_staking(deployer, sender=deployer)
+    assets, provider, pool = equal_pool
+    n = len(assets)
     pool.set_guardian(guardian, sender=deployer)
-    token.set_minter(pool, sender=deployer)
 
     amt = 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt, sender=deployer)
     pool.add_liquidity([amt for _ in range(n)], 0, deployer, sender=alice)
 
@@ -475,23 +428,16 @@ def test_pause(project, chain, deployer, alice, bob, token):
     # functions can be called again
     pool.swap(0, 1, PRECISION, 0, sender=alice)
 
-def test_kill(project, deployer, alice, token):
+def test_kill(deployer, alice, equal_pool):
     management = deployer
     guardian = alice
 
-    n = 4
-    weights = [PRECISION//n for _ in range(n)]
-    assets, provider = deploy_assets(project, deployer, n)
-    
-    amplification = calc_w_prod(weights) * 10
-    pool = project.Pool.deploy(token, amplification, assets, [provider for _ in range(n)], weights, sender=deployer)
-    pool.set_staking(deployer, sender=deployer)
+    assets, provider, pool = equal_pool
+    n = len(assets)
     pool.set_guardian(guardian, sender=deployer)
-    token.set_minter(pool, sender=deployer)
 
     amt = 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt, sender=deployer)
     pool.add_liquidity([amt for _ in range(n)], 0, deployer, sender=alice)
 
@@ -521,19 +467,12 @@ def test_kill(project, deployer, alice, token):
     with ape.reverts(dev_message='dev: killed'):
         pool.unpause(sender=management)
 
-def test_change_rate_provider(project, deployer, alice, token):
-    n = 4
-    weights = [PRECISION//n for _ in range(n)]
-    assets, provider = deploy_assets(project, deployer, n)
-    
-    amplification = calc_w_prod(weights) * 10
-    pool = project.Pool.deploy(token, amplification, assets, [provider for _ in range(n)], weights, sender=deployer)
-    pool.set_staking(deployer, sender=deployer)
-    token.set_minter(pool, sender=deployer)
+def test_change_rate_provider(project, deployer, alice, token, equal_pool):
+    assets, provider, pool = equal_pool
+    n = len(assets)
 
     amt = 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt, sender=deployer)
     pool.add_liquidity([amt for _ in range(n)], 0, sender=alice)
 
@@ -553,19 +492,12 @@ def test_change_rate_provider(project, deployer, alice, token):
     pool.set_rate_provider(0, provider2, sender=deployer)
     assert token.balanceOf(deployer) > 0
 
-def test_rate_increase_cap(project, deployer, alice, token):
-    n = 4
-    weights = [PRECISION//n for _ in range(n)]
-    assets, provider = deploy_assets(project, deployer, n)
-    
-    amplification = calc_w_prod(weights) * 10
-    pool = project.Pool.deploy(token, amplification, assets, [provider for _ in range(n)], weights, sender=deployer)
-    pool.set_staking(deployer, sender=deployer)
-    token.set_minter(pool, sender=deployer)
+def test_rate_increase_cap(deployer, alice, equal_pool):
+    assets, provider, pool = equal_pool
+    n = len(assets)
 
     amt = 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt, sender=deployer)
     pool.add_liquidity([amt for _ in range(n)], 0, sender=alice)
 
@@ -578,19 +510,12 @@ def test_rate_increase_cap(project, deployer, alice, token):
     # management approves rate increase
     pool.update_rates([0], sender=deployer)
 
-def test_rescue(project, deployer, alice, token):
-    n = 4
-    weights = [PRECISION//n for _ in range(n)]
-    assets, provider = deploy_assets(project, deployer, n)
-    
-    amplification = calc_w_prod(weights) * 10
-    pool = project.Pool.deploy(token, amplification, assets, [provider for _ in range(n)], weights, sender=deployer)
-    pool.set_staking(deployer, sender=deployer)
-    token.set_minter(pool, sender=deployer)
+def test_rescue(project, deployer, alice, token, equal_pool):
+    assets, provider, pool = equal_pool
+    n = len(assets)
 
     amt = 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt, sender=deployer)
     pool.add_liquidity([amt for _ in range(n)], 0, deployer, sender=alice)
 
@@ -610,19 +535,12 @@ def test_rescue(project, deployer, alice, token):
     pool.rescue(token, alice, sender=deployer)
     assert token.balanceOf(alice) == PRECISION
 
-def test_skim(project, deployer, alice, token):
-    n = 4
-    weights = [PRECISION//n for _ in range(n)]
-    assets, provider = deploy_assets(project, deployer, n)
-    
-    amplification = calc_w_prod(weights) * 10
-    pool = project.Pool.deploy(token, amplification, assets, [provider for _ in range(n)], weights, sender=deployer)
-    pool.set_staking(deployer, sender=deployer)
-    token.set_minter(pool, sender=deployer)
+def test_skim(deployer, alice, equal_pool):
+    assets, provider, pool = equal_pool
+    n = len(assets)
 
     amt = 100 * PRECISION
     for asset in assets:
-        asset.approve(pool, MAX, sender=alice)
         asset.mint(alice, amt, sender=deployer)
     pool.add_liquidity([amt for _ in range(n)], 0, deployer, sender=alice)
 
@@ -635,11 +553,8 @@ def test_skim(project, deployer, alice, token):
     pool.skim(1, alice, sender=deployer)
     assert assets[1].balanceOf(alice) == PRECISION - 1
 
-def test_transfer_management(project, deployer, alice, bob, token):
-    n = 4
-    assets, provider = deploy_assets(project, deployer, n)
-    weights = [PRECISION//n for _ in range(n)]
-    pool = project.Pool.deploy(token, calc_w_prod(weights) * 10, assets, [provider for _ in range(n)], weights, sender=deployer)
+def test_transfer_management(deployer, alice, bob, equal_pool):
+    pool = equal_pool[2]
     assert pool.management() == deployer
     assert pool.pending_management() == ZERO_ADDRESS
 
@@ -0,0 +1,68 @@
+from conftest import *
+import pytest
+from yeth.convergence import Recorder, replay
+from yeth.pool import calc_vb
+
+def test_replay(model):
+    model.provider_rates[1] = model.provider_rates[1] * 101 // 100
+    recorder = replay(model, [
+        ('swap', (0, 1, PRECISION)),
+        ('swap', (1, 2, 10 * PRECISION)),
+        ('swap_exact_out', (2, 3, PRECISION)),
+        ('add_liquidity', ([PRECISION, 0, PRECISION, 0],)),
+        ('remove_liquidity_single', (3, PRECISION)),
+        ('swap', (0, 1, 1_000_000 * PRECISION)), # reverts
+    ])
+
+    histogram = recorder.histogram()
+    assert set(histogram) == {
+        ('swap', 'calc_supply'), # rate update and fee
+        ('swap', 'calc_vb'),
+        ('swap_exact_out', 'calc_supply'),
+        ('swap_exact_out', 'calc_vb'),
+        ('add_liquidity', 'calc_supply'),
+        ('remove_liquidity_single', 'calc_supply'),
+        ('remove_liquidity_single', 'calc_vb'),
+    }
+    assert sum(histogram[('swap', 'calc_vb')].values()) == 2
+    for entry, solver, iterations, guess, error in recorder.calls:
+        assert 0 < iterations < 255
+        assert guess > 0
+        assert error <= 1e-16
+
+    text = recorder.format()
+    assert 'swap calc_vb: 2 calls' in text
+
+def test_entry_point(model):
+    with Recorder() as recorder:
+        model.get_dy(0, 1, PRECISION)
+        calc_vb(PRECISION, PRECISION, PRECISION, PRECISION, PRECISION, PRECISION)
+    assert recorder.calls[0][0] == 'get_dy'
+    assert recorder.calls[-1][0] == 'external'
+
+    # no longer recording
+    num_calls = len(recorder.calls)
+    model.get_dy(0, 1, PRECISION)
+    assert len(recorder.calls) == num_calls
+
+def test_supply_low_amplification(weights, model):
+    # single sided deposit in a low amplification pool
+    recorder = replay(model, [('add_liquidity', ([10 * PRECISION, 0, 0, 0],))])
+    iterations = [call[2] for call in recorder.calls if call[1] == 'calc_supply']
+    assert len(iterations) == 2
+    assert max(iterations) <= 5
+
+@pytest.mark.parametrize('size', [1, 10, 100, 1000, 3000]) # basis points
+def test_vb_warm_start(model, size):
+    # initial guess on the tangent of the invariant keeps the iteration count low up to large trades
+    dx = model.virtual_balance(0) * PRECISION // model.rate(0) * size // 10_000
+    dy = model.virtual_balance(3) * PRECISION // model.rate(3) * size // 10_000
+    with Recorder() as recorder:
+        model.get_dy(0, 3, dx)
+        model.get_dx(0, 3, dy)
+        model.get_remove_single_lp(2, model.supply * size // 10_000)
+    iterations = {call[0]: call[2] for call in recorder.calls if call[1] == 'calc_vb'}
+    limit = 3 if size <= 100 else 4
+    assert iterations['get_dy'] <= limit
+    assert iterations['get_dx'] <= limit
+    assert iterations['get_remove_single_lp'] <= (limit if size <= 1000 else 10)
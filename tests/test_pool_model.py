@@ -0,0 +1,249 @@
+import ape
+from conftest import *
+from yeth.pool import Pool, pack_pool_vb, pack_vb, unpack_weight, \
+    RAMP_MASK, RAMP_PROGRESS_SHIFT, RATE_REFRESH_MASK, RATE_REFRESH_SHIFT
+
+def seed(deployer, alice, weights, assets, provider, pool):
+    total = 1_000 * PRECISION
+    amts = []
+    for i in range(len(assets)):
+        asset = assets[i]
+        asset.approve(pool, MAX, sender=alice)
+        amt = total * weights[i] // provider.rate(asset)
+        amts.append(amt)
+        asset.mint(alice, 100 * amt, sender=alice)
+    pool.add_liquidity(amts, 0, deployer, sender=alice)
+
+def assert_state(pool, model):
+    assert model.supply == pool.supply()
+    assert model.vb_prod_sum() == pool.vb_prod_sum()
+    for i in range(model.num_assets):
+        assert model.virtual_balance(i) == pool.virtual_balance(i)
+        assert model.rate(i) == pool.rate(i)
+        assert model.packed_weight(i) == pool.packed_weight(i)
+        assert model.weight(i) == pool.weight(i)
+    assert model.ramp_progress == pool.ramp_progress()
+
+def test_swap(deployer, alice, bob, weights, pool, estimator):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    pool.set_swap_fee_rate(PRECISION // 1000, sender=deployer)
+
+    model = Pool.from_contract(pool)
+    n = len(assets)
+    for k, amt in enumerate([PRECISION // 1000, PRECISION, 5 * PRECISION, 10 * PRECISION]):
+        i = k % n
+        j = (k + 1) % n
+        exp = model.get_dy(i, j, amt)
+        assert exp == estimator.get_dy(i, j, amt)
+        res = pool.swap(i, j, amt, 0, bob, sender=alice).return_value
+        assert res == exp
+        assert model.swap(i, j, amt) == res
+        assert_state(pool, model)
+
+def test_swap_exact_out(deployer, alice, bob, weights, pool, estimator):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    pool.set_swap_fee_rate(PRECISION // 1000, sender=deployer)
+
+    model = Pool.from_contract(pool)
+    n = len(assets)
+    for k, amt in enumerate([PRECISION // 1000, PRECISION, 10 * PRECISION]):
+        i = (k + 1) % n
+        j = k % n
+        exp = model.get_dx(i, j, amt)
+        assert exp == estimator.get_dx(i, j, amt)
+        res = pool.swap_exact_out(i, j, amt, MAX, bob, sender=alice).return_value
+        assert res == exp
+        assert model.swap_exact_out(i, j, amt) == res
+        assert_state(pool, model)
+
+def test_liquidity(deployer, alice, weights, pool, estimator):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    pool.set_swap_fee_rate(PRECISION // 1000, sender=deployer)
+
+    model = Pool.from_contract(pool)
+    amts = [PRECISION, 0, 3 * PRECISION, 0]
+    exp = model.get_add_lp(amts)
+    assert exp == estimator.get_add_lp(amts)
+    res = pool.add_liquidity(amts, 0, sender=alice).return_value
+    assert res == exp
+    assert model.add_liquidity(amts) == res
+    assert_state(pool, model)
+
+    amt = 5 * PRECISION
+    exp = model.get_remove_single_lp(2, amt)
+    assert exp == estimator.get_remove_single_lp(2, amt)
+    res = pool.remove_liquidity_single(2, amt, 0, sender=alice).return_value
+    assert res == exp
+    assert model.remove_liquidity_single(2, amt) == res
+    assert_state(pool, model)
+
+    assert model.get_remove_lp(amt) == estimator.get_remove_lp(amt)
+    pool.remove_liquidity(amt, [0 for _ in range(len(assets))], sender=alice)
+    model.remove_liquidity(amt)
+    assert_state(pool, model)
+
+def test_rate_update(deployer, alice, bob, weights, pool, estimator):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+
+    model = Pool.from_contract(pool)
+    rate = provider.rate(assets[1]) * 101 // 100
+    provider.set_rate(assets[1], rate, sender=alice)
+    model.provider_rates[1] = rate
+
+    exp = model.get_dy(0, 1, PRECISION)
+    assert exp == estimator.get_dy(0, 1, PRECISION)
+    assert pool.swap(0, 1, PRECISION, 0, bob, sender=alice).return_value == exp
+    model.swap(0, 1, PRECISION)
+    assert_state(pool, model)
+
+def test_ramp(chain, deployer, alice, bob, weights, pool, estimator):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+
+    weights2 = [PRECISION*4//10, PRECISION*3//10, PRECISION*2//10, PRECISION*1//10]
+    ts = chain.pending_timestamp
+    pool.set_ramp(calc_w_prod(weights2), weights2, WEEK_LENGTH, ts, sender=deployer)
+
+    chain.pending_timestamp = ts + WEEK_LENGTH // 2
+    model = Pool.from_contract(pool, ts + WEEK_LENGTH // 2)
+    exp = model.get_dy(0, 1, PRECISION)
+    assert pool.swap(0, 1, PRECISION, 0, bob, sender=alice).return_value == exp
+    model.swap(0, 1, PRECISION)
+    assert_state(pool, model)
+    # stored weights only change at the end of the ramp
+    assert [pool.weight(i)[0] for i in range(4)] != weights
+    assert [unpack_weight(pool.packed_weight(i))[0] for i in range(4)] == weights
+
+    # several steps, weights follow from the ramp progress
+    for k in range(1, 4):
+        # views are evaluated in the latest block, transactions in the next one
+        t = ts + WEEK_LENGTH // 2 + k * WEEK_LENGTH // 8
+        chain.mine(timestamp=t)
+        model.timestamp = t
+        assert estimator.get_dy(1, 2, PRECISION) == model.get_dy(1, 2, PRECISION)
+
+        chain.pending_timestamp = t + 1
+        model.timestamp = t + 1
+        exp = model.get_dy(1, 2, PRECISION)
+        assert pool.swap(1, 2, PRECISION, 0, bob, sender=alice).return_value == exp
+        model.swap(1, 2, PRECISION)
+        assert_state(pool, model)
+
+    # end of ramp
+    chain.pending_timestamp = ts + WEEK_LENGTH
+    model.timestamp = chain.pending_timestamp
+    exp = model.get_dy(2, 3, PRECISION)
+    assert pool.swap(2, 3, PRECISION, 0, bob, sender=alice).return_value == exp
+    model.swap(2, 3, PRECISION)
+    assert_state(pool, model)
+    assert pool.ramp_progress() == 0
+    assert [unpack_weight(pool.packed_weight(i))[0] for i in range(4)] == weights2
+
+def test_stop_ramp(chain, deployer, alice, bob, weights, pool):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+
+    weights2 = [PRECISION*4//10, PRECISION*3//10, PRECISION*2//10, PRECISION*1//10]
+    ts = chain.pending_timestamp
+    pool.set_ramp(calc_w_prod(weights2), weights2, WEEK_LENGTH, ts, sender=deployer)
+    chain.pending_timestamp = ts + WEEK_LENGTH // 4
+    pool.update_weights(sender=alice)
+    current = [pool.weight(i)[0] for i in range(4)]
+    assert pool.ramp_progress() > 0
+
+    # weights remain at the last step
+    pool.stop_ramp(sender=deployer)
+    assert pool.ramp_progress() == 0
+    assert [pool.weight(i)[0] for i in range(4)] == current
+    assert [unpack_weight(pool.packed_weight(i))[0] for i in range(4)] == current
+
+def test_dy_many(deployer, alice, weights, pool, estimator):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    pool.set_swap_fee_rate(PRECISION // 1000, sender=deployer)
+    provider.set_rate(assets[1], provider.rate(assets[1]) * 101 // 100, sender=alice)
+
+    n = len(assets)
+    i = [k % n for k in range(8)]
+    j = [(k + 1 + k // n) % n for k in range(8)]
+    amts = [(k + 1) * PRECISION for k in range(8)]
+    assert estimator.get_dy_many(i, j, amts) == [estimator.get_dy(i[k], j[k], amts[k]) for k in range(8)]
+    assert estimator.get_dx_many(i, j, amts) == [estimator.get_dx(i[k], j[k], amts[k]) for k in range(8)]
+
+    with ape.reverts():
+        estimator.get_dy_many(i, j[:-1], amts)
+    with ape.reverts(dev_message='dev: same input and output asset'):
+        estimator.get_dy_many([0], [0], [PRECISION])
+
+def test_get_state(deployer, alice, weights, pool):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    pool.set_swap_fee_rate(PRECISION // 1000, sender=deployer)
+
+    receipt = pool.update_rates([1, 3], sender=alice)
+
+    supply, amplification, target_amplification, fee_rate, ramp_step, packed_ramp, ramp_stop_time, \
+        packed_pool_vb, packed_rate_refresh, packed_vbs, state_assets = pool.get_state()
+    assert supply == pool.supply()
+    assert amplification == pool.amplification()
+    assert target_amplification == pool.target_amplification()
+    assert fee_rate == PRECISION // 1000
+    assert ramp_step == pool.ramp_step()
+    assert packed_ramp & RAMP_MASK == pool.ramp_last_time()
+    assert packed_ramp >> RAMP_PROGRESS_SHIFT == pool.ramp_progress()
+    assert ramp_stop_time == pool.ramp_stop_time()
+    assert packed_pool_vb == pack_pool_vb(*pool.vb_prod_sum())
+    assert packed_rate_refresh >> RATE_REFRESH_SHIFT == receipt.block_number
+    assert packed_rate_refresh & RATE_REFRESH_MASK == 0b1010
+    assert list(state_assets) == [asset.address for asset in assets]
+    assert len(packed_vbs) == len(assets)
+    for i in range(len(assets)):
+        assert packed_vbs[i] == pack_vb(pool.virtual_balance(i), pool.rate(i), pool.packed_weight(i))
+
+def test_rate_cache(deployer, alice, weights, pool):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+
+    # rates are read at most once per block
+    model = Pool.from_contract(pool)
+    model.block = 1
+    model.swap(0, 1, PRECISION)
+    assert model.rates_refreshed() == 0b11
+    rate = model.provider_rates[1] * 101 // 100
+    model.provider_rates[1] = rate
+    model.swap(1, 0, PRECISION)
+    assert model.rate(1) != rate
+
+    model.block = 2
+    assert model.rates_refreshed() == 0
+    model.swap(1, 0, PRECISION)
+    assert model.rate(1) == rate
+    assert model.rates_refreshed() == 0b11
+
+    # explicit updates always read the rate
+    rate = model.provider_rates[0] * 101 // 100
+    model.provider_rates[0] = rate
+    model.update_rates([0])
+    assert model.rate(0) == rate
+
+def test_update_rates_same_block(project, deployer, alice, weights, pool):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    model = Pool.from_contract(pool)
+
+    # rate change after a swap in the same block is picked up by an explicit update
+    bundler = project.MockBundler.deploy(sender=deployer)
+    assets[0].mint(bundler, PRECISION, sender=alice)
+    rate = provider.rate(assets[1]) * 101 // 100
+    bundler.swap_update_rate(pool, 0, 1, PRECISION, provider, rate, sender=alice)
+    assert pool.rate(1) == rate
+
+    model.block = 1
+    model.swap(0, 1, PRECISION)
+    model.provider_rates[1] = rate
+    model.update_rates([1])
+    assert_state(pool, model)
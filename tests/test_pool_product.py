@@ -0,0 +1,88 @@
+from conftest import *
+from mpmath import mp, mpf, exp, log
+import random
+from yeth.math import MAX_POW_REL_ERR, exp_down, exp_up, log_pow, pow_down, pow_up
+from yeth.pool import Pool, unpack_wn
+
+N_ITER = 200
+MAX_REL_ERR = 2 * MAX_POW_REL_ERR # 2e-16
+
+mp.dps = 50
+
+# product term as it was calculated before the logarithmic accumulator, one power per asset
+def calc_vb_prod_loop(supply, weights, vbs):
+    n = len(weights)
+    p = PRECISION
+    for weight, vb in zip(weights, vbs):
+        p = p * pow_down(supply * weight // vb, weight * n) // PRECISION
+    return p
+
+def exact_vb_prod(supply, weights, vbs):
+    n = len(weights)
+    return exp(sum(log(mpf(supply * weight // vb) / PRECISION) * weight * n for weight, vb in zip(weights, vbs)) / PRECISION) * PRECISION
+
+def random_pool(rng):
+    n = rng.choice([2, 3, 4, 8, 16, 32])
+    weights = [rng.randrange(PRECISION // 5, PRECISION) for _ in range(n)]
+    weights = [weight * PRECISION // sum(weights) // 10**12 * 10**12 for weight in weights]
+    weights[-1] += PRECISION - sum(weights)
+    imbalance = rng.choice([1, 50, 300, 600]) # per mille
+    amounts = [1_000 * weight * (1_000 + rng.randrange(-imbalance, imbalance + 1)) // 1_000 for weight in weights]
+    model = Pool.create(PRECISION * 450, weights, [PRECISION for _ in range(n)])
+    model.add_liquidity(amounts)
+    return model
+
+def test_calc_vb_prod():
+    rng = random.Random(0)
+    err = 0
+    err_loop = 0
+    for _ in range(N_ITER):
+        model = random_pool(rng)
+        n = model.num_assets
+        weights = [unpack_wn(model.packed_weight(i), 1) for i in range(n)]
+        vbs = [model.virtual_balance(i) for i in range(n)]
+        supply = model.supply * rng.randrange(980, 1_020) // 1_000
+
+        exact = exact_vb_prod(supply, weights, vbs)
+        res = model._calc_vb_prod(supply, 0)
+        res_loop = calc_vb_prod_loop(supply, weights, vbs)
+        # both round down
+        assert res <= exact and res_loop <= exact
+        err = max(err, float((exact - res) / exact))
+        err_loop = max(err_loop, float((exact - res_loop) / exact))
+    assert err <= MAX_REL_ERR / PRECISION
+    assert err <= err_loop
+
+def test_deposit():
+    # product of the factors of a multi asset deposit, rounded up
+    rng = random.Random(0)
+    for _ in range(N_ITER):
+        n = rng.randint(2, 32)
+        l = 0
+        exact = mpf(1)
+        for _ in range(n):
+            x = rng.randrange(PRECISION // 2, PRECISION)
+            wn = rng.randrange(PRECISION // 10, 2 * PRECISION)
+            l += log_pow(x, wn)
+            exact *= (mpf(x) / PRECISION)**(mpf(wn) / PRECISION)
+        res = exp_up(l)
+        assert res >= exact * PRECISION
+        assert res <= exact * PRECISION * (1 + mpf(MAX_REL_ERR) / PRECISION) + 2
+
+def test_single_factor():
+    # a single term is bit exact with the power functions
+    rng = random.Random(0)
+    for _ in range(N_ITER):
+        x = rng.randrange(1, 100 * PRECISION)
+        y = rng.randrange(1, 32 * PRECISION)
+        if not -41 * PRECISION <= log_pow(x, y) <= 130 * PRECISION:
+            # power functions revert outside of the domain, see `test_exp_bounds`
+            continue
+        assert exp_up(log_pow(x, y)) == pow_up(x, y)
+        assert exp_down(log_pow(x, y)) == pow_down(x, y)
+
+def test_exp_bounds():
+    # below the domain of `exp` the product term is still bounded from both sides
+    for l in [-41 * PRECISION, -41 * PRECISION - 1, -42 * PRECISION, -100 * PRECISION, -MAX_POW_REL_ERR * PRECISION]:
+        exact = exp(mpf(l) / PRECISION) * PRECISION
+        assert exp_down(l) <= exact <= exp_up(l) <= 2
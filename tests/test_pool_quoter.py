@@ -0,0 +1,32 @@
+from conftest import *
+import pytest
+
+np = pytest.importorskip('numpy')
+from yeth.quoter import *
+
+def test_curve(model):
+    dx = [int(x) for x in np.geomspace(PRECISION / 1000, 40. * PRECISION, 1_000)]
+    dy = get_dy_curve(model, 0, 3, dx)
+    assert not np.isnan(dy).any()
+    assert (np.diff(dy) > 0).all()
+
+    exact, deviation = confirm_dy_curve(model, 0, 3, dx, dy, range(0, len(dx), 50))
+    assert len(exact) == 20
+    assert deviation < 1e-9
+
+def test_curve_rate_update(model):
+    model.provider_rates[3] = model.provider_rates[3] * 102 // 100
+    dx = [PRECISION, 10 * PRECISION]
+    dy = get_dy_curve(model, 0, 3, dx)
+    exact, deviation = confirm_dy_curve(model, 0, 3, dx, dy, [0, 1])
+    assert deviation < 1e-9
+
+def test_curve_revert(model):
+    # not enough of the output asset in the pool
+    dx = [PRECISION, 1_000 * PRECISION]
+    dy = get_dy_curve(model, 3, 0, dx)
+    assert not np.isnan(dy[0])
+    assert np.isnan(dy[1])
+    exact, deviation = confirm_dy_curve(model, 3, 0, dx, dy, [0, 1])
+    assert exact[1] is None
+    assert deviation < 1e-9
@@ -1,26 +1,5 @@
 import ape
 from conftest import *
-import pytest
-
-@pytest.fixture
-def token(project, deployer):
-    return project.Token.deploy(sender=deployer)
-
-@pytest.fixture
-def weights():
-    return [PRECISION*1//10, PRECISION*2//10, PRECISION*3//10, PRECISION*4//10]
-
-@pytest.fixture
-def pool(project, deployer, token, weights):
-    assets, provider = deploy_assets(project, deployer, len(weights))
-    pool = project.Pool.deploy(token, calc_w_prod(weights), assets, [provider for _ in range(len(weights))], weights, sender=deployer)
-    pool.set_staking(deployer, sender=deployer)
-    token.set_minter(pool, sender=deployer)
-    return assets, provider, pool
-
-@pytest.fixture
-def estimator(project, deployer, pool):
-    return project.Estimator.deploy(pool[2], sender=deployer)
 
 def test_round_trip(alice, bob, token, weights, pool):
     assets, provider, pool = pool
@@ -123,8 +102,12 @@ def test_fee(chain, deployer, alice, bob, weights, pool, estimator):
 
     # doing a single sided withdrawal charges fee/2
     assert bal < base
+    # the solver runs before the fee is charged, so both withdrawals share the same virtual balance
+    # and its stopping error cancels. What remains is rounding down of the fee and of both amounts,
+    # which puts `base - bal` within 2 wei of exact. The measured rate scales that by 2 * PRECISION / base
+    # and rounds down once more. At 1e16 the bound is ~1e-15 relative, 1e-16 is below a single wei
     actual_rate = abs(bal - base) * PRECISION // base * 2
-    assert abs(actual_rate - fee_rate) / fee_rate < 1e-16
+    assert abs(actual_rate - fee_rate) < 2 * (2 * PRECISION / base + 1)
 
 def test_rate_update(chain, deployer, alice, bob, token, weights, pool, estimator):
     assets, provider, pool = pool
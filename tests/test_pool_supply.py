@@ -0,0 +1,142 @@
+from conftest import *
+from fractions import Fraction
+import pytest
+import random
+from yeth.pool import UINT256_MASK, Pool, calc_supply, pow_ratio
+
+N_ITER = 1000
+
+# product term update as it was done before exponentiation by squaring, one asset at a time
+def pow_ratio_loop(r, a, b, n):
+    for _ in range(n):
+        r = (r * a & UINT256_MASK) // b
+    return r
+
+def calc_supply_loop(num_assets, supply, amplification, vb_prod, vb_sum, up):
+    l = amplification
+    d = l - PRECISION
+    l = l * vb_sum
+    s = supply
+    r = vb_prod
+    for _ in range(255):
+        sp = ((l + num_assets * s * r) & UINT256_MASK) // ((d + (num_assets + 1) * r) & UINT256_MASK)
+        r = pow_ratio_loop(r, sp, s, num_assets)
+        delta = abs(sp - s)
+        if delta * PRECISION // s <= 100:
+            delta = sp * 100 // PRECISION
+            return (sp + delta if up else sp - delta), r
+        s = sp
+    assert False
+
+def unadjust(s, up):
+    # supply before the final rounding adjustment in `calc_supply`
+    sp = s * PRECISION // (PRECISION + 100 if up else PRECISION - 100)
+    adjust = lambda sp: sp + sp * 100 // PRECISION if up else sp - sp * 100 // PRECISION
+    while adjust(sp) > s:
+        sp -= 1
+    while adjust(sp) < s:
+        sp += 1
+    return sp
+
+def test_pow_ratio():
+    rng = random.Random(0)
+    err = 0
+    err_loop = 0
+    for _ in range(N_ITER):
+        n = rng.randint(2, 32)
+        b = rng.randrange(PRECISION, 10**9 * PRECISION)
+        a = b + rng.randrange(-b // 10, b // 10)
+        r = rng.randrange(PRECISION // 10, 100 * PRECISION)
+        exact = Fraction(r) * Fraction(a, b)**n
+
+        p, precision = pow_ratio(a, b, n)
+        res = r * p // precision
+        res_loop = pow_ratio_loop(r, a, b, n)
+        # both round down
+        assert res <= exact and res_loop <= exact
+        err = max(err, float((exact - res) / exact))
+        err_loop = max(err_loop, float((exact - res_loop) / exact))
+    assert err <= err_loop
+
+def test_calc_supply():
+    rng = random.Random(0)
+    err = 0
+    err_loop = 0
+    for _ in range(N_ITER):
+        n = rng.randint(2, 32)
+        weights = [rng.randint(1, 100) for _ in range(n)]
+        weights = [w * PRECISION // sum(weights) for w in weights]
+        weights[-1] += PRECISION - sum(weights)
+        rates = [rng.randrange(PRECISION, 2 * PRECISION) for _ in range(n)]
+        amplification = rng.randrange(10 * PRECISION, 1000 * PRECISION)
+        model = Pool.create(amplification, weights, rates)
+        total = rng.randrange(PRECISION, 10**6 * PRECISION)
+        model.add_liquidity([total * w // PRECISION * rng.randrange(90, 110) // 100 for w in weights])
+
+        vb_prod, vb_sum = model.vb_prod_sum()
+        supply = model.supply * rng.randrange(50, 150) // 100
+        up = rng.random() < 0.5
+        s, r = calc_supply(n, supply, amplification, vb_prod, vb_sum, up)
+        s_loop, r_loop = calc_supply_loop(n, supply, amplification, vb_prod, vb_sum, up)
+        assert abs(s - s_loop) * PRECISION // s_loop <= 200
+
+        # product term telescopes to pi (D/D[0])^n
+        exact = Fraction(vb_prod) * Fraction(unadjust(s, up), supply)**n
+        exact_loop = Fraction(vb_prod) * Fraction(unadjust(s_loop, up), supply)**n
+        err = max(err, float(abs(r - exact) / exact))
+        err_loop = max(err_loop, float(abs(r_loop - exact_loop) / exact_loop))
+    assert err <= err_loop
+
+def calc_supply_exact(num_assets, supply, amplification, vb_prod, vb_sum):
+    # largest integer `D` with f(D) = l - d D - D pi (D / D[0])^n >= 0, by bisection on exact rationals
+    f = lambda x: amplification * vb_sum - (amplification - PRECISION) * x - x * Fraction(vb_prod) * Fraction(x, supply)**num_assets
+    lo, hi = 0, vb_sum
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if f(mid) >= 0:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+@pytest.mark.parametrize('n', [2, 8, 16, 32])
+def test_calc_supply_large_step(n):
+    # one sided deposits many times the size of the pool, the first Newton step overshoots the root by far
+    amplification = 450 * PRECISION
+    model = Pool.create(amplification, [PRECISION // n for _ in range(n)], [PRECISION for _ in range(n)])
+    model.add_liquidity([PRECISION for _ in range(n)])
+    vb_prod, vb_sum = model.vb_prod_sum()
+    for amt in [10, 100, 700, 1_000, 10**6]:
+        dvb = amt * PRECISION
+        # equal weights, the deposit changes the product term by (x_0 / (x_0 + dx_0))^(w_0 n) = x_0 / (x_0 + dx_0)
+        prod = vb_prod * PRECISION // (PRECISION + dvb)
+        s, r = calc_supply(n, model.supply, amplification, prod, vb_sum + dvb, False)
+        exact = calc_supply_exact(n, model.supply, amplification, prod, vb_sum + dvb)
+        assert abs(unadjust(s, False) - exact) * PRECISION // exact <= 2
+        assert s <= exact
+
+        exact = Fraction(prod) * Fraction(unadjust(s, False), model.supply)**n
+        assert abs(r - exact) / exact < Fraction(1, 10**15)
+
+def test_add_large_one_sided(project, deployer, alice):
+    # contract matches the model on a deposit whose first Newton step is 23x the supply
+    n = 32
+    weights = [PRECISION // n for _ in range(n)]
+    token = project.Token.deploy(sender=deployer)
+    assets, provider = deploy_assets(project, deployer, n)
+    pool = project.Pool.deploy(token, 450 * PRECISION, assets, [provider for _ in range(n)], weights, sender=deployer)
+    pool.set_staking(deployer, sender=deployer)
+    token.set_minter(pool, sender=deployer)
+    amts = []
+    for asset in assets:
+        amt = PRECISION * PRECISION // provider.rate(asset)
+        amts.append(amt)
+        asset.mint(alice, 1_000 * amt, sender=alice)
+        asset.approve(pool, MAX, sender=alice)
+    pool.add_liquidity(amts, 0, sender=alice)
+
+    model = Pool.from_contract(pool)
+    amts = [700 * amts[0]] + [0 for _ in range(n - 1)]
+    exp = model.add_liquidity(amts)
+    assert pool.add_liquidity(amts, 0, sender=alice).return_value == exp
+    assert 19 * PRECISION < exp < 20 * PRECISION
@@ -1,26 +1,5 @@
 import ape
 from conftest import *
-import pytest
-
-@pytest.fixture
-def token(project, deployer):
-    return project.Token.deploy(sender=deployer)
-
-@pytest.fixture
-def weights():
-    return [PRECISION*1//10, PRECISION*2//10, PRECISION*3//10, PRECISION*4//10]
-
-@pytest.fixture
-def pool(project, deployer, token, weights):
-    assets, provider = deploy_assets(project, deployer, len(weights))
-    pool = project.Pool.deploy(token, calc_w_prod(weights), assets, [provider for _ in range(len(weights))], weights, sender=deployer)
-    pool.set_staking(deployer, sender=deployer)
-    token.set_minter(pool, sender=deployer)
-    return assets, provider, pool
-
-@pytest.fixture
-def estimator(project, deployer, pool):
-    return project.Estimator.deploy(pool[2], sender=deployer)
 
 def test_round_trip(alice, bob, weights, pool):
     assets, provider, pool = pool
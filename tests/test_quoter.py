@@ -0,0 +1,160 @@
+import ape
+from conftest import *
+from yeth.pool import Pool, pack_vb, pack_weight, RAMP_PROGRESS_SHIFT
+
+def seed(deployer, alice, weights, assets, provider, pool):
+    total = 1_000 * PRECISION
+    amts = []
+    for i in range(len(assets)):
+        asset = assets[i]
+        amt = total * weights[i] // provider.rate(asset)
+        amts.append(amt)
+        asset.mint(alice, 100 * amt, sender=alice)
+    pool.add_liquidity(amts, 0, deployer, sender=alice)
+
+def get_state(pool):
+    # quoter arguments from the pool state, without the rate refresh flags and the assets
+    state = pool.get_state()
+    return list(state[:8]) + [list(state[9])]
+
+def model_state(model):
+    # quoter arguments from the state of the python model
+    packed_ramp = model.ramp_last_time | model.ramp_progress << RAMP_PROGRESS_SHIFT
+    return [
+        model.supply, model.amplification, model.target_amplification, model.swap_fee_rate,
+        model.ramp_step, packed_ramp, model.ramp_stop_time, model.packed_pool_vb, list(model.packed_vbs),
+    ]
+
+def test_swap(deployer, alice, bob, weights, pool, estimator, quoter):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    pool.set_swap_fee_rate(PRECISION // 1000, sender=deployer)
+
+    n = len(assets)
+    for k, amt in enumerate([PRECISION // 1000, PRECISION, 5 * PRECISION, 10 * PRECISION]):
+        i = k % n
+        j = (k + 1) % n
+        exp = quoter.quote_swap(i, j, amt, *get_state(pool))
+        assert exp == estimator.get_dy(i, j, amt)
+        assert pool.swap(i, j, amt, 0, bob, sender=alice).return_value == exp
+
+def test_liquidity(deployer, alice, weights, pool, estimator, quoter):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    pool.set_swap_fee_rate(PRECISION // 1000, sender=deployer)
+
+    amts = [PRECISION, 0, 3 * PRECISION, 0]
+    exp = quoter.quote_add(amts, *get_state(pool))
+    assert exp == estimator.get_add_lp(amts)
+    assert pool.add_liquidity(amts, 0, sender=alice).return_value == exp
+
+    amt = 5 * PRECISION
+    exp = quoter.quote_remove_single(2, amt, *get_state(pool))
+    assert exp == estimator.get_remove_single_lp(2, amt)
+    assert pool.remove_liquidity_single(2, amt, 0, sender=alice).return_value == exp
+
+def test_rate_update(deployer, alice, bob, weights, pool, estimator, quoter):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    pool.set_swap_fee_rate(PRECISION // 1000, sender=deployer)
+
+    state = get_state(pool)
+    stale = quoter.quote_swap(0, 1, PRECISION, *state)
+    provider.set_rate(assets[1], provider.rate(assets[1]) * 101 // 100, sender=alice)
+    rates = [provider.rate(asset) for asset in assets]
+
+    # pending rate update is applied by passing in the new rates
+    assert quoter.quote_swap(0, 1, PRECISION, *state) == stale
+    exp = quoter.quote_swap(0, 1, PRECISION, *state, rates)
+    assert exp != stale
+    assert exp == estimator.get_dy(0, 1, PRECISION)
+    exp_add = quoter.quote_add([0, PRECISION, 0, 0], *state, rates)
+    assert exp_add == estimator.get_add_lp([0, PRECISION, 0, 0])
+    exp_remove = quoter.quote_remove_single(1, PRECISION, *state, rates)
+    assert exp_remove == estimator.get_remove_single_lp(1, PRECISION)
+
+    # unchanged rates are a no-op
+    assert quoter.quote_swap(2, 3, PRECISION, *state, rates) == quoter.quote_swap(2, 3, PRECISION, *state)
+    assert pool.swap(0, 1, PRECISION, 0, bob, sender=alice).return_value == exp
+
+def test_bundle(deployer, alice, bob, weights, pool, quoter):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    pool.set_swap_fee_rate(PRECISION // 1000, sender=deployer)
+
+    # quote every step of a bundle upfront, from the state left by the previous step
+    model = Pool.from_contract(pool)
+    steps = [(0, 3, 10 * PRECISION), (3, 0, 5 * PRECISION), (1, 2, PRECISION)]
+    quotes = []
+    for i, j, amt in steps:
+        quotes.append(quoter.quote_swap(i, j, amt, *model_state(model)))
+        model.swap(i, j, amt)
+    amts = [PRECISION, 2 * PRECISION, 0, 0]
+    quotes.append(quoter.quote_add(amts, *model_state(model)))
+    model.add_liquidity(amts)
+    quotes.append(quoter.quote_remove_single(3, PRECISION, *model_state(model)))
+
+    for k, (i, j, amt) in enumerate(steps):
+        assert pool.swap(i, j, amt, 0, bob, sender=alice).return_value == quotes[k]
+    assert pool.add_liquidity(amts, 0, sender=alice).return_value == quotes[-2]
+    assert pool.remove_liquidity_single(3, PRECISION, 0, sender=alice).return_value == quotes[-1]
+
+def test_revert(deployer, alice, weights, pool, quoter):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    state = get_state(pool)
+
+    with ape.reverts(dev_message='dev: same input and output asset'):
+        quoter.quote_swap(0, 0, PRECISION, *state)
+    with ape.reverts(dev_message='dev: index out of bounds'):
+        quoter.quote_swap(0, 4, PRECISION, *state)
+    with ape.reverts(dev_message='dev: need to deposit at least one asset'):
+        quoter.quote_add([0, 0, 0, 0], *state)
+    with ape.reverts(dev_message='dev: no rate'):
+        quoter.quote_swap(0, 1, PRECISION, *state, [PRECISION, 0, PRECISION, PRECISION])
+    with ape.reverts():
+        quoter.quote_swap(0, 1, PRECISION, *state, [PRECISION])
+
+    with ape.reverts(dev_message='dev: lengths dont match'):
+        quoter.quote_add([PRECISION, 0, 0], *state)
+    empty = list(state)
+    empty[0] = 0
+    with ape.reverts(dev_message='dev: pool empty'):
+        quoter.quote_add([PRECISION, 0, 0, 0], *empty)
+
+    # hypothetical band on the first asset
+    amt = 10 * PRECISION
+    quoter.quote_swap(0, 3, amt, *state)
+    state[-1][0] = pack_vb(pool.virtual_balance(0), pool.rate(0), pack_weight(weights[0], weights[0], PRECISION, PRECISION // 100))
+    with ape.reverts(dev_message='dev: ratio above upper band'):
+        quoter.quote_swap(0, 3, amt, *state)
+
+def test_ramp(chain, deployer, alice, bob, weights, pool, estimator, quoter):
+    assets, provider, pool = pool
+    seed(deployer, alice, weights, assets, provider, pool)
+    pool.set_swap_fee_rate(PRECISION // 1000, sender=deployer)
+
+    weights2 = [PRECISION*4//10, PRECISION*3//10, PRECISION*2//10, PRECISION*1//10]
+    ts = chain.pending_timestamp
+    pool.set_ramp(calc_w_prod(weights2), weights2, WEEK_LENGTH, ts, sender=deployer)
+
+    # weights and amplification are interpolated as of the current block, also after a step
+    for k in range(1, 4):
+        t = ts + k * WEEK_LENGTH // 4
+        chain.mine(timestamp=t)
+        state = get_state(pool)
+        model = Pool.from_contract(pool, t)
+        for i, j, amt in [(0, 3, PRECISION), (3, 0, 5 * PRECISION)]:
+            exp = quoter.quote_swap(i, j, amt, *state)
+            assert exp == estimator.get_dy(i, j, amt)
+            assert exp == model.get_dy(i, j, amt)
+        amts = [PRECISION, 0, 2 * PRECISION, 0]
+        assert quoter.quote_add(amts, *state) == estimator.get_add_lp(amts)
+        assert quoter.quote_remove_single(1, PRECISION, *state) == estimator.get_remove_single_lp(1, PRECISION)
+        pool.update_weights(sender=alice)
+
+    # end of ramp
+    chain.mine(timestamp=ts + WEEK_LENGTH)
+    state = get_state(pool)
+    exp = quoter.quote_swap(0, 3, PRECISION, *state)
+    assert exp == estimator.get_dy(0, 3, PRECISION)
@@ -111,6 +111,112 @@ def test_multiple_deposit(chain, alice, asset, staking):
 
     assert mid > low and mid < high
 
+def test_vote_weights(chain, deployer, alice, bob, asset, staking):
+    staking.set_half_time(WEEK_LENGTH // 4, sender=deployer)
+    amt = PRECISION
+    asset.mint(alice, 3 * amt, sender=alice)
+    asset.approve(staking, MAX, sender=alice)
+    accounts = [alice, bob, deployer]
+
+    ts = (chain.pending_timestamp // WEEK_LENGTH + 1) * WEEK_LENGTH
+    chain.pending_timestamp = ts
+    staking.deposit(amt, sender=alice)
+    assert staking.vote_weights(accounts) == [0, 0, 0]
+
+    # deposits in the current week dont count yet
+    chain.pending_timestamp = ts + WEEK_LENGTH + DAY_LENGTH
+    staking.deposit(amt, bob, sender=alice)
+    staking.deposit(amt, sender=alice)
+    weights = staking.vote_weights(accounts)
+    assert weights == [staking.vote_weight(account) for account in accounts]
+    assert weights[0] > 0 and weights[1] == 0 and weights[2] == 0
+
+    chain.mine(timestamp=ts + 3 * WEEK_LENGTH)
+    weights = staking.vote_weights(accounts)
+    assert weights == [staking.vote_weight(account) for account in accounts]
+    assert weights[1] > 0 and weights[0] > weights[1]
+    assert staking.vote_weights([]) == []
+
+def test_vote_weight_at(chain, deployer, alice, bob, asset, staking):
+    staking.set_half_time(WEEK_LENGTH // 2, sender=deployer)
+    amt = PRECISION
+    asset.mint(alice, 10 * amt, sender=alice)
+    asset.approve(staking, MAX, sender=alice)
+
+    ts = (chain.pending_timestamp // WEEK_LENGTH + 1) * WEEK_LENGTH
+    first = ts // WEEK_LENGTH
+    chain.pending_timestamp = ts
+    staking.deposit(amt, sender=alice)
+
+    # record vote weight during every week, with updates in some of them
+    weights = []
+    for week in range(12):
+        chain.mine(timestamp=ts + week * WEEK_LENGTH + DAY_LENGTH)
+        weights.append(staking.vote_weights([alice, bob]))
+        if week in [0, 2, 3, 7]:
+            staking.deposit(amt, sender=alice)
+            staking.transfer(bob, amt // 3, sender=alice)
+        if week == 5:
+            staking.redeem(amt, sender=alice)
+        if week == 9:
+            staking.redeem(staking.balanceOf(alice), sender=alice)
+    assert staking.num_weight_checkpoints(alice) == 5
+    assert staking.num_weight_checkpoints(bob) == 3
+
+    for week in range(12):
+        assert [staking.vote_weight_at(account, first + week) for account in [alice, bob]] == weights[week]
+    assert weights[1][0] > 0 and weights[10][0] == 0
+    assert staking.vote_weight_at(alice, first) == 0
+    assert staking.vote_weight_at(alice, 0) == 0
+    assert staking.vote_weight_at(deployer, first + 5) == 0
+
+    with ape.reverts(dev_message='dev: future week'):
+        staking.vote_weight_at(alice, first + 12)
+
+def test_total_vote_weight(chain, deployer, alice, bob, asset, staking):
+    half_time = WEEK_LENGTH
+    amts = [PRECISION, 3 * PRECISION, 2 * PRECISION]
+    accounts = [alice, bob, deployer]
+
+    def check(idx, end):
+        # upper bound of the exact sum, off by at most the variance of the staking times
+        exact = sum(staking.vote_weights([accounts[i] for i in idx]))
+        avg = sum(amts[i] * (end - starts[i]) for i in idx) / sum(amts[i] for i in idx)
+        bound = sum(amts[i] * (end - starts[i] - avg)**2 for i in idx) / half_time**2
+        bound += sum(amts[i] for i in idx) / half_time + len(idx)
+        total = staking.total_vote_weight()
+        assert exact <= total <= exact + bound
+
+    asset.mint(alice, sum(amts), sender=alice)
+    asset.approve(staking, MAX, sender=alice)
+
+    ts = (chain.pending_timestamp // WEEK_LENGTH + 1) * WEEK_LENGTH
+    chain.pending_timestamp = ts
+    staking.deposit(amts[0], sender=alice)
+    assert staking.total_vote_weight() == 0
+
+    # a single account is exact
+    chain.mine(timestamp=ts + WEEK_LENGTH)
+    assert staking.total_vote_weight() == staking.vote_weight(alice)
+    
+    starts = [ts, ts + WEEK_LENGTH + 3 * DAY_LENGTH, ts + 2 * WEEK_LENGTH + DAY_LENGTH]
+    chain.pending_timestamp = starts[1]
+    staking.deposit(amts[1], bob, sender=alice)
+    chain.pending_timestamp = starts[2]
+    staking.deposit(amts[2], deployer, sender=alice)
+    # deposits in the current week dont count yet
+    check([0, 1], ts + 2 * WEEK_LENGTH)
+
+    for week in range(3, 8):
+        chain.mine(timestamp=ts + week * WEEK_LENGTH)
+        check([0, 1, 2], ts + week * WEEK_LENGTH)
+
+    # withdrawals remove the contribution
+    staking.redeem(amts[1], sender=bob)
+    chain.mine(timestamp=ts + 9 * WEEK_LENGTH)
+    assert staking.vote_weight(bob) == 0
+    check([0, 2], ts + 9 * WEEK_LENGTH)
+
 def test_pending_reward(alice, asset, staking):
     deposit = 2 * PRECISION
     reward = PRECISION
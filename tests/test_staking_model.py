@@ -0,0 +1,83 @@
+from conftest import *
+import pytest
+import random
+from yeth.staking import Staking
+
+FEE_RATE = 1_000
+
+@pytest.fixture(scope='module')
+def asset(project, deployer):
+    return project.MockToken.deploy(sender=deployer)
+
+@pytest.fixture(scope='module')
+def staking(project, deployer, alice, asset):
+    staking = project.Staking.deploy(asset, sender=deployer)
+    staking.set_performance_fee_rate(FEE_RATE, sender=deployer)
+    amt = 100 * PRECISION
+    asset.mint(alice, amt, sender=alice)
+    asset.approve(staking, MAX, sender=alice)
+    staking.deposit(amt, sender=alice)
+    return staking
+
+def random_steps(rng, n):
+    # mix of updates within a week, at the start of a week and after missed weeks
+    steps = []
+    for _ in range(n):
+        gap = rng.choice([DAY_LENGTH // 3, DAY_LENGTH, 2 * DAY_LENGTH, WEEK_LENGTH, 3 * WEEK_LENGTH])
+        gap += rng.randrange(DAY_LENGTH)
+        change = rng.choice([1, 1, 1, -1, -30]) * rng.randrange(PRECISION // 100, PRECISION)
+        steps.append((gap, change))
+    return steps
+
+def test_update_amounts(chain, deployer, alice, asset, staking):
+    rng = random.Random(0)
+    ts = chain.pending_timestamp + DAY_LENGTH
+    chain.pending_timestamp = ts
+    staking.update_amounts(sender=alice)
+    model = Staking.from_contract(staking, asset, ts)
+    treasury = staking.balanceOf(deployer)
+
+    for gap, change in random_steps(rng, 20):
+        if change > 0:
+            asset.mint(staking, change, sender=alice)
+        else:
+            asset.burn(staking, min(-change, asset.balanceOf(staking)), sender=alice)
+        ts += gap
+        chain.pending_timestamp = ts
+        model.timestamp = ts
+        model.balance = asset.balanceOf(staking)
+
+        assert staking.update_amounts(sender=alice).return_value == model.update_amounts()
+        assert staking.totalSupply() == model.supply
+        assert staking.balanceOf(deployer) - treasury == model.fee_shares
+        assert staking.convertToAssets(PRECISION) == model.convert_to_assets(PRECISION)
+        assert staking.convertToShares(PRECISION) == model.convert_to_shares(PRECISION)
+
+def test_project():
+    np = pytest.importorskip('numpy')
+    from yeth.forecast import project
+
+    rng = random.Random(0)
+    start = 1_000 * WEEK_LENGTH + DAY_LENGTH
+    model = Staking(start, PRECISION, 2 * PRECISION, 1_000 * PRECISION, 900 * PRECISION, FEE_RATE)
+    steps = random_steps(rng, 30) + [(3 * WEEK_LENGTH, PRECISION)]
+    timestamps = np.cumsum([start] + [gap for gap, _ in steps])[1:]
+    changes = np.array([[rng.choice([1, 1, 1, -1]) * change for _, change in steps] for _ in range(16)], dtype=object)
+    changes[0] = 0
+
+    result = project(model, timestamps, changes)
+    for i in range(len(changes)):
+        scenario = model.copy()
+        for k in range(len(timestamps)):
+            scenario.timestamp = int(timestamps[k])
+            scenario.balance += changes[i, k]
+            assert scenario.update_amounts() == (result['pending'][i, k], result['streaming'][i, k], result['unlocked'][i, k])
+            assert scenario.supply == result['supply'][i, k]
+            assert scenario.fee_shares == result['fee_shares'][i, k]
+            assert scenario.convert_to_assets(PRECISION) == result['share_price'][i, k]
+
+    # without rewards the existing buckets are unlocked
+    price = list(result['share_price'][0])
+    assert price == sorted(price)
+    assert price[-1] == PRECISION * 1_003 // 900
+    assert result['fee_shares'][0, -1] == 0
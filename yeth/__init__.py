@@ -0,0 +1,3 @@
+"""
+Pure Python models of the yETH contracts
+"""
@@ -0,0 +1,98 @@
+"""
+Convergence statistics of the iterative solvers.
+Records the iteration count, starting guess and final relative error of every
+`calc_supply` and `calc_vb` call made by the pool model, grouped by the pool
+operation that triggered it. Since the model is bit exact, the iteration counts
+are the same as those of the contract for the same sequence of operations.
+"""
+
+import sys
+from collections import Counter, defaultdict
+from yeth import pool as _pool
+
+class Recorder:
+    """
+    Collect solver statistics while active
+    ```
+    with Recorder() as recorder:
+        model.swap(0, 1, amount)
+    print(recorder.format())
+    ```
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __enter__(self):
+        _pool.solver_observers.append(self.record)
+        return self
+
+    def __exit__(self, *args):
+        _pool.solver_observers.remove(self.record)
+
+    def record(self, solver, iterations, guess, error):
+        self.calls.append((entry_point(), solver, iterations, guess, error))
+
+    def histogram(self):
+        """
+        Count solver calls by number of iterations
+        @return Dictionary of (entry point, solver) to `Counter` of iteration counts
+        """
+        histogram = defaultdict(Counter)
+        for entry, solver, iterations, _, _ in self.calls:
+            histogram[(entry, solver)][iterations] += 1
+        return dict(histogram)
+
+    def max_error(self):
+        """
+        Largest relative error at termination
+        @return Dictionary of (entry point, solver) to relative error
+        """
+        errors = {}
+        for entry, solver, _, _, error in self.calls:
+            errors[(entry, solver)] = max(errors.get((entry, solver), 0), error)
+        return errors
+
+    def format(self, width=40):
+        """
+        Render the histograms as text, one per entry point and solver
+        """
+        lines = []
+        errors = self.max_error()
+        for key, counts in sorted(self.histogram().items()):
+            total = sum(counts.values())
+            mean = sum(k * v for k, v in counts.items()) / total
+            lines.append(f'{key[0]} {key[1]}: {total} calls, mean {mean:.2f} iterations, max error {errors[key]:.2e}')
+            peak = max(counts.values())
+            for iterations in range(min(counts), max(counts) + 1):
+                count = counts.get(iterations, 0)
+                lines.append(f'{iterations:>5} {count:>7} {"#" * -(-count * width // peak)}')
+        return '\n'.join(lines)
+
+def replay(model, transactions):
+    """
+    Apply a sequence of operations to a pool model and record the solver calls
+    @param model `Pool` model, modified in place
+    @param transactions Iterable of tuples with method name and arguments,
+        e.g. `('swap', (0, 1, amount))`. Operations that revert are skipped
+    @return Recorder with the statistics
+    """
+    with Recorder() as recorder:
+        for method, args in transactions:
+            try:
+                getattr(model, method)(*args)
+            except _pool.Revert:
+                pass
+    return recorder
+
+def entry_point():
+    """
+    Name of the outermost public `Pool` method on the call stack
+    """
+    entry = 'external'
+    frame = sys._getframe(1)
+    while frame is not None:
+        obj = frame.f_locals.get('self')
+        if isinstance(obj, _pool.Pool) and not frame.f_code.co_name.startswith('_'):
+            entry = frame.f_code.co_name
+        frame = frame.f_back
+    return entry
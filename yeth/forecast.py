@@ -0,0 +1,154 @@
+"""
+Vectorized projection of the staking buckets.
+Applies the same sequence of updates to a batch of reward and slashing
+scenarios at once, with the exact integer arithmetic of `yeth.staking`.
+Amounts are kept in numpy object arrays of Python integers, so every scenario
+is bit exact with the contract. Requires numpy.
+"""
+
+import numpy as np
+from yeth.math import PRECISION, check
+from yeth.staking import *
+
+def project(staking, timestamps, changes):
+    """
+    Project bucket amounts, share price and treasury fee shares over many updates
+    @param staking `Staking` model with the starting state, shared by all scenarios
+    @param timestamps Increasing times at which `update_amounts` is called
+    @param changes 2D array of asset balance changes, one row per scenario and one
+        column per timestamp. Positive for rewards, negative for slashings.
+        Each column is applied right before the update at the corresponding time
+    @return Dictionary of 2D integer arrays with one row per scenario and one column
+        per timestamp, with keys `pending`, `streaming`, `unlocked`, `supply`,
+        `fee_shares` (cumulative) and `share_price` (assets per `PRECISION` shares)
+    """
+    changes = np.asarray(changes).astype(object)
+    check(changes.ndim == 2 and changes.shape[1] == len(timestamps), 'shape mismatch')
+    num_scenarios = changes.shape[0]
+
+    updated = staking.updated
+    balance = np.full(num_scenarios, staking.balance, dtype=object)
+    pending = np.full(num_scenarios, staking.pending, dtype=object)
+    streaming = np.full(num_scenarios, staking.streaming, dtype=object)
+    unlocked = np.full(num_scenarios, staking.unlocked, dtype=object)
+    supply = np.full(num_scenarios, staking.supply, dtype=object)
+    fee_shares = np.full(num_scenarios, staking.fee_shares, dtype=object)
+
+    keys = ['pending', 'streaming', 'unlocked', 'supply', 'fee_shares', 'share_price']
+    result = {key: np.empty(changes.shape, dtype=object) for key in keys}
+    for k, timestamp in enumerate(timestamps):
+        timestamp = int(timestamp)
+        check(timestamp >= updated, 'timestamps not increasing')
+        balance = balance + changes[:, k]
+        check(np.all(balance >= 0), 'negative balance')
+
+        pending, streaming, unlocked, new_fee_shares, _ = get_amounts_vec(
+            updated, timestamp, balance, pending, streaming, unlocked, supply, staking.performance_fee_rate
+        )
+        updated = timestamp
+        supply = supply + new_fee_shares
+        fee_shares = fee_shares + new_fee_shares
+
+        # `convertToAssets(PRECISION)`
+        share_price = np.where(supply == 0, PRECISION, PRECISION * unlocked // np.where(supply == 0, 1, supply))
+        for key, value in zip(keys, [pending, streaming, unlocked, supply, fee_shares, share_price]):
+            result[key][:, k] = value
+    return result
+
+def get_amounts_vec(updated, timestamp, current, pending, streaming, unlocked, supply, fee_rate):
+    """
+    Calculate latest bucket amounts for a batch of scenarios, see `yeth.staking.get_amounts`
+    @param updated Time of last update, shared by all scenarios
+    @param timestamp Current time, shared by all scenarios
+    @param current Array of asset balances of the contract
+    @param pending Array of pending amounts
+    @param streaming Array of streaming amounts
+    @param unlocked Array of unlocked amounts
+    @param supply Array of total amounts of shares
+    @param fee_rate Performance fee rate, in units of `FEE_PRECISION`
+    @return Tuple of arrays with pending, streaming, unlocked amounts, new fee shares and balance changes since last update
+    @dev Branches on time are shared by all scenarios, branches on amounts are selected per scenario
+    """
+    zero = np.zeros(len(current), dtype=object)
+    if updated == timestamp:
+        return pending, streaming, unlocked, zero, zero
+
+    new_fee = zero
+    last = pending + streaming + unlocked
+
+    delta = zero
+    weeks = timestamp // WEEK_LENGTH - updated // WEEK_LENGTH
+    if weeks > 0:
+        if weeks == 1:
+            # new week
+            unlocked = unlocked + streaming
+            streaming = pending
+            pending = zero
+        else:
+            # function hasnt been called in at least a week
+            span = timestamp - updated
+            unlocked = unlocked + streaming + pending
+
+            # net rewards generated, distribute over buckets. net penalty is dealt with below
+            gain = current > last
+            rewards = np.where(gain, current - last, 0)
+            fee = rewards * fee_rate // FEE_PRECISION
+            rewards = rewards - fee
+            new_fee = new_fee + fee
+
+            delta = rewards
+            last = np.where(gain, current, last)
+
+            # streaming bucket: 7 days
+            streaming = rewards * WEEK_LENGTH // span
+            rewards = rewards - streaming
+
+            # pending bucket: time since new week
+            pending = rewards * (timestamp % WEEK_LENGTH) // (span - WEEK_LENGTH)
+            rewards = rewards - pending
+
+            # unlocked bucket: rest
+            unlocked = unlocked + rewards
+
+        # set to beginning of the week
+        updated = timestamp // WEEK_LENGTH * WEEK_LENGTH
+
+    # time between last update and end of week
+    duration = WEEK_LENGTH - (updated % WEEK_LENGTH)
+    # time that has passed since last update
+    span = timestamp - updated
+
+    # unlock funds
+    streamed = streaming * span // duration
+    streaming = streaming - streamed
+    unlocked = unlocked + streamed
+
+    # rewards
+    gain = current >= last
+    rewards = np.where(gain, current - last, 0)
+    fee = rewards * fee_rate // FEE_PRECISION
+    rewards = rewards - fee
+    new_fee = new_fee + fee
+    if weeks == 1 and timestamp % WEEK_LENGTH <= DAY_LENGTH:
+        # if first update in new week is in first day, add to streaming
+        streaming = streaming + rewards
+    else:
+        pending = pending + rewards
+    delta = delta + rewards
+
+    # penalty, taken from pending, streaming and unlocked in that order
+    shortage = np.where(gain, 0, last - current)
+    delta = delta - shortage
+    taken = np.minimum(pending, shortage)
+    pending = pending - taken
+    shortage = shortage - taken
+    taken = np.minimum(streaming, shortage)
+    streaming = streaming - taken
+    shortage = shortage - taken
+    unlocked = unlocked - shortage
+
+    empty = unlocked == 0
+    new_fee_shares = np.where(empty, new_fee, new_fee * supply // np.where(empty, 1, unlocked))
+    unlocked = unlocked + new_fee
+
+    return pending, streaming, unlocked, new_fee_shares, delta
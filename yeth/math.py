@@ -0,0 +1,318 @@
+"""
+Integer port of the fixed point math in `contracts/Pool.vy`.
+Every function reproduces the contract rounding bit for bit,
+including truncation towards zero of signed divisions.
+"""
+
+from math import isqrt
+
+class Revert(Exception):
+    """
+    Raised wherever the contract would revert
+    """
+
+def check(cond, reason=''):
+    if not cond:
+        raise Revert(reason)
+
+PRECISION = 1_000_000_000_000_000_000
+
+# powers of 10
+E3 = 1_000
+E6 = E3 * E3
+E9 = E3 * E6
+E12 = E3 * E9
+E15 = E3 * E12
+E17 = 100 * E15
+E18 = E3 * E15
+E20 = 100 * E18
+E36 = E18 * E18
+MAX_POW_REL_ERR = 100 # 1e-16
+POW_EXACT_STEP = PRECISION // 2
+POW_EXACT_BOUND = 256 * PRECISION
+MAX_UINT256 = 2**256 - 1
+MIN_NAT_EXP = -41 * E18
+MAX_NAT_EXP = 130 * E18
+LOG36_LOWER = E18 - E17
+LOG36_UPPER = E18 + E17
+MILD_EXP_BOUND = 2**254 // 100_000_000_000_000_000_000
+
+# x_n = 2^(7-n), a_n = exp(x_n)
+# in 20 decimals for n >= 2
+X0 = 128 * E18 # 18 decimals
+A0 = 38_877_084_059_945_950_922_200 * E15 * E18 # no decimals
+X1 = X0 // 2 # 18 decimals
+A1 = 6_235_149_080_811_616_882_910 * E6 # no decimals
+X2 = X1 * 100 // 2
+A2 = 7_896_296_018_268_069_516_100 * E12
+X3 = X2 // 2
+A3 = 888_611_052_050_787_263_676 * E6
+X4 = X3 // 2
+A4 = 298_095_798_704_172_827_474 * E3
+X5 = X4 // 2
+A5 = 5_459_815_003_314_423_907_810
+X6 = X5 // 2
+A6 = 738_905_609_893_065_022_723
+X7 = X6 // 2
+A7 = 271_828_182_845_904_523_536
+X8 = X7 // 2
+A8 = 164_872_127_070_012_814_685
+X9 = X8 // 2
+A9 = 128_402_541_668_774_148_407
+X10 = X9 // 2
+A10 = 11_331_4845_306_682_631_683
+X11 = X10 // 2
+A11 = 1_064_49_445_891_785_942_956
+
+def sdiv(a, b):
+    """
+    Signed division, truncating towards zero like the EVM `SDIV`
+    """
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+def smod(a, b):
+    """
+    Signed modulo, taking the sign of the dividend like the EVM `SMOD`
+    """
+    r = abs(a) % abs(b)
+    return -r if a < 0 else r
+
+def pow_up(x, y):
+    """
+    Calculate `x` to power of `y`, rounded up
+    """
+    if x > 0 and y % POW_EXACT_STEP == 0 and y < POW_EXACT_BOUND:
+        p = pow_exact(x, y, True)
+        if p > 0:
+            return p
+    p = pow_(x, y)
+    if p == 0:
+        return 0
+    # p + (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    return p + (p * MAX_POW_REL_ERR - 1) // PRECISION + 1
+
+def pow_down(x, y):
+    """
+    Calculate `x` to power of `y`, rounded down
+    """
+    if x > 0 and y % POW_EXACT_STEP == 0 and y < POW_EXACT_BOUND:
+        p = pow_exact(x, y, False)
+        if p > 0:
+            return p
+    p = pow_(x, y)
+    if p == 0:
+        return 0
+    # (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    e = (p * MAX_POW_REL_ERR - 1) // PRECISION + 1
+    if p < e:
+        return 0
+    return p - e
+
+def pow_exact(x, y, up):
+    """
+    Calculate `x` to power of `y` by squaring, for integer and half-integer exponents below 256
+    Every step is rounded in the same direction, zero if it cannot be calculated this way
+    """
+    r = PRECISION
+    if y % PRECISION != 0:
+        # half-integer, start from sqrt(x)
+        if x > MAX_UINT256 // PRECISION:
+            return 0
+        s = x * PRECISION
+        r = isqrt(s)
+        if up and r * r < s:
+            r += 1
+
+    b = x
+    n = y // PRECISION
+    for _ in range(8):
+        if n % 2 == 1:
+            r = mul_exact(r, b, up)
+            if r == 0:
+                return 0
+        n >>= 1
+        if n == 0:
+            break
+        b = mul_exact(b, b, up)
+        if b == 0:
+            return 0
+    return r
+
+def mul_exact(a, b, up):
+    """
+    Multiply two non-zero fixed point numbers in 18 decimals, zero on overflow
+    """
+    if a > MAX_UINT256 // b:
+        return 0
+    p = a * b
+    if up and p % PRECISION > 0:
+        return p // PRECISION + 1
+    return p // PRECISION
+
+def pow_(x, y):
+    """
+    Calculate `x` to power of `y`
+    """
+    if y == 0:
+        return E18 # x^0 == 1
+
+    if x == 0:
+        return 0 # 0^y == 0
+
+    # x^y = e^log(x^y)) = e^(y log x)
+    return exp(log_pow(x, y))
+
+def log_pow(x, y):
+    """
+    Calculate `y log x`, the natural logarithm of `x^y`, in 18 decimals
+    """
+    check(x > 0 and x >> 255 == 0, 'x out of bounds')
+    check(y < MILD_EXP_BOUND, 'y out of bounds')
+
+    if x > LOG36_LOWER and x < LOG36_UPPER:
+        l = log36(x)
+        # l / E18 * y + (l % E18) * y / E18
+        l = sdiv(l, E18) * y + sdiv(smod(l, E18) * y, E18)
+    else:
+        l = log(x) * y
+    return sdiv(l, E18)
+
+def exp_up(l):
+    """
+    Calculate natural exponent `e^l`, rounded up
+    """
+    if l < MIN_NAT_EXP:
+        # e^MIN_NAT_EXP < 2 wei
+        return 2
+    p = exp(l)
+    # p + (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    return p + (p * MAX_POW_REL_ERR - 1) // PRECISION + 1
+
+def exp_down(l):
+    """
+    Calculate natural exponent `e^l`, rounded down
+    """
+    if l < MIN_NAT_EXP:
+        return 0
+    p = exp(l)
+    # (p * MAX_POW_REL_ERR - 1) / PRECISION + 1
+    e = (p * MAX_POW_REL_ERR - 1) // PRECISION + 1
+    if p < e:
+        return 0
+    return p - e
+
+def log36(x):
+    """
+    Calculate natural logarithm in double precision, result in 36 decimals
+    """
+    x = x * E18
+
+    # Taylor series
+    # z = (x - 1) / (x + 1)
+    # c = log x = 2 * sum(z^(2n + 1) / (2n + 1))
+    z = sdiv((x - E36) * E36, x + E36)
+    zsq = sdiv(z * z, E36)
+    n = z
+    c = z
+    for k in range(3, 17, 2):
+        n = sdiv(n * zsq, E36)
+        c += sdiv(n, k)
+    return c * 2
+
+def log(a):
+    """
+    Calculate natural logarithm in 18 decimals
+    """
+    if a < E18:
+        # 1/a > 1, log(a) = -log(1/a)
+        return -_log(sdiv(E18 * E18, a))
+    return _log(a)
+
+def _log(a):
+    """
+    Calculate natural logarithm, assuming the argument is larger than one
+    """
+    # log a = sum(k_n x_n) + log(rem)
+    #       = log(product(a_n^k_n) * rem)
+    # k_n = {0,1}, x_n = 2^(7-n), log(a_n) = x_n
+    s = 0
+
+    # divide out a_ns
+    if a >= A0 * E18:
+        a = sdiv(a, A0)
+        s += X0
+    if a >= A1 * E18:
+        a = sdiv(a, A1)
+        s += X1
+
+    # other terms are in 20 decimals
+    a *= 100
+    s *= 100
+
+    for an, xn in ((A2, X2), (A3, X3), (A4, X4), (A5, X5), (A6, X6), (A7, X7), (A8, X8), (A9, X9), (A10, X10), (A11, X11)):
+        if a >= an:
+            a = sdiv(a * E20, an)
+            s += xn
+
+    # a < A11 (1.06), taylor series for remainder
+    # z = (a - 1) / (a + 1)
+    # c = log a = 2 * sum(z^(2n + 1) / (2n + 1))
+    z = sdiv((a - E20) * E20, a + E20)
+    zsq = sdiv(z * z, E20)
+    n = z
+    c = z
+    for k in range(3, 13, 2):
+        n = sdiv(n * zsq, E20)
+        c += sdiv(n, k)
+
+    c *= 2
+    return sdiv(s + c, 100)
+
+def exp(x):
+    """
+    Calculate natural exponent `e^x` in 18 decimals
+    """
+    check(x >= MIN_NAT_EXP and x <= MAX_NAT_EXP)
+    if x < 0:
+        # exp(-x) = 1/exp(x)
+        return sdiv(E18 * E18, _exp(-x))
+    return _exp(x)
+
+def _exp(x):
+    """
+    Calculate natural exponent `e^x`, assuming exponent is positive
+    """
+    # e^x = e^(sum(k_n x_n) + rem)
+    #     = product(e^(k_n x_n)) * e^(rem)
+    #     = product(a_n^k_n) * e^(rem)
+    # k_n = {0,1}, x_n = 2^(7-n), a_n = exp(x_n)
+
+    # subtract out x_ns
+    f = 1
+    if x >= X0:
+        x -= X0
+        f = A0
+    elif x >= X1:
+        x -= X1
+        f = A1
+
+    # other terms are in 20 decimals
+    x *= 100
+
+    p = E20
+    for an, xn in ((A2, X2), (A3, X3), (A4, X4), (A5, X5), (A6, X6), (A7, X7), (A8, X8), (A9, X9)):
+        if x >= xn:
+            x -= xn
+            p = sdiv(p * an, E20)
+
+    # x < X9 (0.25), taylor series for remainder
+    # c = e^x = sum(x^n / n!)
+    n = x
+    c = E20 + x
+    for k in range(2, 13):
+        n = sdiv(sdiv(n * x, E20), k)
+        c += n
+
+    # p * c / E20 * f / 100
+    return sdiv(sdiv(p * c, E20) * f, 100)
@@ -0,0 +1,872 @@
+"""
+Pure Python port of `contracts/Pool.vy`.
+Keeps a copy of the pool storage and applies every user operation with the
+exact integer arithmetic of the contract, so quotes and simulated state
+transitions match the chain to the wei without an EVM round trip.
+Token transfers and LP token mints/burns are not modelled, only their effect
+on the pool storage. Checked arithmetic overflows are not reproduced.
+"""
+
+from yeth.math import *
+
+MAX_NUM_ASSETS = 32
+MAX_SUPPLY_STEP = 2 # largest ratio between consecutive iterates in `calc_supply`
+ALL_ASSETS_FLAG = sum((i + 1) << 8 * i for i in range(MAX_NUM_ASSETS))
+POOL_VB_MASK = 2**128 - 1
+POOL_VB_SHIFT = 128
+RAMP_MASK = 2**128 - 1
+RAMP_PROGRESS_SHIFT = 128
+RATE_REFRESH_MASK = 2**32 - 1
+RATE_REFRESH_SHIFT = 32
+
+VB_MASK = 2**96 - 1
+RATE_MASK = 2**80 - 1
+RATE_SHIFT = 96
+PACKED_WEIGHT_SHIFT = 176
+
+WEIGHT_SCALE = 1_000_000_000_000
+WEIGHT_MASK = 2**20 - 1
+TARGET_WEIGHT_SHIFT = 20
+LOWER_BAND_SHIFT = 40
+UPPER_BAND_SHIFT = 60
+
+# callables notified of every solver call, see `yeth.convergence`
+solver_observers = []
+
+UINT256_MASK = 2**256 - 1
+
+class Pool:
+    """
+    In-memory copy of the pool storage.
+    `provider_rates` takes the place of the external rate providers,
+    `timestamp` the place of `block.timestamp` and `block` the place of `block.number`.
+    With `block` left at `None` every operation behaves as if it is in a block of its own
+    """
+    def __init__(
+        self,
+        amplification,
+        packed_vbs,
+        supply=0,
+        packed_pool_vb=0,
+        swap_fee_rate=0,
+        ramp_step=1,
+        ramp_last_time=0,
+        ramp_stop_time=0,
+        target_amplification=0,
+        ramp_progress=0,
+        provider_rates=None,
+        timestamp=0,
+        block=None,
+        packed_rate_refresh=0,
+    ):
+        self.amplification = amplification
+        self.packed_vbs = list(packed_vbs)
+        self.num_assets = len(self.packed_vbs)
+        self.supply = supply
+        self.packed_pool_vb = packed_pool_vb
+        self.swap_fee_rate = swap_fee_rate
+        self.ramp_step = ramp_step
+        self.ramp_last_time = ramp_last_time
+        self.ramp_stop_time = ramp_stop_time
+        self.target_amplification = target_amplification
+        self.ramp_progress = ramp_progress
+        if provider_rates is None:
+            provider_rates = [self.rate(asset) for asset in range(self.num_assets)]
+        self.provider_rates = list(provider_rates)
+        self.timestamp = timestamp
+        self.block = block
+        self.packed_rate_refresh = packed_rate_refresh
+        self.paused = False
+        self.sender_is_management = False
+
+    @classmethod
+    def create(cls, amplification, weights, rates, **kwargs):
+        """
+        Create an empty pool, like the contract constructor
+        """
+        num_assets = len(weights)
+        check(num_assets >= 2 and len(rates) == num_assets)
+        check(amplification > 0)
+        check(sum(weights) == PRECISION)
+        packed_vbs = []
+        for weight in weights:
+            check(weight > 0)
+            packed_vbs.append(pack_vb(0, 0, pack_weight(weight, weight, PRECISION, PRECISION)))
+        return cls(amplification, packed_vbs, provider_rates=rates, **kwargs)
+
+    @classmethod
+    def from_contract(cls, pool, timestamp=0, block=None):
+        """
+        Load the storage of a deployed pool through a single call to its `get_state` view
+        @dev Pass the current block number to skip rates already read in that block, like the contract
+        """
+        supply, amplification, target_amplification, swap_fee_rate, ramp_step, packed_ramp, ramp_stop_time, \
+            packed_pool_vb, packed_rate_refresh, packed_vbs, _ = pool.get_state()
+        return cls(
+            amplification,
+            list(packed_vbs),
+            supply=supply,
+            packed_pool_vb=packed_pool_vb,
+            swap_fee_rate=swap_fee_rate,
+            ramp_step=ramp_step,
+            ramp_last_time=packed_ramp & RAMP_MASK,
+            ramp_stop_time=ramp_stop_time,
+            target_amplification=target_amplification,
+            ramp_progress=packed_ramp >> RAMP_PROGRESS_SHIFT,
+            timestamp=timestamp,
+            block=block,
+            packed_rate_refresh=packed_rate_refresh,
+        )
+
+    def copy(self):
+        pool = Pool.__new__(Pool)
+        pool.__dict__.update(self.__dict__)
+        pool.packed_vbs = list(self.packed_vbs)
+        pool.provider_rates = list(self.provider_rates)
+        return pool
+
+    def swap(self, i, j, dx, min_dy=0):
+        """
+        Swap one pool asset for another
+        @return The amount of output asset sent
+        """
+        num_assets = self.num_assets
+        check(i != j, 'same input and output asset')
+        check(i < num_assets and j < num_assets, 'index out of bounds')
+        check(dx > 0, 'zero amount')
+
+        # update rates for from and to assets
+        vb_prod, vb_sum = unpack_pool_vb(self.packed_pool_vb)
+        vb_prod, vb_sum, progress = self._update_rates((i + 1) | (j + 1) << 8, vb_prod, vb_sum, False)
+        prev_vb_sum = vb_sum
+
+        prev_vb_x, rate_x, packed_weight_x = unpack_vb(self.packed_vbs[i])
+        weight_x = ramp_weight(packed_weight_x, progress)
+        wn_x = unpack_wn(weight_x, num_assets)
+
+        prev_vb_y, rate_y, packed_weight_y = unpack_vb(self.packed_vbs[j])
+        weight_y = ramp_weight(packed_weight_y, progress)
+        wn_y = unpack_wn(weight_y, num_assets)
+
+        dx_fee = dx * self.swap_fee_rate // PRECISION
+        dvb_x = (dx - dx_fee) * rate_x // PRECISION
+        vb_x = prev_vb_x + dvb_x
+
+        # initial guess along the tangent of the invariant
+        vb_y = dvb_x * slope(self.amplification, self.supply, vb_prod, prev_vb_x, wn_x) // \
+            slope(self.amplification, self.supply, vb_prod, prev_vb_y, wn_y)
+        vb_y = prev_vb_y - vb_y if vb_y < prev_vb_y // 2 else prev_vb_y // 2
+
+        # update x_i and remove x_j from variables
+        vb_prod = vb_prod * pow_up(prev_vb_y, wn_y) // pow_down(vb_x * PRECISION // prev_vb_x, wn_x)
+        vb_sum = vb_sum + dvb_x - prev_vb_y
+
+        # calulate new balance of out token
+        vb_y = calc_vb(wn_y, vb_y, self.supply, self.amplification, vb_prod, vb_sum)
+        vb_sum += vb_y
+
+        # check bands
+        check_bands(prev_vb_x * PRECISION // prev_vb_sum, vb_x * PRECISION // vb_sum, weight_x)
+        check_bands(prev_vb_y * PRECISION // prev_vb_sum, vb_y * PRECISION // vb_sum, weight_y)
+
+        check(prev_vb_y >= vb_y)
+        dy = (prev_vb_y - vb_y) * PRECISION // rate_y
+        check(dy >= min_dy, 'slippage')
+
+        if dx_fee > 0:
+            # add fee to pool
+            dvb_x = dx_fee * rate_x // PRECISION
+            vb_prod = vb_prod * PRECISION // pow_down((vb_x + dvb_x) * PRECISION // vb_x, wn_x)
+            vb_x += dvb_x
+            vb_sum += dvb_x
+
+        # update variables
+        self.packed_vbs[i] = pack_vb(vb_x, rate_x, packed_weight_x)
+        self.packed_vbs[j] = pack_vb(vb_y, rate_y, packed_weight_y)
+        vb_prod = vb_prod * PRECISION // pow_up(vb_y, wn_y)
+
+        # mint fees
+        if dx_fee > 0:
+            supply, vb_prod = self._update_supply(self.supply, vb_prod, vb_sum)
+
+        self.packed_pool_vb = pack_pool_vb(vb_prod, vb_sum)
+        return dy
+
+    def swap_exact_out(self, i, j, dy, max_dx=UINT256_MASK):
+        """
+        Swap one pool asset for another, with a fixed output amount
+        @return The amount of input asset taken
+        """
+        num_assets = self.num_assets
+        check(i != j, 'same input and output asset')
+        check(i < num_assets and j < num_assets, 'index out of bounds')
+        check(dy > 0, 'zero amount')
+
+        # update rates for from and to assets
+        vb_prod, vb_sum = unpack_pool_vb(self.packed_pool_vb)
+        vb_prod, vb_sum, progress = self._update_rates((i + 1) | (j + 1) << 8, vb_prod, vb_sum, False)
+        prev_vb_sum = vb_sum
+
+        prev_vb_x, rate_x, packed_weight_x = unpack_vb(self.packed_vbs[i])
+        weight_x = ramp_weight(packed_weight_x, progress)
+        wn_x = unpack_wn(weight_x, num_assets)
+
+        prev_vb_y, rate_y, packed_weight_y = unpack_vb(self.packed_vbs[j])
+        weight_y = ramp_weight(packed_weight_y, progress)
+        wn_y = unpack_wn(weight_y, num_assets)
+
+        dvb_y = dy * rate_y // PRECISION
+        check(prev_vb_y >= dvb_y)
+        vb_y = prev_vb_y - dvb_y
+
+        # initial guess along the tangent of the invariant
+        vb_x = prev_vb_x + dvb_y * slope(self.amplification, self.supply, vb_prod, prev_vb_y, wn_y) // \
+            slope(self.amplification, self.supply, vb_prod, prev_vb_x, wn_x)
+
+        # update x_j and remove x_i from variables
+        vb_prod = vb_prod * pow_up(prev_vb_x, wn_x) // pow_down(vb_y * PRECISION // prev_vb_y, wn_y)
+        vb_sum = vb_sum - dvb_y - prev_vb_x
+
+        # calulate new balance of in token
+        vb_x = calc_vb(wn_x, vb_x, self.supply, self.amplification, vb_prod, vb_sum)
+        check(vb_x >= prev_vb_x)
+        dx = (vb_x - prev_vb_x) * PRECISION // rate_x
+        dx_fee = self.swap_fee_rate
+        dx_fee = dx * dx_fee // (PRECISION - dx_fee)
+        dx += dx_fee
+        vb_x += dx_fee * rate_x // PRECISION
+        vb_sum += vb_x
+        check(dx <= max_dx, 'slippage')
+
+        # check bands
+        check_bands(prev_vb_x * PRECISION // prev_vb_sum, vb_x * PRECISION // vb_sum, weight_x)
+        check_bands(prev_vb_y * PRECISION // prev_vb_sum, vb_y * PRECISION // vb_sum, weight_y)
+
+        # update variables
+        self.packed_vbs[i] = pack_vb(vb_x, rate_x, packed_weight_x)
+        self.packed_vbs[j] = pack_vb(vb_y, rate_y, packed_weight_y)
+        vb_prod = vb_prod * PRECISION // pow_up(vb_x, wn_x)
+
+        # mint fees
+        if dx_fee > 0:
+            supply, vb_prod = self._update_supply(self.supply, vb_prod, vb_sum)
+
+        self.packed_pool_vb = pack_pool_vb(vb_prod, vb_sum)
+        return dx
+
+    def add_liquidity(self, amounts, min_lp_amount=0):
+        """
+        Deposit assets into the pool
+        @return The amount of LP tokens minted
+        """
+        num_assets = self.num_assets
+        check(len(amounts) == num_assets)
+
+        vb_prod, vb_sum = unpack_pool_vb(self.packed_pool_vb)
+
+        # find lowest relative increase in balance
+        assets = 0
+        lowest = UINT256_MASK
+        sh = 0
+        for asset in range(num_assets):
+            if amounts[asset] > 0:
+                assets = assets | (asset + 1) << sh
+                sh += 8
+                if vb_sum > 0 and lowest > 0:
+                    prev_vb, rate, packed_weight = unpack_vb(self.packed_vbs[asset])
+                    lowest = min(amounts[asset] * rate // prev_vb, lowest)
+            else:
+                lowest = 0
+        check(sh > 0, 'need to deposit at least one asset')
+
+        # update rates
+        vb_prod, vb_sum, progress = self._update_rates(assets, vb_prod, vb_sum, False)
+        prev_supply = self.supply
+
+        vb_prod_final = vb_prod
+        vb_sum_final = vb_sum
+        log_prod_final = 0
+        log_prod = 0
+        fee_rate = self.swap_fee_rate // 2
+        prev_vb_sum = vb_sum
+        prev_ratios = []
+        for asset in range(num_assets):
+            amount = amounts[asset]
+            if amount == 0:
+                check(prev_supply > 0, 'initial deposit amounts must be non-zero')
+                continue
+
+            # update stored virtual balance
+            prev_vb, rate, packed_weight = unpack_vb(self.packed_vbs[asset])
+            dvb = amount * rate // PRECISION
+            vb = prev_vb + dvb
+            self.packed_vbs[asset] = pack_vb(vb, rate, packed_weight)
+
+            if prev_supply > 0:
+                prev_ratios.append(prev_vb * PRECISION // prev_vb_sum)
+                wn = unpack_wn(ramp_weight(packed_weight, progress), num_assets)
+
+                # update product and sum of virtual balances, product in log space
+                log_prod_final += log_pow(prev_vb * PRECISION // vb, wn)
+                # the `D^n` factor will be updated in `calc_supply()`
+                vb_sum_final += dvb
+
+                # remove fees from balance and recalculate sum and product
+                fee = (dvb - prev_vb * lowest // PRECISION) * fee_rate // PRECISION
+                log_prod += log_pow(prev_vb * PRECISION // (vb - fee), wn)
+                vb_sum += dvb - fee
+
+        supply = prev_supply
+        if prev_supply == 0:
+            # initital deposit, calculate necessary variables
+            vb_prod, vb_sum = self._calc_vb_prod_sum(progress)
+            check(vb_prod > 0, 'amounts must be non-zero')
+            supply = vb_sum
+        else:
+            # factor in all deposits at once
+            vb_prod_final = vb_prod_final * exp_up(log_prod_final) // PRECISION
+            vb_prod = vb_prod * exp_up(log_prod) // PRECISION
+
+            # check bands
+            j = 0
+            for asset in range(num_assets):
+                if amounts[asset] == 0:
+                    continue
+                vb, rate, packed_weight = unpack_vb(self.packed_vbs[asset])
+                check_bands(prev_ratios[j], vb * PRECISION // vb_sum_final, ramp_weight(packed_weight, progress))
+                j += 1
+
+        # mint LP tokens
+        supply, vb_prod = calc_supply(num_assets, supply, self.amplification, vb_prod, vb_sum, prev_supply == 0)
+        mint = supply - prev_supply
+        check(mint > 0 and mint >= min_lp_amount, 'slippage')
+
+        supply_final = supply
+        if prev_supply > 0:
+            # mint fees
+            supply_final, vb_prod_final = calc_supply(num_assets, prev_supply, self.amplification, vb_prod_final, vb_sum_final, True)
+        else:
+            vb_prod_final = vb_prod
+            vb_sum_final = vb_sum
+
+        self.supply = supply_final
+        self.packed_pool_vb = pack_pool_vb(vb_prod_final, vb_sum_final)
+        return mint
+
+    def remove_liquidity(self, lp_amount, min_amounts=None):
+        """
+        Withdraw assets from the pool in a balanced manner
+        @return Array with the amount of each asset sent
+        """
+        num_assets = self.num_assets
+        if min_amounts is None:
+            min_amounts = [0] * num_assets
+        check(len(min_amounts) == num_assets)
+
+        # update supply
+        prev_supply = self.supply
+        check(prev_supply >= lp_amount)
+        supply = prev_supply - lp_amount
+        self.supply = supply
+
+        # update necessary variables and transfer assets
+        vb_sum = 0
+        amounts = []
+        for asset in range(num_assets):
+            prev_vb, rate, packed_weight = unpack_vb(self.packed_vbs[asset])
+            dvb = prev_vb * lp_amount // prev_supply
+            vb = prev_vb - dvb
+            self.packed_vbs[asset] = pack_vb(vb, rate, packed_weight)
+            vb_sum += vb
+
+            amount = dvb * PRECISION // rate
+            check(amount >= min_amounts[asset], 'slippage')
+            amounts.append(amount)
+
+        vb_prod = 0
+        if supply > 0:
+            vb_prod = self._calc_vb_prod(supply, self.ramp_progress)
+        self.packed_pool_vb = pack_pool_vb(vb_prod, vb_sum)
+        return amounts
+
+    def remove_liquidity_single(self, asset, lp_amount, min_amount=0):
+        """
+        Withdraw a single asset from the pool
+        @return The amount of asset sent
+        """
+        num_assets = self.num_assets
+        check(asset < num_assets, 'index out of bounds')
+
+        # update rate
+        vb_prod, vb_sum = unpack_pool_vb(self.packed_pool_vb)
+        vb_prod, vb_sum, progress = self._update_rates(asset + 1, vb_prod, vb_sum, False)
+        prev_vb_sum = vb_sum
+
+        # update supply
+        prev_supply = self.supply
+        check(prev_supply >= lp_amount)
+        supply = prev_supply - lp_amount
+        self.supply = supply
+
+        prev_vb, rate, packed_weight = unpack_vb(self.packed_vbs[asset])
+        weight = ramp_weight(packed_weight, progress)
+        wn = unpack_wn(weight, num_assets)
+
+        # initial guess along the tangent of the invariant
+        vb = lp_amount * (self.amplification - PRECISION + (num_assets + 1) * vb_prod) // \
+            slope(self.amplification, prev_supply, vb_prod, prev_vb, wn)
+        vb = prev_vb - vb if vb < prev_vb // 2 else prev_vb // 2
+
+        # update variables
+        vb_prod = vb_prod * pow_up(prev_vb, wn) // PRECISION
+        for _ in range(num_assets):
+            vb_prod = vb_prod * supply // prev_supply
+        vb_sum = vb_sum - prev_vb
+
+        # calculate new balance of asset
+        vb = calc_vb(wn, vb, supply, self.amplification, vb_prod, vb_sum)
+        check(prev_vb >= vb)
+        dvb = prev_vb - vb
+        fee = dvb * self.swap_fee_rate // 2 // PRECISION
+        dvb -= fee
+        vb += fee
+        dx = dvb * PRECISION // rate
+        check(dx > min_amount, 'slippage')
+
+        # update variables
+        self.packed_vbs[asset] = pack_vb(vb, rate, packed_weight)
+        vb_prod = vb_prod * PRECISION // pow_up(vb, wn)
+        vb_sum = vb_sum + vb
+
+        for other in range(num_assets):
+            if other == asset:
+                check_bands(prev_vb * PRECISION // prev_vb_sum, vb * PRECISION // vb_sum, weight)
+            else:
+                vb_loop, rate_loop, packed_weight_loop = unpack_vb(self.packed_vbs[other])
+                check_bands(vb_loop * PRECISION // prev_vb_sum, vb_loop * PRECISION // vb_sum, ramp_weight(packed_weight_loop, progress))
+
+        if fee > 0:
+            # mint fee
+            supply, vb_prod = self._update_supply(supply, vb_prod, vb_sum)
+
+        self.packed_pool_vb = pack_pool_vb(vb_prod, vb_sum)
+        return dx
+
+    def update_rates(self, assets=()):
+        """
+        Update the stored rate of any of the pool's assets
+        @dev If no assets are passed in, every asset will be updated
+        @dev Always reads the rates, also those that have already been read in the current block
+        """
+        num_assets = self.num_assets
+        flags = 0
+        for i, asset in enumerate(assets):
+            check(asset < num_assets, 'index out of bounds')
+            flags |= (asset + 1) << 8 * i
+        if len(assets) == 0:
+            flags = ALL_ASSETS_FLAG
+        vb_prod, vb_sum = unpack_pool_vb(self.packed_pool_vb)
+        vb_prod, vb_sum, _ = self._update_rates(flags, vb_prod, vb_sum, True)
+        self.packed_pool_vb = pack_pool_vb(vb_prod, vb_sum)
+
+    def update_weights(self):
+        """
+        Update weights and amplification factor, if possible
+        @return Boolean to indicate whether the weights and amplification factor have been updated
+        """
+        check(not self.paused, 'paused')
+        vb_prod, vb_sum = unpack_pool_vb(self.packed_pool_vb)
+        vb_prod, updated, _ = self._update_weights(vb_prod)
+        if updated and vb_sum > 0:
+            supply, vb_prod = self._update_supply(self.supply, vb_prod, vb_sum)
+            self.packed_pool_vb = pack_pool_vb(vb_prod, vb_sum)
+        return updated
+
+    def get_dy(self, i, j, dx):
+        """
+        Quote `swap` without modifying the pool
+        """
+        return self.copy().swap(i, j, dx)
+
+    def get_dx(self, i, j, dy):
+        """
+        Quote `swap_exact_out` without modifying the pool
+        """
+        return self.copy().swap_exact_out(i, j, dy)
+
+    def get_add_lp(self, amounts):
+        """
+        Quote `add_liquidity` without modifying the pool
+        """
+        return self.copy().add_liquidity(amounts)
+
+    def get_remove_lp(self, lp_amount):
+        """
+        Quote `remove_liquidity` without modifying the pool
+        """
+        return self.copy().remove_liquidity(lp_amount)
+
+    def get_remove_single_lp(self, asset, lp_amount):
+        """
+        Quote `remove_liquidity_single` without modifying the pool
+        """
+        return self.copy().remove_liquidity_single(asset, lp_amount)
+
+    def vb_prod_sum(self):
+        return unpack_pool_vb(self.packed_pool_vb)
+
+    def rates_refreshed(self):
+        if self.block is None or self.packed_rate_refresh >> RATE_REFRESH_SHIFT != self.block:
+            return 0
+        return self.packed_rate_refresh & RATE_REFRESH_MASK
+
+    def virtual_balance(self, asset):
+        return self.packed_vbs[asset] & VB_MASK
+
+    def rate(self, asset):
+        return (self.packed_vbs[asset] >> RATE_SHIFT) & RATE_MASK
+
+    def packed_weight(self, asset):
+        return self.packed_vbs[asset] >> PACKED_WEIGHT_SHIFT
+
+    def weight(self, asset):
+        weight, target, lower, upper = unpack_weight(ramp_weight(self.packed_weight(asset), self.ramp_progress))
+        if self.ramp_last_time == 0:
+            target = weight
+        return weight, target, lower, upper
+
+    def _update_rates(self, assets, vb_prod, vb_sum, force):
+        check(not self.paused, 'paused')
+
+        prev_vb_prod = vb_prod
+        prev_vb_sum = vb_sum
+        vb_prod, updated, progress = self._update_weights(vb_prod)
+        num_assets = self.num_assets
+        log_prod = 0
+
+        # flags of assets whose rate has been read in this block
+        refreshed = self.rates_refreshed()
+        prev_refreshed = refreshed
+
+        for i in range(MAX_NUM_ASSETS):
+            asset = (assets >> 8 * i) & 255
+            if asset == 0 or asset > num_assets:
+                break
+            asset -= 1
+            if refreshed & 1 << asset and not force:
+                # rate already up to date
+                continue
+            refreshed |= 1 << asset
+
+            prev_vb, prev_rate, packed_weight = unpack_vb(self.packed_vbs[asset])
+
+            rate = self.provider_rates[asset]
+            check(rate > 0, 'no rate')
+            if rate == prev_rate:
+                # no rate change
+                continue
+
+            # cap upward rate movements to 10%
+            if rate > prev_rate * 11 // 10 and prev_rate > 0:
+                check(self.sender_is_management, 'rate increase cap')
+
+            vb = 0
+            if prev_rate > 0 and vb_sum > 0:
+                # factor out old rate and factor in new
+                wn = unpack_wn(ramp_weight(packed_weight, progress), num_assets)
+                log_prod += log_pow(prev_rate * PRECISION // rate, wn)
+                vb = prev_vb * rate // prev_rate
+                vb_sum = vb_sum + vb - prev_vb
+            self.packed_vbs[asset] = pack_vb(vb, rate, packed_weight)
+
+        if refreshed != prev_refreshed and self.block is not None:
+            self.packed_rate_refresh = self.block << RATE_REFRESH_SHIFT | refreshed
+
+        if log_prod != 0:
+            vb_prod = vb_prod * exp_up(log_prod) // PRECISION
+
+        if not updated and vb_prod == prev_vb_prod and vb_sum == prev_vb_sum:
+            # no weight and no rate changes
+            return vb_prod, vb_sum, progress
+
+        # recalculate supply
+        supply, vb_prod = self._update_supply(self.supply, vb_prod, vb_sum)
+        return vb_prod, vb_sum, progress
+
+    def _update_weights(self, vb_prod):
+        span = self.ramp_last_time
+        if span == 0:
+            return vb_prod, False, 0
+
+        progress = self.ramp_progress
+        duration = self.ramp_stop_time
+        timestamp = self.timestamp
+        if span > timestamp or (timestamp - span < self.ramp_step and duration > timestamp):
+            return vb_prod, False, progress
+
+        if timestamp < duration:
+            # ramp in progress
+            duration -= span
+            self.ramp_last_time = timestamp
+        else:
+            # ramp has finished
+            duration = 0
+            self.ramp_last_time = 0
+            self.ramp_stop_time = 0
+        span = timestamp - span
+
+        # update amplification
+        current = self.amplification
+        target = self.target_amplification
+        if duration == 0:
+            current = target
+        else:
+            if current > target:
+                current = current - (current - target) * span // duration
+            else:
+                current = current + (target - current) * span // duration
+        self.amplification = current
+
+        # update weights
+        if duration == 0:
+            self._store_ramp_weights(PRECISION)
+            progress = 0
+        else:
+            progress += (PRECISION - progress) * span // duration
+            self.ramp_progress = progress
+
+        vb_prod = 0
+        supply = self.supply
+        if supply > 0:
+            vb_prod = self._calc_vb_prod(supply, progress)
+        return vb_prod, True, progress
+
+    def _store_ramp_weights(self, progress):
+        if progress == 0:
+            return
+        for asset in range(self.num_assets):
+            vb, rate, packed_weight = unpack_vb(self.packed_vbs[asset])
+            self.packed_vbs[asset] = pack_vb(vb, rate, ramp_weight(packed_weight, progress))
+        self.ramp_progress = 0
+
+    def _update_supply(self, supply, vb_prod, vb_sum):
+        if supply == 0:
+            return 0, vb_prod
+
+        supply, vb_prod = calc_supply(self.num_assets, supply, self.amplification, vb_prod, vb_sum, True)
+        self.supply = supply
+        return supply, vb_prod
+
+    def _calc_vb_prod_sum(self, progress):
+        s = 0
+        for asset in range(self.num_assets):
+            s += self.packed_vbs[asset] & VB_MASK
+        p = self._calc_vb_prod(s, progress)
+        return p, s
+
+    def _calc_vb_prod(self, s, progress):
+        num_assets = self.num_assets
+        l = 0
+        for asset in range(num_assets):
+            vb, rate, weight = unpack_vb(self.packed_vbs[asset])
+            weight = unpack_wn(ramp_weight(weight, progress), 1)
+
+            check(weight > 0 and vb > 0, 'borked')
+            x = (s * weight // vb) & UINT256_MASK
+            if x == 0:
+                return 0
+            # log p = sum(w_i n log(D * w_i / vb_i))
+            l += log_pow(x, weight * num_assets)
+        return exp_down(l)
+
+def check_bands(prev_ratio, ratio, packed_weight):
+    """
+    Check whether asset is within safety band, or if previously outside, moves closer to it
+    """
+    weight = (packed_weight & WEIGHT_MASK) * WEIGHT_SCALE
+
+    # lower limit check
+    limit = ((packed_weight >> LOWER_BAND_SHIFT) & WEIGHT_MASK) * WEIGHT_SCALE
+    if limit > weight:
+        limit = 0
+    else:
+        limit = weight - limit
+    if ratio < limit:
+        check(ratio > prev_ratio, 'ratio below lower band')
+        return
+
+    # upper limit check
+    limit = min(weight + (packed_weight >> UPPER_BAND_SHIFT) * WEIGHT_SCALE, PRECISION)
+    if ratio > limit:
+        check(ratio < prev_ratio, 'ratio above upper band')
+
+def calc_supply(num_assets, supply, amplification, vb_prod, vb_sum, up):
+    """
+    Calculate supply iteratively
+    @return Tuple with new supply and product term
+    """
+    # Newton's method on f(D) = A f^n sigma - (A f^n - 1) D - D pi(D)
+    # D[m+1] = (A f^n sigma + n D[m] pi[m]) / (A f^n - 1 + (n + 1) pi[m])
+    #        = (l + n s r) / (d + (n + 1) r)
+
+    l = amplification # left: A f^n sigma
+    check(l >= PRECISION)
+    d = l - PRECISION # denominator: A f^n - 1
+    l = l * vb_sum
+    s = supply # supply: D[m]
+    r = vb_prod # right: pi[m]
+
+    for iteration in range(255):
+        check(s > 0)
+        sp = ((l + num_assets * s * r) & UINT256_MASK) // ((d + (num_assets + 1) * r) & UINT256_MASK) # D[m+1] = (l + n s r) / (d + (n + 1) r)
+        # limit the step, so that the power of the ratio and its product with pi stay within 256 bits
+        sp = min(sp, s * MAX_SUPPLY_STEP)
+        # update product term pi[m+1] = (D[m+1]/D[m])^n pi[m]
+        p, precision = pow_ratio(sp, s, num_assets)
+        r = r * p // precision # r * (sp / s)^n
+        delta = abs(sp - s)
+
+        if (delta * PRECISION & UINT256_MASK) // s <= MAX_POW_REL_ERR:
+            _observe('calc_supply', iteration + 1, supply, delta / s)
+            delta = (sp * MAX_POW_REL_ERR & UINT256_MASK) // PRECISION
+            if up:
+                sp += delta
+            else:
+                check(sp >= delta)
+                sp -= delta
+            return sp, r
+        s = sp
+
+    _observe('calc_supply', 255, supply, delta / s)
+    raise Revert('no convergence')
+
+def calc_vb(wn, y, supply, amplification, vb_prod, vb_sum):
+    """
+    Calculate a single asset's virtual balance iteratively using Newton's method
+    @return New asset virtual balance
+    """
+    # y = x_j, sum' = sum(x_i, i != j), prod' = D^n w_j^(v_j) prod((w_i/x_i)^v_i, i != j)
+    # Iteratively find root of g(y) using Newton's method
+    # g(y) = y^(v_j + 1) + (sum' + (1 / (A f^n) - 1) D) y^(v_j) - D prod' / (A f^n)
+    #      = y^(v_j + 1) + b y^(v_j) - c
+    # y[n+1] = y[n] - g(y[n])/g'(y[n])
+    #        = (y[n]^2 + b (1 - q) y[n] + c q y[n]^(1 - v_j)) / ((q + 1) y[n] + b))
+
+    b = supply * PRECISION // amplification # b' = sigma + D / (A f^n)
+    c = vb_prod * b // PRECISION # c = D / (A f^n) * pi
+    b += vb_sum
+    q = PRECISION * PRECISION // wn # q = 1/v_i = 1/(w_i n)
+
+    # the root is above the constant sum solution D - b', start no lower than that
+    if supply > b and y < supply - b:
+        y = supply - b
+
+    guess = y
+    for iteration in range(255):
+        check(y > 0)
+        num = y + b + supply * q // PRECISION + c * q // pow_up(y, wn) - b * q // PRECISION - supply
+        den = q * y // PRECISION + y + b - supply
+        check(num >= 0 and den > 0)
+        yp = num * y // den
+        delta = abs(yp - y)
+
+        if delta * PRECISION // y <= MAX_POW_REL_ERR:
+            _observe('calc_vb', iteration + 1, guess, delta / y)
+            yp += yp * MAX_POW_REL_ERR // PRECISION
+            return yp
+        y = yp
+
+    _observe('calc_vb', 255, guess, delta / y)
+    raise Revert('no convergence')
+
+def _observe(solver, iterations, guess, error):
+    for observer in solver_observers:
+        observer(solver, iterations, guess, error)
+
+def pow_ratio(a, b, n):
+    """
+    Calculate `(a / b)^n` by exponentiation by squaring, rounding down after every multiplication
+    @return Tuple with power and its precision, 36 decimals unless the ratio is large
+    @dev Intermediate squares fit in 256 bits for `a / b <= MAX_SUPPLY_STEP`, see `calc_supply`
+    """
+    precision = E36
+    if a > b * 14 // 10:
+        precision = E18
+    base = (a * precision & UINT256_MASK) // b
+    p = precision
+    while True:
+        if n & 1:
+            p = (p * base & UINT256_MASK) // precision
+        n >>= 1
+        if n == 0:
+            return p, precision
+        base = (base * base & UINT256_MASK) // precision
+
+def slope(amplification, supply, vb_prod, vb, wn):
+    """
+    Partial derivative of the invariant to a virtual balance, at constant supply
+    """
+    # A f^n + D pi v_i / x_i
+    return amplification + supply * vb_prod // vb * wn // PRECISION
+
+def pack_vb(vb, rate, packed_weight):
+    """
+    Pack virtual balance of asset along with other related variables
+    """
+    check(vb <= VB_MASK and rate <= RATE_MASK)
+    return (vb | rate << RATE_SHIFT | packed_weight << PACKED_WEIGHT_SHIFT) & UINT256_MASK
+
+def unpack_vb(packed):
+    """
+    Unpack variable to its components
+    @return Tuple with virtual balance, rate and packed weight
+    """
+    return packed & VB_MASK, (packed >> RATE_SHIFT) & RATE_MASK, packed >> PACKED_WEIGHT_SHIFT
+
+def pack_weight(weight, target, lower, upper):
+    """
+    Pack weight with target and bands
+    """
+    return weight // WEIGHT_SCALE | (target // WEIGHT_SCALE) << TARGET_WEIGHT_SHIFT | (lower // WEIGHT_SCALE) << LOWER_BAND_SHIFT | (upper // WEIGHT_SCALE) << UPPER_BAND_SHIFT
+
+def unpack_weight(packed):
+    """
+    Unpack weight to its components
+    @return Tuple with weight, target weight, lower band and upper band (all in 18 decimals)
+    """
+    return (packed & WEIGHT_MASK) * WEIGHT_SCALE, ((packed >> TARGET_WEIGHT_SHIFT) & WEIGHT_MASK) * WEIGHT_SCALE, ((packed >> LOWER_BAND_SHIFT) & WEIGHT_MASK) * WEIGHT_SCALE, (packed >> UPPER_BAND_SHIFT) * WEIGHT_SCALE
+
+def unpack_wn(packed, num_assets):
+    """
+    Unpack weight and multiply by number of assets
+    """
+    return (packed & WEIGHT_MASK) * WEIGHT_SCALE * num_assets
+
+def ramp_weight(packed, progress):
+    """
+    Interpolate packed weight towards its target weight
+    @param progress Fraction of the way from weight to target weight (18 decimals)
+    """
+    if progress == 0:
+        return packed
+    weight = packed & WEIGHT_MASK
+    target = (packed >> TARGET_WEIGHT_SHIFT) & WEIGHT_MASK
+    if weight > target:
+        weight -= (weight - target) * progress // PRECISION
+    else:
+        weight += (target - weight) * progress // PRECISION
+    return packed - (packed & WEIGHT_MASK) | weight
+
+def pack_pool_vb(prod, sum_):
+    """
+    Pack pool product and sum term
+    """
+    check(prod <= POOL_VB_MASK and sum_ <= POOL_VB_MASK)
+    return prod | sum_ << POOL_VB_SHIFT
+
+def unpack_pool_vb(packed):
+    """
+    Unpack pool product and sum term
+    @return Tuple with pool product term (pi) and sum term (sigma)
+    """
+    return packed & POOL_VB_MASK, packed >> POOL_VB_SHIFT
@@ -0,0 +1,125 @@
+"""
+Vectorized depth curve quoter.
+Solves the swap invariant for a whole array of input amounts at once in
+floating point, after applying any pending rate and weight update exactly.
+Quotes deviate from the contract by less than 1e-9 relative for small trades
+and around 1e-14 for large ones, selected points can be confirmed against
+the exact integer model. Requires numpy.
+"""
+
+import numpy as np
+from yeth.pool import *
+
+TOLERANCE = 1e-12
+
+def get_dy_curve(pool, i, j, dx, tolerance=TOLERANCE, max_iter=255):
+    """
+    Quote `swap(i, j, dx)` for every input amount in `dx`
+    @param pool `Pool` model
+    @param dx Array of input amounts
+    @return Float array of output amounts, NaN where the swap would revert
+    @dev Lanes are removed from the Newton iteration as soon as they converge
+    """
+    num_assets = pool.num_assets
+    check(i != j, 'same input and output asset')
+    check(i < num_assets and j < num_assets, 'index out of bounds')
+
+    # apply pending rate and weight updates exactly, they dont depend on the amount
+    pool = pool.copy()
+    vb_prod, vb_sum = unpack_pool_vb(pool.packed_pool_vb)
+    vb_prod, vb_sum, progress = pool._update_rates((i + 1) | (j + 1) << 8, vb_prod, vb_sum, False)
+
+    prev_vb_x, rate_x, packed_weight_x = unpack_vb(pool.packed_vbs[i])
+    prev_vb_y, rate_y, packed_weight_y = unpack_vb(pool.packed_vbs[j])
+    packed_weight_x = ramp_weight(packed_weight_x, progress)
+    packed_weight_y = ramp_weight(packed_weight_y, progress)
+    wn_x = unpack_wn(packed_weight_x, num_assets) / PRECISION
+    wn_y = unpack_wn(packed_weight_y, num_assets) / PRECISION
+
+    # continue in floating point, with balances in units of ether
+    supply = pool.supply / PRECISION
+    amplification = pool.amplification / PRECISION
+    fee_rate = pool.swap_fee_rate / PRECISION
+    rate_x /= PRECISION
+    rate_y /= PRECISION
+    prev_vb_sum = vb_sum / PRECISION
+    prev_vb_x /= PRECISION
+    prev_vb_y /= PRECISION
+
+    dx = np.asarray(dx, dtype=np.float64) / PRECISION
+    dvb_x = dx * (1 - fee_rate) * rate_x
+    vb_x = prev_vb_x + dvb_x
+
+    # update x_i and remove x_j from variables
+    vb_prod = vb_prod / PRECISION * prev_vb_y**wn_y / (vb_x / prev_vb_x)**wn_x
+    vb_sum = prev_vb_sum + dvb_x - prev_vb_y
+
+    # calculate new balance of out token
+    vb_y = calc_vb_vec(wn_y, prev_vb_y, supply, amplification, vb_prod, vb_sum, tolerance, max_iter)
+    vb_sum = vb_sum + vb_y
+
+    # check bands
+    valid = (dx > 0) & (vb_y <= prev_vb_y)
+    valid &= check_bands_vec(prev_vb_x / prev_vb_sum, vb_x / vb_sum, packed_weight_x)
+    valid &= check_bands_vec(prev_vb_y / prev_vb_sum, vb_y / vb_sum, packed_weight_y)
+
+    dy = (prev_vb_y - vb_y) / rate_y * PRECISION
+    return np.where(valid, dy, np.nan)
+
+def confirm_dy_curve(pool, i, j, dx, dy, indices):
+    """
+    Quote selected points of a curve with the exact integer model
+    @param dx Array of input amounts
+    @param dy Array of output amounts, as returned by `get_dy_curve`
+    @param indices Indices of the points to confirm
+    @return Tuple with a dictionary of exact output amounts and largest relative deviation
+    """
+    exact = {}
+    deviation = 0.
+    for index in indices:
+        try:
+            exact[index] = pool.get_dy(i, j, int(dx[index]))
+        except Revert:
+            exact[index] = None
+            if not np.isnan(dy[index]):
+                deviation = np.inf
+            continue
+        deviation = max(deviation, abs(dy[index] - exact[index]) / exact[index])
+    return exact, deviation
+
+def calc_vb_vec(wn, y, supply, amplification, vb_prod, vb_sum, tolerance=TOLERANCE, max_iter=255):
+    """
+    Vectorized version of `calc_vb`
+    @return Array with new virtual balances, NaN for lanes that did not converge
+    """
+    b = supply / amplification
+    c = vb_prod * b
+    b = b + vb_sum
+    q = 1 / wn
+
+    y = np.full(np.shape(vb_sum), y, dtype=np.float64)
+    b, c = np.broadcast_to(b, y.shape), np.broadcast_to(c, y.shape)
+    active = np.ones(y.shape, dtype=bool)
+    for _ in range(max_iter):
+        idx = np.flatnonzero(active)
+        if len(idx) == 0:
+            break
+        ya, ba, ca = y[idx], b[idx], c[idx]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            yp = (ya + ba + supply * q + ca * q / ya**wn - ba * q - supply) * ya / (q * ya + ya + ba - supply)
+        # lanes that leave the domain are dropped, the contract would revert on them
+        yp[~(yp > 0)] = np.nan
+        y[idx] = yp
+        active[idx] = np.abs(yp - ya) > tolerance * ya
+    y[active] = np.nan
+    return y * (1 + MAX_POW_REL_ERR / PRECISION)
+
+def check_bands_vec(prev_ratio, ratio, packed_weight):
+    """
+    Vectorized version of `check_bands`
+    @return Boolean array, False where the contract would revert
+    """
+    weight = (packed_weight & WEIGHT_MASK) * WEIGHT_SCALE / PRECISION
+    lower = max(weight - ((packed_weight >> LOWER_BAND_SHIFT) & WEIGHT_MASK) * WEIGHT_SCALE / PRECISION, 0)
+    upper = min(weight + (packed_weight >> UPPER_BAND_SHIFT) * WEIGHT_SCALE / PRECISION, 1)
+    return ((ratio >= lower) | (ratio > prev_ratio)) & ((ratio <= upper) | (ratio < prev_ratio))
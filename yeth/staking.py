@@ -0,0 +1,228 @@
+"""
+Pure Python port of the bucket accounting of `contracts/Staking.vy`.
+Keeps a copy of the bucket storage and applies updates with the exact integer
+arithmetic of the contract, so bucket amounts, fee shares and the share price
+match the chain to the wei. Deposits, withdrawals and vote weights are not
+modelled, only rewards and slashings through the asset balance.
+"""
+
+FEE_PRECISION = 10_000
+DAY_LENGTH = 24 * 60 * 60
+WEEK_LENGTH = 7 * DAY_LENGTH
+
+class Staking:
+    """
+    In-memory copy of the staking bucket storage.
+    `balance` takes the place of the asset balance of the contract and
+    `timestamp` the place of `block.timestamp`.
+    Fee shares minted to the treasury are accumulated in `fee_shares`
+    """
+    def __init__(
+        self,
+        updated,
+        pending=0,
+        streaming=0,
+        unlocked=0,
+        supply=0,
+        performance_fee_rate=0,
+        balance=None,
+        timestamp=None,
+    ):
+        self.updated = updated
+        self.pending = pending
+        self.streaming = streaming
+        self.unlocked = unlocked
+        self.supply = supply
+        self.performance_fee_rate = performance_fee_rate
+        if balance is None:
+            balance = pending + streaming + unlocked
+        self.balance = balance
+        if timestamp is None:
+            timestamp = updated
+        self.timestamp = timestamp
+        self.fee_shares = 0
+
+    @classmethod
+    def from_contract(cls, staking, asset, timestamp):
+        """
+        Load the state of a deployed staking contract
+        @param staking Staking contract
+        @param asset Asset token contract
+        @param timestamp Timestamp of the next block
+        @dev The private bucket amounts are read through `get_amounts`,
+            so the model starts as if `update_amounts` is called at `timestamp`
+        """
+        pending, streaming, unlocked, new_fee_shares, _ = staking.get_amounts()
+        return cls(
+            timestamp,
+            pending,
+            streaming,
+            unlocked,
+            staking.totalSupply() + new_fee_shares,
+            staking.performance_fee_rate(),
+            asset.balanceOf(staking),
+        )
+
+    def copy(self):
+        model = Staking.__new__(Staking)
+        model.__dict__.update(self.__dict__)
+        return model
+
+    def update_amounts(self):
+        """
+        Update the amount in each bucket
+        @return Tuple with pending, streaming and unlocked amounts
+        """
+        pending, streaming, unlocked, new_fee_shares, _ = self.get_amounts()
+        self.updated = self.timestamp
+        self.pending = pending
+        self.streaming = streaming
+        self.unlocked = unlocked
+        self.supply += new_fee_shares
+        self.fee_shares += new_fee_shares
+        return pending, streaming, unlocked
+
+    def get_amounts(self):
+        """
+        Simulate an update to the buckets
+        @return Tuple with pending, streaming, unlocked amounts, new fee shares and balance changes since last update
+        """
+        return get_amounts(
+            self.updated,
+            self.timestamp,
+            self.balance,
+            self.pending,
+            self.streaming,
+            self.unlocked,
+            self.supply,
+            self.performance_fee_rate,
+        )
+
+    def total_assets(self):
+        return self.get_amounts()[2]
+
+    def convert_to_shares(self, assets):
+        total_shares, total_assets = self._get_totals()
+        if total_shares == 0:
+            return assets
+        if total_assets == 0:
+            return 0
+        return assets * total_shares // total_assets
+
+    def convert_to_assets(self, shares):
+        total_shares, total_assets = self._get_totals()
+        if total_shares == 0:
+            return shares
+        if total_assets == 0:
+            return 0
+        return shares * total_assets // total_shares
+
+    def _get_totals(self):
+        pending, streaming, unlocked, new_fee_shares, _ = self.get_amounts()
+        return self.supply + new_fee_shares, unlocked
+
+def get_amounts(updated, timestamp, current, pending, streaming, unlocked, supply, fee_rate):
+    """
+    Calculate latest bucket amounts, see `Staking._get_amounts`
+    @param updated Time of last update
+    @param timestamp Current time
+    @param current Asset balance of the contract
+    @param supply Total amount of shares
+    @param fee_rate Performance fee rate, in units of `FEE_PRECISION`
+    @return Tuple with pending, streaming, unlocked amounts, new fee shares and balance changes since last update
+    """
+    if updated == timestamp:
+        return pending, streaming, unlocked, 0, 0
+
+    new_fee = 0
+    last = pending + streaming + unlocked
+
+    delta = 0
+    weeks = timestamp // WEEK_LENGTH - updated // WEEK_LENGTH
+    if weeks > 0:
+        if weeks == 1:
+            # new week
+            unlocked += streaming
+            streaming = pending
+            pending = 0
+        else:
+            # function hasnt been called in at least a week
+            span = timestamp - updated
+            unlocked += streaming + pending
+            if current > last:
+                # net rewards generated, distribute over buckets
+                rewards = current - last
+                fee = rewards * fee_rate // FEE_PRECISION
+                rewards -= fee
+                new_fee += fee
+
+                delta = rewards
+                last = current
+
+                # streaming bucket: 7 days
+                streaming = rewards * WEEK_LENGTH // span
+                span -= WEEK_LENGTH
+                rewards -= streaming
+
+                # pending bucket: time since new week
+                pending = rewards * (timestamp % WEEK_LENGTH) // span
+                rewards -= pending
+
+                # unlocked bucket: rest
+                unlocked += rewards
+            else:
+                # net penalty - deal with it below
+                streaming = 0
+                pending = 0
+
+        # set to beginning of the week
+        updated = timestamp // WEEK_LENGTH * WEEK_LENGTH
+
+    # time between last update and end of week
+    duration = WEEK_LENGTH - (updated % WEEK_LENGTH)
+    # time that has passed since last update
+    span = timestamp - updated
+
+    # unlock funds
+    streamed = streaming * span // duration
+    streaming -= streamed
+    unlocked += streamed
+
+    if current >= last:
+        # rewards
+        rewards = current - last
+        fee = rewards * fee_rate // FEE_PRECISION
+        rewards -= fee
+        new_fee += fee
+        if weeks == 1 and timestamp % WEEK_LENGTH <= DAY_LENGTH:
+            # if first update in new week is in first day, add to streaming
+            streaming += rewards
+        else:
+            pending += rewards
+        delta += rewards
+    else:
+        # penalty, taken from pending, streaming and unlocked in that order
+        shortage = last - current
+        delta -= shortage
+        if pending >= shortage:
+            pending -= shortage
+        else:
+            shortage -= pending
+            pending = 0
+            if streaming >= shortage:
+                streaming -= shortage
+            else:
+                shortage -= streaming
+                streaming = 0
+                unlocked -= shortage
+
+    new_fee_shares = 0
+    if new_fee > 0:
+        if unlocked == 0:
+            new_fee_shares = new_fee
+        else:
+            new_fee_shares = new_fee * supply // unlocked
+
+        unlocked += new_fee
+
+    return pending, streaming, unlocked, new_fee_shares, delta